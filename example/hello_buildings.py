@@ -3,7 +3,12 @@ import os
 
 import pyvista as pv
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "data")
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "xkcd_red_spider",
+    "data",
+)
 
 
 def get_buildings() -> pv.PolyData:
@@ -116,7 +116,7 @@ setup(
     #
     #   py_modules=["my_module"],
     #
-    packages=find_packages(where="xkcd_red_spider"),  # Required
+    packages=find_packages(include=["xkcd_red_spider", "xkcd_red_spider.*"]),  # Required
     # Specify which Python versions you support. In contrast to the
     # 'Programming Language' classifiers above, 'pip install' will check this
     # and refuse to install the project if the version does not match. If you
@@ -140,7 +140,7 @@ setup(
     # projects.
     extras_require={  # Optional
         # 'dev': ['check-manifest'],
-        # 'test': ['coverage'],
+        "test": ["pytest"],
     },
     # If there are data files included in your packages that need to be
     # installed, specify them here.
@@ -148,7 +148,11 @@ setup(
     # If using Python 2.6 or earlier, then these have to be included in
     # MANIFEST.in as well.
     package_data={  # Optional
-        # 'sample': ['package_data.dat'],
+        "xkcd_red_spider": [
+            "data/README.md",
+            "data/spider.ply",
+            "data/buildings-and-skyscrapers/source/buildings.obj",
+        ],
     },
     # Although 'package_data' is the preferred approach, in some case you may
     # need to place data files outside of your packages. See:
@@ -161,13 +165,13 @@ setup(
     # `pip` to create the appropriate form of executable for the target
     # platform.
     #
-    # For example, the following would provide a command called `sample` which
-    # executes the function `main` from this package when invoked:
-    # entry_points={  # Optional
-    #     'console_scripts': [
-    #         'sample=sample:main',
-    #     ],
-    # },
+    # The `xkcd-red-spider` command only imports pyvista and VTK in the
+    # subcommands that draw the scene, see xkcd_red_spider/cli.py.
+    entry_points={  # Optional
+        "console_scripts": [
+            "xkcd-red-spider=xkcd_red_spider.cli:main",
+        ],
+    },
     # List additional URLs that are relevant to your project as a dict.
     #
     # This field corresponds to the "Project-URL" metadata fields:
@@ -0,0 +1,16 @@
+"""Shared setup of the tests: every plotter renders off screen, and meshes are cached in a
+temporary directory instead of the user's cache."""
+import pytest
+import pyvista as pv
+
+import xkcd_red_spider.cache as cache
+
+pv.OFF_SCREEN = True
+
+
+@pytest.fixture(scope="session", autouse=True)
+def mesh_cache_dir(tmp_path_factory):
+    previous = cache.CACHE_DIR
+    cache.CACHE_DIR = str(tmp_path_factory.mktemp("cache"))
+    yield cache.CACHE_DIR
+    cache.CACHE_DIR = previous
@@ -0,0 +1,59 @@
+"""Merged army meshes built in worker processes against the serial build."""
+import gc
+import os
+
+import numpy as np
+import pytest
+import pyvista as pv
+
+from xkcd_red_spider import army, columnar
+
+
+def assert_same_mesh(mesh, expected):
+    np.testing.assert_array_equal(mesh.points, expected.points)
+    for key in ("verts", "lines", "faces"):
+        np.testing.assert_array_equal(getattr(mesh, key), getattr(expected, key))
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with army.army_pool(2) as pool:
+        yield pool
+
+
+@pytest.fixture(params=["mapped", "copied"])
+def shared_memory_mapping(request, monkeypatch):
+    # "copied" hides /dev/shm, as on platforms where the segment has no path to map it from
+    if request.param == "copied":
+        exists = os.path.exists
+        monkeypatch.setattr(
+            army.os.path, "exists", lambda path: not path.startswith("/dev/shm") and exists(path)
+        )
+    return request.param
+
+
+def test_build_army_mesh_in_workers(pool, shared_memory_mapping):
+    units = columnar.generate_random_army(300, 10, 10, 3, seed=0)
+    args = (units.positions, None, units.scales)
+    kwargs = {"orientations": units.orientations}
+    expected = army.build_army_mesh(*args, **kwargs)
+    built = army.build_army_mesh(*args, **kwargs, pool=pool)
+    # The meshes own their buffer once the shared memory segment is gone
+    gc.collect()
+    for mesh, expected_mesh in zip(built, expected):
+        assert mesh.n_points == expected_mesh.n_points > 0
+        assert_same_mesh(mesh, expected_mesh)
+
+
+def test_merge_transformed_shared_cell_types(pool, shared_memory_mapping):
+    template = pv.PolyData(
+        np.random.default_rng(0).random((5, 3)),
+        verts=[1, 0],
+        lines=[3, 0, 1, 2],
+        faces=[3, 0, 1, 2, 4, 1, 2, 3, 4],
+    )
+    transforms = np.tile(np.eye(4), (7, 1, 1))
+    transforms[:, :3, 3] = np.arange(21).reshape(7, 3)
+    expected = army.merge_transformed(template, transforms)
+    assert_same_mesh(army.merge_transformed_shared(template, transforms, pool), expected)
+    assert army.merge_transformed_shared(template, transforms[:0], pool).n_points == 0
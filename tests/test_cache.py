@@ -0,0 +1,116 @@
+"""Binary mesh cache: fingerprints, invalidation and bounds."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import pyvista as pv
+
+from xkcd_red_spider import cache
+
+
+# A builder with a comprehension, a lambda and a frozenset constant, whose code objects and set
+# ordering used to differ between processes
+BUILDER_SOURCE = """
+def build():
+    names = [name.upper() for name in ("a", "b") if name in {"a", "c", "d"}]
+    return sorted(names, key=lambda name: -ord(name))
+"""
+FINGERPRINT_SCRIPT = (
+    BUILDER_SOURCE
+    + """
+from xkcd_red_spider.cache import builder_fingerprint
+from xkcd_red_spider.utils import get_buildings
+print(builder_fingerprint(build), builder_fingerprint(get_buildings))
+"""
+)
+
+
+def fingerprints_in_new_process(hash_seed):
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    output = subprocess.run(
+        [sys.executable, "-c", FINGERPRINT_SCRIPT],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return output.split()
+
+
+def test_builder_fingerprint_is_stable_across_processes():
+    assert fingerprints_in_new_process(1) == fingerprints_in_new_process(2)
+
+
+def test_builder_fingerprint_follows_code():
+    namespace, edited = {}, {}
+    exec(BUILDER_SOURCE, namespace)
+    exec(BUILDER_SOURCE.replace("-ord", "ord"), edited)
+    assert cache.builder_fingerprint(namespace["build"]) == cache.builder_fingerprint(
+        namespace["build"]
+    )
+    assert cache.builder_fingerprint(namespace["build"]) != cache.builder_fingerprint(
+        edited["build"]
+    )
+
+
+def test_cached_mesh(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("0.5")
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def builder():
+        calls.append(1)
+        mesh = pv.Sphere(radius=float(source.read_text()))
+        mesh.point_data["height"] = mesh.points[:, 2]
+        return mesh
+
+    kwargs = {"name": "sphere", "sources": [str(source)], "builder": builder}
+    assert cache.cached_bounds(**kwargs, cache_dir=cache_dir) is None
+    built = cache.cached_mesh(**kwargs, cache_dir=cache_dir)
+    cached = cache.cached_mesh(**kwargs, cache_dir=cache_dir)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(cached.points, built.points)
+    np.testing.assert_array_equal(cached.faces, built.faces)
+    np.testing.assert_array_equal(cached.point_data["height"], built.point_data["height"])
+    assert cache.cached_bounds(**kwargs, cache_dir=cache_dir) == tuple(built.bounds)
+
+    # Editing the source rebuilds the mesh
+    source.write_text("2.0")
+    os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 1))
+    assert cache.cached_bounds(**kwargs, cache_dir=cache_dir) is None
+    assert cache.cached_mesh(**kwargs, cache_dir=cache_dir).length > built.length
+    assert len(calls) == 2
+
+    cache.clear_cache(cache_dir)
+    assert not os.listdir(cache_dir)
+
+
+def test_cached_mesh_follows_dependencies(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("")
+    namespace, edited = {}, {}
+    exec(BUILDER_SOURCE, namespace)
+    exec(BUILDER_SOURCE.replace("-ord", "ord"), edited)
+    kwargs = {"name": "cube", "sources": [str(source)], "cache_dir": str(tmp_path)}
+    cache.cached_mesh(builder=pv.Cube, dependencies=[namespace["build"]], **kwargs)
+    assert cache.cached_bounds(builder=pv.Cube, dependencies=[namespace["build"]], **kwargs)
+    assert cache.cached_bounds(builder=pv.Cube, dependencies=[edited["build"]], **kwargs) is None
+
+
+@pytest.mark.parametrize("size", [0, 10, -100])
+def test_cached_mesh_rebuilds_corrupt_entries(tmp_path, size):
+    source = tmp_path / "source.txt"
+    source.write_text("")
+    kwargs = {"name": "cube", "sources": [str(source)], "builder": pv.Cube}
+    kwargs["cache_dir"] = str(tmp_path / "cache")
+    cube = cache.cached_mesh(**kwargs)
+    # A half-written entry, e.g. from a process killed while saving it
+    entry = tmp_path / "cache" / "cube.npz"
+    entry.write_bytes(entry.read_bytes()[:size])
+    assert cache.cached_bounds(**kwargs) is None
+    np.testing.assert_array_equal(cache.cached_mesh(**kwargs).points, cube.points)
+    assert cache.cached_bounds(**kwargs) == tuple(cube.bounds)
@@ -0,0 +1,78 @@
+"""Columnar armies and their memory-mappable file format."""
+import numpy as np
+import pytest
+
+from xkcd_red_spider import columnar
+from xkcd_red_spider.utils import get_spider_army_units
+
+
+def orientation_by_position(army):
+    # The last unit wins at positions holding several units, as in ``army_to_coord``
+    return dict(zip(map(tuple, army.positions.tolist()), army.orientations.tolist()))
+
+
+def assert_same_army(army, expected):
+    for column, expected_column in zip(army, expected):
+        assert column.dtype == expected_column.dtype
+        np.testing.assert_array_equal(column, expected_column)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize(
+    "army",
+    [
+        columnar.generate_random_army(50, seed=0),
+        columnar.generate_random_army(50, x_range=100_000, seed=1),
+        columnar.make_army(np.zeros((0, 3))),
+        columnar.make_army([[1, 2]], [5], 0.5),
+    ],
+)
+def test_save_load_round_trip(tmp_path, army, mmap):
+    path = str(tmp_path / "army.bin")
+    columnar.save_army(path, army)
+    assert_same_army(columnar.load_army(path, mmap=mmap), army)
+
+
+def test_make_army_dtypes():
+    assert columnar.make_army([[0, 0, 0]]).positions.dtype == np.int16
+    assert columnar.make_army([[40_000, 0, 0]]).positions.dtype == np.int32
+    assert columnar.make_army([[0, 0, 0]]).nbytes == 3 * 2 + 1 + 4
+    with pytest.raises(ValueError):
+        columnar.make_army([[0.5, 0, 0]])
+    with pytest.raises(ValueError):
+        columnar.make_army([[0, 0, 0]], [24])
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "army.bin"
+    path.write_bytes(b"not an army file")
+    with pytest.raises(ValueError):
+        columnar.load_army(str(path))
+
+
+def test_army_from_coord():
+    army = columnar.army_from_coord()
+    units = get_spider_army_units()
+    assert army.n_units == len(units)
+    np.testing.assert_array_equal(army.positions, [translation for translation, _ in units])
+    # Converting back keeps the orientation of every position, but not the extra spiders
+    coord = columnar.army_to_coord(army)
+    round_trip = columnar.army_from_coord(coord)
+    assert round_trip.n_units == len(coord)
+    assert orientation_by_position(round_trip) == orientation_by_position(army)
+
+
+def test_generate_random_army():
+    army = columnar.generate_random_army(40, x_range=3, y_range=3, z_range=3, seed=0)
+    assert army.n_units == 40
+    assert len(np.unique(army.positions, axis=0)) == 40
+    assert np.abs(army.positions).max() <= 3
+    assert_same_army(columnar.generate_random_army(40, 3, 3, 3, seed=0), army)
+
+
+def test_exposed_placement_drops_buried_units():
+    # A full 5x5x5 block: the 3x3x3 boxes inside are buried on all sides
+    army = columnar.generate_random_army(125, 2, 2, 2, seed=0, placement="exposed")
+    assert army.n_units == 125 - 27
+    assert np.abs(army.positions).max(axis=1).min() == 2
+    assert_same_army(columnar.generate_random_army(125, 2, 2, 2, 0, "exposed"), army)
@@ -0,0 +1,102 @@
+"""``.vtkjs`` export: hash skips, blob reuse, archive integrity and compact round trips."""
+import json
+import zipfile
+
+import numpy as np
+import pytest
+import pyvista as pv
+from vtkmodules.vtkCommonTransforms import vtkTransform
+
+from xkcd_red_spider import export
+from xkcd_red_spider import main as scene
+
+
+@pytest.fixture(scope="module")
+def plotter():
+    plotter = pv.Plotter()
+    scene.main(plotter=plotter)
+    plotter.camera_position = scene.DEFAULT_CAMERA_POSITION
+    yield plotter
+    plotter.close()
+
+
+def read_array(archive, root, name, array):
+    data = archive.read(f"{root}/{name}/data/{array['ref']['id']}")
+    dtype = np.dtype(array["dataType"].replace("Array", "").lower()).newbyteorder("<")
+    return np.frombuffer(data, dtype=dtype).reshape(-1, array["numberOfComponents"])
+
+
+def exported_meshes(path):
+    # World points and faces of every scene entry, as the web viewer places them
+    meshes = []
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        root = archive.namelist()[0].split("/")[0]
+        for entry in json.loads(archive.read(f"{root}/index.json"))["scene"]:
+            name = entry["httpDataSetReader"]["url"]
+            dataset = json.loads(archive.read(f"{root}/{name}/index.json"))
+            points = read_array(archive, root, name, dataset["points"]).astype(float)
+            transform = vtkTransform()
+            transform.Translate(entry["actor"]["position"])
+            transform.RotateWXYZ(*entry["actorRotation"])
+            transform.Scale(entry["actor"]["scale"])
+            matrix = pv.array_from_vtkmatrix(transform.GetMatrix())
+            polys = dataset.get("polys")
+            faces = None if polys is None else read_array(archive, root, name, polys).ravel()
+            meshes.append((points @ matrix[:3, :3].T + matrix[:3, 3], faces))
+    return meshes
+
+
+def drawn_meshes(plotter):
+    meshes = []
+    for actor in plotter.renderer.GetActors():
+        matrix = pv.array_from_vtkmatrix(actor.GetMatrix())
+        for mesh in export.actor_meshes(actor):
+            if mesh.n_points:
+                points = np.asarray(mesh.points, dtype=float) @ matrix[:3, :3].T + matrix[:3, 3]
+                meshes.append((points, mesh.faces if mesh.faces.size else None))
+    return meshes
+
+
+def test_export_reuses_blobs_and_skips_unchanged_scenes(plotter, tmp_path):
+    path = str(tmp_path / "scene.vtkjs")
+    first = export.export_vtkjs(plotter, path, scene_hash="a")
+    assert first["exported"] and first["n_blobs"] > 0 and first["n_reused_blobs"] == 0
+    assert export.read_scene_hash(path) == "a"
+    assert not export.export_vtkjs(plotter, path, scene_hash="a")["exported"]
+
+    # A re-export copies every compressed blob from the previous archive
+    second = export.export_vtkjs(plotter, path, scene_hash="b")
+    assert second["exported"]
+    assert second["n_reused_blobs"] == second["n_blobs"] == first["n_blobs"]
+    assert export.read_scene_hash(path) == "b"
+    for (points, faces), (expected_points, expected_faces) in zip(
+        exported_meshes(path), drawn_meshes(plotter)
+    ):
+        np.testing.assert_allclose(points, expected_points, atol=1e-5)
+        np.testing.assert_array_equal(faces, expected_faces)
+
+
+def test_blobs_written_through_the_public_api(plotter, tmp_path, monkeypatch):
+    path = str(tmp_path / "scene.vtkjs")
+    export.export_vtkjs(plotter, path)
+    expected = exported_meshes(path)
+    monkeypatch.setattr(export, "_append_deflated", lambda archive, info, data: False)
+    assert export.export_vtkjs(plotter, path)["n_reused_blobs"] > 0
+    for (points, faces), (expected_points, expected_faces) in zip(exported_meshes(path), expected):
+        np.testing.assert_array_equal(points, expected_points)
+        np.testing.assert_array_equal(faces, expected_faces)
+
+
+@pytest.mark.parametrize("point_encoding", export.POINT_ENCODINGS)
+def test_compact_round_trip(plotter, tmp_path, point_encoding):
+    path = str(tmp_path / "scene.vtkjs")
+    report = export.export_vtkjs(plotter, path, compact=True, point_encoding=point_encoding)
+    assert report["n_shared"] > 0
+    exported, drawn = exported_meshes(path), drawn_meshes(plotter)
+    assert len(exported) == len(drawn)
+    for (points, faces), (expected_points, expected_faces) in zip(exported, drawn):
+        # int16 points are within half a step of 1 / 65534 of the bounding box of their dataset
+        size = np.ptp(expected_points, axis=0).max()
+        np.testing.assert_allclose(points, expected_points, atol=1e-5 + size / 65534)
+        np.testing.assert_array_equal(faces, expected_faces)
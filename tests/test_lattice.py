@@ -0,0 +1,91 @@
+"""Lattice keys and occupancy queries against brute force set lookups."""
+import random
+
+import numpy as np
+import pytest
+
+from xkcd_red_spider import lattice, utils
+from xkcd_red_spider.transforms import CUBE_ROTATIONS
+
+
+def random_positions(n_units=200, extent=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-extent, extent + 1, (n_units, 3))
+
+
+def test_pack_keys():
+    coords = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [-1, -1, -1]])
+    keys = lattice.pack_keys(coords)
+    assert keys.dtype == np.int64
+    assert len(np.unique(keys)) == len(coords)
+    # Keys are linear in the coordinates and sort like (x, y, z) tuples
+    origin = lattice.pack_keys(np.zeros((1, 3)))[0]
+    np.testing.assert_array_equal(keys[1:4] - origin, lattice.pack_keys(np.eye(3)) - origin)
+    grid = np.stack(np.meshgrid(*[range(-2, 3)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+    np.testing.assert_array_equal(np.argsort(lattice.pack_keys(grid)), np.arange(len(grid)))
+    with pytest.raises(ValueError):
+        lattice.pack_keys([[2**20, 0, 0]])
+
+
+def test_lattice_coords():
+    np.testing.assert_array_equal(lattice.lattice_coords([[1.0, 2.0]]), [[1, 2, 0]])
+    with pytest.raises(ValueError):
+        lattice.lattice_coords([[0.5, 0.0, 0.0]])
+
+
+def test_exposed_faces_matches_brute_force():
+    positions = random_positions()
+    occupied = set(map(tuple, positions.tolist()))
+    expected = [
+        [tuple(position + normal) not in occupied for normal in lattice.FACE_NORMALS]
+        for position in positions
+    ]
+    np.testing.assert_array_equal(lattice.exposed_faces(positions), expected)
+
+
+def test_box_surface_matches_brute_force():
+    positions = random_positions(seed=1)
+    points, quads = lattice.box_surface(positions)
+    unique = np.unique(positions, axis=0)
+    assert len(quads) == lattice.exposed_faces(unique).sum()
+    # Corners are shared, every quad is a unit square on the outside of its box
+    assert len(np.unique(points, axis=0)) == len(points)
+    corners = points[quads]
+    edges = np.linalg.norm(np.diff(corners, axis=1, append=corners[:, :1]), axis=2)
+    np.testing.assert_allclose(edges, 1.0)
+    occupied = set(map(tuple, unique.tolist()))
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 1])
+    centers = corners.mean(axis=1)
+    inside = np.rint(centers - normals / 2).astype(int)
+    outside = np.rint(centers + normals / 2).astype(int)
+    assert all(tuple(coord) in occupied for coord in inside.tolist())
+    assert not any(tuple(coord) in occupied for coord in outside.tolist())
+
+
+def test_exposed_orientations_stand_spiders_on_exposed_faces():
+    positions = random_positions(seed=2)
+    orientations, visible = lattice.exposed_orientations(positions, seed=0)
+    exposed = lattice.exposed_faces(positions)
+    np.testing.assert_array_equal(visible, exposed.any(axis=1))
+    ups = CUBE_ROTATIONS[orientations][:, :, 2]
+    faces = [
+        int(np.flatnonzero((lattice.FACE_NORMALS == up).all(axis=1))[0]) for up in ups.tolist()
+    ]
+    assert exposed[visible][np.arange(visible.sum()), np.array(faces)[visible]].all()
+    np.testing.assert_array_equal(orientations[~visible], 0)
+    # Reproducible from a seed
+    np.testing.assert_array_equal(lattice.exposed_orientations(positions, seed=0)[0], orientations)
+
+
+def test_exposed_placement_of_coordinates():
+    def generate(placement):
+        random.seed(3)
+        return utils.generate_random_spider_army_coord(400, 2, 2, 2, placement=placement)
+
+    # random.seed() reproduces the orientations too, and the buried units are dropped
+    coord = generate("exposed")
+    assert coord == generate("exposed")
+    positions = np.array(list(generate("random")))
+    buried = ~lattice.exposed_faces(positions).any(axis=1)
+    assert buried.any()
+    assert sorted(coord) == sorted(map(tuple, positions[~buried].tolist()))
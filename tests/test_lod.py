@@ -0,0 +1,30 @@
+"""LOD levels of the spiders and the LOD render mode."""
+import numpy as np
+import pytest
+import pyvista as pv
+
+from xkcd_red_spider import lod, render
+
+
+def test_select_lod_levels():
+    translations = [[0, 0, 0], [0, 40, 0], [0, 0, 100], [500, 0, 0]]
+    np.testing.assert_array_equal(lod.select_lod_levels(translations, (0, 0, 0)), [0, 1, 2, 3])
+
+
+@pytest.mark.parametrize("n_distances", [len(lod.LOD_FRACTIONS) - 1, len(lod.LOD_FRACTIONS) + 1])
+def test_lod_army_needs_one_distance_per_level(n_distances):
+    with pytest.raises(ValueError):
+        render.LodArmy(pv.Plotter(), distances=[10.0 * (i + 1) for i in range(n_distances)])
+
+
+def test_lod_army_switches_levels():
+    plotter = pv.Plotter()
+    army = render.LodArmy(plotter, distances=(1.0, 2.0, 3.0))
+    # Moving the camera updates the levels
+    plotter.camera.position = (0, 0, 1000)
+    np.testing.assert_array_equal(army.level_counts[:-1], 0)
+    plotter.camera.position = (0, 0, 0)
+    assert army.level_counts[0] > 0
+    assert army.level_counts.sum() == len(army.translations)
+    assert army.cloud.point_data["source"].max() < len(lod.get_oriented_spider_lods())
+    plotter.close()
@@ -0,0 +1,146 @@
+"""Picks from ``picking.ArmyIndex`` against the meshes the scene actually draws."""
+import numpy as np
+import pyvista as pv
+import pytest
+from vtkmodules.vtkRenderingCore import vtkCellPicker
+
+from xkcd_red_spider import animate, columnar, picking, render, utils
+from xkcd_red_spider import main as scene
+
+
+WINDOW_SIZE = (320, 240)
+PIXEL_STEP = 4
+
+
+@pytest.fixture(scope="module")
+def index():
+    return picking.ArmyIndex.from_coord()
+
+
+# Rotations that are not multiples of 90 degrees, mixed with ones that are
+ROTATED_COORD = {
+    (0, 0): [("z", 30)],
+    (1, 0): [("x", 90)],
+    (0, 1): [("x", 45), ("y", 10)],
+    (2, 2, 1): None,
+}
+
+
+@pytest.mark.parametrize("spider_army_coord", [None, ROTATED_COORD])
+def test_bounds_match_drawn_meshes(spider_army_coord):
+    index = picking.ArmyIndex.from_coord(spider_army_coord)
+    army = utils.get_xkcd_spider_army(spider_army_coord)
+    assert len(index) == len(army)
+    for unit, meshes in enumerate(army):
+        for part, mesh in enumerate(meshes):
+            assert index.parts[part] == ("spider", "box")[part]
+            np.testing.assert_allclose(index.bounds[unit, part].T.ravel(), mesh.bounds, atol=1e-5)
+
+
+def test_pick_matches_drawn_scene(index):
+    plotter = pv.Plotter(window_size=WINDOW_SIZE)
+    actors = render.add_army_per_unit(plotter)
+    plotter.camera_position = scene.DEFAULT_CAMERA_POSITION
+    plotter.render()
+    camera = np.array(plotter.camera.position)
+    # Exact ray casting against the drawn meshes
+    cell_picker = vtkCellPicker()
+    cell_picker.SetTolerance(0.0)
+
+    n_picked = 0
+    for x in range(0, WINDOW_SIZE[0], PIXEL_STEP):
+        for y in range(0, WINDOW_SIZE[1], PIXEL_STEP):
+            hit = index.pick(plotter.renderer, x, y)
+            if not cell_picker.Pick(x, y, 0, plotter.renderer):
+                # Only the bounding box of a spider is larger than what is drawn
+                assert hit is None or hit.part == "spider", (x, y, hit)
+                continue
+            n_picked += 1
+            drawn = np.array(cell_picker.GetPickPosition())
+            drawn_unit = actors.index(cell_picker.GetActor()) // 2
+            assert hit is not None, (x, y, drawn_unit)
+            # Nothing drawn is in front of the hit, and boxes are hit exactly where drawn
+            assert np.linalg.norm(hit.point - camera) <= np.linalg.norm(drawn - camera) + 1e-6
+            if hit.part == "box":
+                np.testing.assert_allclose(hit.point, drawn, atol=1e-3)
+                np.testing.assert_array_equal(hit.position, index.positions[drawn_unit])
+    assert n_picked > 100
+
+
+def brute_force_ray(index, origin, direction):
+    # Slab test of every part of every unit
+    direction = direction / np.linalg.norm(direction)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        near = (index.bounds[:, :, 0] - origin) / direction
+        far = (index.bounds[:, :, 1] - origin) / direction
+    t_near = np.maximum(np.nanmax(np.minimum(near, far), axis=2), 0.0)
+    t_far = np.nanmin(np.maximum(near, far), axis=2)
+    t_near[t_near > t_far] = np.inf
+    if np.isinf(t_near).all():
+        return None
+    return float(t_near.min())
+
+
+@pytest.mark.parametrize("cell_size", [1.0, 0.7, 2.5])
+def test_ray_matches_brute_force(cell_size):
+    army = columnar.generate_random_army(300, x_range=8, y_range=8, z_range=3, seed=0)
+    index = picking.ArmyIndex.from_army(army, cell_size=cell_size)
+    rng = np.random.default_rng(1)
+    n_hits = 0
+    for _ in range(300):
+        origin = rng.uniform(-15, 15, 3)
+        # Aim at a unit most of the time, and along the lattice axes some of the time
+        target = index.positions[rng.integers(len(index))] + rng.uniform(-1, 1, 3)
+        direction = target - origin
+        if rng.random() < 0.2:
+            direction = np.where(np.abs(direction) == np.abs(direction).max(), direction, 0.0)
+        hit = index.ray(origin, direction)
+        expected = brute_force_ray(index, origin, direction)
+        if expected is None:
+            assert hit is None
+            continue
+        n_hits += 1
+        assert hit is not None
+        assert hit.distance == pytest.approx(expected, abs=1e-9)
+        lower, upper = index.bounds[hit.unit, index.parts.index(hit.part)]
+        assert np.all(np.array(hit.point) >= lower - 1e-9)
+        assert np.all(np.array(hit.point) <= upper + 1e-9)
+    assert n_hits > 100
+
+
+def test_ray_limits():
+    index = picking.ArmyIndex([[0, 0, 0]], parts=["box"])
+    assert index.ray((0, -5, 0), (0, 1, 0)).distance == pytest.approx(4.5)
+    assert index.ray((0, -5, 0), (0, 1, 0), max_distance=4.0) is None
+    assert index.ray((0, -5, 0), (0, -1, 0)) is None
+    assert index.ray((0, 0, 0), (1, 1, 1)).distance == 0.0
+    with pytest.raises(ValueError):
+        index.ray((0, 0, 0), (0, 0, 0))
+    assert picking.ArmyIndex(np.zeros((0, 3))).ray((0, 0, 0), (1, 0, 0)) is None
+
+
+def test_rotated_hits():
+    index = picking.ArmyIndex.from_coord(ROTATED_COORD)
+    assert index.orientations[0] == index.orientations[2] == -1
+    hit = index.ray((0, -5, 0), (0, 1, 0))
+    assert (hit.unit, hit.orientation) == (0, None)
+    assert picking.format_hit(hit).endswith("rotated")
+    assert index.ray((1, -5, 0), (0, 1, 0)).orientation == index.orientations[1] >= 0
+    with pytest.raises(ValueError):
+        picking.ArmyIndex([[0, 0, 0]], [-1])
+
+
+@pytest.mark.parametrize("render_mode", ["per_unit", "merged"])
+def test_picker_and_frame_rate_counter_share_the_window(render_mode):
+    plotter = pv.Plotter(window_size=WINDOW_SIZE)
+    scene.main(plotter=plotter, render_mode=render_mode, spider_army_coord=ROTATED_COORD)
+    plotter.camera_position = [(0, -10, 0), (0, 0, 0), (0, 0, 1)]
+    picker = picking.UnitPicker(plotter, picking.ArmyIndex.from_coord(ROTATED_COORD))
+    counter = animate.FrameRateCounter(plotter)
+    plotter.render()
+    counter.update()
+    assert picker.pick(*plotter.renderer.GetCenter()) is not None
+    # Each text stays in its own corner
+    assert picker.text_actor.GetText(1) == picking.format_hit(picker.hit)
+    assert counter.text_actor.GetText(3).endswith("fps")
+    plotter.close()
@@ -0,0 +1,41 @@
+"""Every render mode draws the same scene as the reference ``"per_unit"`` mode."""
+import numpy as np
+import pytest
+import pyvista as pv
+
+from xkcd_red_spider import main as scene
+from xkcd_red_spider.render import RENDER_MODES
+
+
+WINDOW_SIZE = (640, 480)
+# Edges of the merged box surface and the chunk counter of "chunked" differ from "per_unit" by a
+# mean of about 1.5 levels; units drawn in the wrong place differ by about 10.
+MAX_MEAN_DIFFERENCE = 2.0
+MAX_CHANGED_FRACTION = 0.02
+
+
+def screenshot(render_mode):
+    plotter = pv.Plotter(window_size=WINDOW_SIZE)
+    scene.main(plotter=plotter, render_mode=render_mode)
+    plotter.camera_position = scene.DEFAULT_CAMERA_POSITION
+    image = plotter.screenshot(return_img=True).astype(float)
+    plotter.close()
+    return image
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return screenshot("per_unit")
+
+
+@pytest.mark.parametrize("render_mode", [mode for mode in RENDER_MODES if mode != "per_unit"])
+def test_render_mode_matches_per_unit(reference, render_mode):
+    difference = np.abs(screenshot(render_mode) - reference)
+    assert difference.mean() < MAX_MEAN_DIFFERENCE
+    assert (difference.max(axis=2) > 30).mean() < MAX_CHANGED_FRACTION
+
+
+def test_scene_is_drawn(reference):
+    # Guards the parity checks against comparing empty frames
+    background = reference[0, 0]
+    assert (np.abs(reference - background).max(axis=2) > 30).mean() > 0.05
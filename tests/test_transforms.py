@@ -0,0 +1,91 @@
+"""Rotation steps, orientation indices and batched transforms against pyvista's own transforms."""
+import numpy as np
+import pytest
+
+from xkcd_red_spider import transforms, utils
+from xkcd_red_spider.assets import ASSETS
+
+
+STEP_LISTS = [
+    None,
+    [("x", 90)],
+    [("z", -90), ("y", 180)],
+    [("x", 90), ("z", 180), ("y", -90)],
+    [("y", 30), ("x", 45)],
+]
+
+
+def rotate_with_pyvista(mesh, rotation):
+    for axis, angle in rotation or []:
+        getattr(mesh, f"rotate_{axis}")(angle, inplace=True)
+    return mesh
+
+
+@pytest.mark.parametrize("rotation", STEP_LISTS)
+def test_rotation_matrix_matches_pyvista(rotation):
+    spider = ASSETS.get("spider")
+    expected = rotate_with_pyvista(spider.copy(), rotation).points
+    np.testing.assert_allclose(
+        spider.points @ transforms.rotation_matrix(rotation).T, expected, atol=1e-5
+    )
+
+
+def test_cube_rotations():
+    rotations = transforms.CUBE_ROTATIONS
+    assert len(rotations) == 24
+    assert len({rotation.tobytes() for rotation in rotations}) == 24
+    np.testing.assert_array_equal(rotations[0], np.eye(3))
+    for rotation in rotations:
+        np.testing.assert_array_equal(rotation @ rotation.T, np.eye(3))
+        assert round(np.linalg.det(rotation)) == 1
+
+
+def test_orientation_steps_round_trip():
+    assert transforms.ORIENTATION_STEPS[0] is None
+    for index, steps in enumerate(transforms.ORIENTATION_STEPS):
+        assert transforms.orientation_index(steps) == index
+    assert transforms.orientation_index([("x", 45)]) is None
+    assert transforms.orientation_indices([[("x", 90)], [("y", 10)]]) is None
+    np.testing.assert_array_equal(
+        transforms.orientation_indices([None, [("x", 90), ("x", -90)], [("z", 90)]]),
+        [0, 0, transforms.orientation_index([("z", 90)])],
+    )
+
+
+def test_oriented_points():
+    points = np.random.default_rng(0).random((10, 3))
+    oriented = transforms.oriented_points(points)
+    for index, steps in enumerate(transforms.ORIENTATION_STEPS):
+        np.testing.assert_allclose(
+            oriented[index], points @ transforms.rotation_matrix(steps).T, atol=1e-12
+        )
+
+
+@pytest.mark.parametrize("rotation", STEP_LISTS)
+def test_unit_cell_is_placed(rotation):
+    # The meshes of a unit are scaled, rotated and translated, as the batched transforms are
+    translation, scale = [3, -2, 1], 0.5
+    template = ASSETS.get("spider")
+    spider, box = utils.process_spider_box_unit_cell(
+        scale=scale, rotation=rotation, translation=translation
+    )
+    transform = transforms.compose_transform(scale, rotation, translation)
+    (spider_points,) = transforms.transform_points(template.points, transform[None])
+    np.testing.assert_allclose(spider.points, spider_points, atol=1e-5)
+    np.testing.assert_allclose(box.center, translation, atol=1e-6)
+    np.testing.assert_allclose(np.ptp(box.points, axis=0), [scale] * 3, atol=1e-6)
+
+
+def test_compose_transforms_matches_compose_transform():
+    rng = np.random.default_rng(1)
+    orientations = rng.integers(0, 24, 8)
+    scales = rng.random(8) + 0.5
+    translations = rng.integers(-5, 5, (8, 3))
+    stacked = transforms.compose_transforms(
+        scales, transforms.CUBE_ROTATIONS[orientations].astype(float), translations
+    )
+    for i, orientation in enumerate(orientations):
+        expected = transforms.compose_transform(
+            scales[i], transforms.ORIENTATION_STEPS[orientation], translations[i]
+        )
+        np.testing.assert_allclose(stacked[i], expected, atol=1e-12)
@@ -0,0 +1,368 @@
+"""Animate the army by rewriting the points of one persistent mesh in place.
+
+:class:`AnimatedArmy` draws every spider, box and box edge with one actor, like the ``"merged"``
+render mode, and keeps per-unit views into the points of that mesh: ``(N, P, 3)`` for the spiders
+and ``(N, 8, 3)`` for the boxes, both in the one float32 buffer VTK draws from. A frame writes the
+new positions and orientations into those views with vectorized numpy operations and marks the
+points modified. No mesh, array or actor is created after the army is built, so a frame costs
+the numpy writes and the upload of the points to the GPU.
+
+Motions are callables ``motion(army, frame)`` that move the army for one frame, e.g.
+:func:`march`, :func:`cometh` or :func:`crawl`::
+
+    army = AnimatedArmy(plotter, positions, orientations)
+    FrameRateCounter(plotter)
+    army.play(crawl(), n_frames=600)
+    plotter.show()
+
+To watch 10,000 spiders crawl around their boxes::
+    python -m xkcd_red_spider.animate --n-units 10000 --motion crawl
+"""
+import argparse
+import time
+from collections import deque
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+from xkcd_red_spider.army import merge_copies, merge_parts, polygon_edges
+from xkcd_red_spider.assets import ASSETS
+from xkcd_red_spider.columnar import generate_random_army
+from xkcd_red_spider.lod import get_spider_lods
+from xkcd_red_spider.render import add_unit_mesh, unit_lookup_table
+from xkcd_red_spider.transforms import CUBE_ROTATIONS, axis_rotation_matrix, oriented_points
+
+
+# LOD level of the animated spiders; the 5% spider keeps 10,000 moving units interactive.
+ANIMATION_LOD_LEVEL = 2
+FRAME_INTERVAL_MS = 16
+# Number of frames the frame rate is averaged over.
+FPS_WINDOW = 30
+
+Motion = Callable[["AnimatedArmy", int], None]
+
+
+class AnimatedArmy:
+    """Army drawn by a single actor whose points are moved in place every frame.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        orientations (np.ndarray, optional): ``(N,)`` orientation indices of the spiders (see
+            ``xkcd_red_spider.transforms.CUBE_ROTATIONS``). Defaults to None, which stands every
+            spider on top of its box.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        lod_level (int, optional): level of the spider LOD pyramid to animate. Every frame
+            rewrites all the spider points, so the full spider (level 0) only suits small
+            armies. Defaults to ``ANIMATION_LOD_LEVEL``.
+    """
+
+    def __init__(
+        self,
+        plotter: pv.Plotter,
+        translations: np.ndarray,
+        orientations: Optional[np.ndarray] = None,
+        color_spider: str = "red",
+        color_box: str = "tan",
+        lod_level: int = ANIMATION_LOD_LEVEL,
+    ) -> None:
+        translations = np.asarray(translations, dtype=np.float32).reshape(-1, 3)
+        n_units = len(translations)
+        self.plotter = plotter
+        self.spider_translations = translations.copy()
+        self.box_translations = translations.copy()
+        if orientations is None:
+            self.orientations = np.zeros(n_units, dtype=np.intp)
+        else:
+            self.orientations = np.asarray(orientations, dtype=np.intp).copy()
+
+        spider, box = get_spider_lods()[lod_level], ASSETS.template("box")
+        # The spiders are placed by one matmul writing straight into their points: row i of
+        # ``[one_hot(orientation) | translation]`` times ``[oriented spiders; tiled identity]``
+        # is spider i. An (N, P, 3) += (N, 1, 3) broadcast is 3x slower, since numpy's inner
+        # loop would only run over the 3 coordinates.
+        oriented = oriented_points(np.asarray(spider.points, dtype=np.float32))
+        tiled_identity = np.tile(np.eye(3, dtype=np.float32), spider.n_points)
+        self._spider_basis = np.vstack([oriented.reshape(len(CUBE_ROTATIONS), -1), tiled_identity])
+        self._spider_coefficients = np.zeros((n_units, len(CUBE_ROTATIONS) + 3), dtype=np.float32)
+        self._box_points = np.asarray(box.points, dtype=np.float32)
+        spiders = merge_copies(spider, np.zeros((n_units, spider.n_points, 3), np.float32))
+        boxes = merge_copies(box, np.zeros((n_units, box.n_points, 3), np.float32))
+        self.mesh = merge_parts([spiders, boxes, polygon_edges(boxes)])
+
+        # merge_parts puts all the spider points first, then all the box points
+        points = vtk_to_numpy(self.mesh.GetPoints().GetData())
+        n_spider_points = n_units * spider.n_points
+        self.spider_points = points[:n_spider_points].reshape(n_units, spider.n_points, 3)
+        self.box_points = points[n_spider_points:].reshape(n_units, box.n_points, 3)
+        self.move_spiders()
+        self.move_boxes()
+
+        lookup_table = unit_lookup_table(color_spider, color_box)
+        self.actor = add_unit_mesh(plotter, self.mesh, lookup_table, name="animated_army")
+
+    @property
+    def n_units(self) -> int:
+        """int: number of units."""
+        return len(self.orientations)
+
+    def move_spiders(
+        self, translations: Optional[np.ndarray] = None, orientations: Optional[np.ndarray] = None
+    ) -> None:
+        """Place every spider at a new position and orientation.
+
+        Args:
+            translations (np.ndarray, optional): ``(N, 3)`` positions. Defaults to None, which
+                keeps the current ones.
+            orientations (np.ndarray, optional): ``(N,)`` orientation indices. Defaults to None,
+                which keeps the current ones.
+        """
+        if translations is not None:
+            self.spider_translations[...] = translations
+        if orientations is not None:
+            self.orientations[...] = orientations
+        coefficients = self._spider_coefficients
+        coefficients[:, : len(CUBE_ROTATIONS)] = 0.0
+        coefficients[np.arange(self.n_units), self.orientations] = 1.0
+        coefficients[:, len(CUBE_ROTATIONS) :] = self.spider_translations
+        np.matmul(
+            coefficients, self._spider_basis, out=self.spider_points.reshape(self.n_units, -1)
+        )
+        self.modified()
+
+    def move_boxes(self, translations: Optional[np.ndarray] = None) -> None:
+        """Place every box at a new position.
+
+        Args:
+            translations (np.ndarray, optional): ``(N, 3)`` positions. Defaults to None, which
+                keeps the current ones.
+        """
+        if translations is not None:
+            self.box_translations[...] = translations
+        np.add(self._box_points, self.box_translations[:, None, :], out=self.box_points)
+        self.modified()
+
+    def translate(self, offset: Sequence[float]) -> None:
+        """Move the whole army, spiders and boxes, by the same offset.
+
+        This is a single pass over the points, cheaper than :meth:`move_spiders` and
+        :meth:`move_boxes`.
+
+        Args:
+            offset (Sequence[float]): length of 3 offset.
+        """
+        offset = np.asarray(offset, dtype=np.float32)
+        self.spider_translations += offset
+        self.box_translations += offset
+        # Tiled across whole rows, so the inner loop runs over all the points of a unit
+        for points in (self.spider_points, self.box_points):
+            rows = points.reshape(self.n_units, -1)
+            rows += np.tile(offset, points.shape[1])
+        self.modified()
+
+    def modified(self) -> None:
+        """Mark the points modified, so they are uploaded again before the next frame."""
+        self.mesh.GetPoints().Modified()
+
+    def play(self, motion: Motion, n_frames: int, interval: int = FRAME_INTERVAL_MS) -> None:
+        """Play a motion in the window, one frame every ``interval`` ms, once it is shown.
+
+        Args:
+            motion (Motion): callable moving the army for a frame.
+            n_frames (int): number of frames to play.
+            interval (int, optional): milliseconds between two frames. Defaults to
+                ``FRAME_INTERVAL_MS``.
+        """
+        if self.plotter.iren is None:
+            raise ValueError("Playing needs a plotter with an interactor, use run() off screen")
+        self.plotter.add_timer_event(n_frames, interval, lambda frame: motion(self, frame))
+
+    def run(self, motion: Motion, n_frames: int, write_frames: bool = False) -> float:
+        """Play a motion as fast as possible, e.g. off screen or into a movie.
+
+        Args:
+            motion (Motion): callable moving the army for a frame.
+            n_frames (int): number of frames to play.
+            write_frames (bool, optional): whether or not to write every frame to the movie
+                opened with ``plotter.open_movie`` or ``plotter.open_gif``. Defaults to False.
+
+        Returns:
+            float: frames per second, rendering included.
+        """
+        start = time.perf_counter()
+        for frame in range(n_frames):
+            motion(self, frame)
+            if write_frames:
+                self.plotter.write_frame()
+            else:
+                self.plotter.ren_win.Render()
+        return n_frames / (time.perf_counter() - start)
+
+
+class FrameRateCounter:
+    """Frames per second of a plotter, shown in the upper right corner.
+
+    Every render of the plotter counts as a frame, and the rate is averaged over the last
+    ``n_frames`` frames.
+
+    Args:
+        plotter (pv.Plotter): plotter to count the frames of.
+        n_frames (int, optional): number of frames to average over. Defaults to
+            ``FPS_WINDOW``.
+    """
+
+    def __init__(self, plotter: pv.Plotter, n_frames: int = FPS_WINDOW) -> None:
+        self.times = deque(maxlen=n_frames)
+        self.text_actor = plotter.add_text("", position="upper_right", font_size=10)
+        plotter.renderer.AddObserver("EndEvent", self.update)
+
+    def update(self, *args) -> None:
+        """Count a frame and show the current rate."""
+        self.times.append(time.perf_counter())
+        self.text_actor.SetText(3, f"{self.fps:.1f} fps")
+
+    @property
+    def fps(self) -> float:
+        """float: frames per second over the last frames, 0 until two frames were drawn."""
+        if len(self.times) < 2 or self.times[-1] == self.times[0]:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+
+def march(velocity: Sequence[float] = (0.05, 0.0, 0.0)) -> Motion:
+    """Motion moving the whole army in a straight line.
+
+    Args:
+        velocity (Sequence[float], optional): offset per frame. Defaults to ``(0.05, 0, 0)``.
+
+    Returns:
+        Motion: the motion.
+    """
+
+    def step(army: AnimatedArmy, frame: int) -> None:
+        army.translate(velocity)
+
+    return step
+
+
+def cometh(
+    height: float = 10.0, n_frames: int = 120, stagger: float = 0.5, seed: Optional[int] = 0
+) -> Motion:
+    """Motion dropping every unit from the sky onto its position, easing out as it lands.
+
+    Args:
+        height (float, optional): height the units start from. Defaults to 10.0.
+        n_frames (int, optional): number of frames of the whole descent. Defaults to 120.
+        stagger (float, optional): largest delay of a unit, as a fraction of ``n_frames``.
+            Defaults to 0.5.
+        seed (int, optional): seed of the delays. Defaults to 0.
+
+    Returns:
+        Motion: the motion; the first frame records the landing positions.
+    """
+    state = {}
+
+    def step(army: AnimatedArmy, frame: int) -> None:
+        if not state:
+            rng = np.random.default_rng(seed)
+            state["home"] = army.box_translations.copy()
+            state["delays"] = rng.uniform(0, stagger, army.n_units).astype(np.float32)
+            state["positions"] = army.box_translations.copy()
+        duration = 1.0 - stagger
+        progress = np.clip((frame / n_frames - state["delays"]) / duration, 0.0, 1.0)
+        positions = state["positions"]
+        positions[:, 2] = state["home"][:, 2] + height * (1.0 - progress) ** 2
+        army.move_boxes(positions)
+        army.move_spiders(positions)
+
+    return step
+
+
+def _crawl_tables():
+    # Orientation of a spider that crawled k quarter turns about its own y axis, and the
+    # direction it crawls in, the spider's x axis
+    orientations = np.empty((len(CUBE_ROTATIONS), 4), dtype=np.intp)
+    directions = np.empty((len(CUBE_ROTATIONS), 4, 3), dtype=np.float32)
+    for i, rotation in enumerate(CUBE_ROTATIONS):
+        for turn in range(4):
+            matrix = np.rint(rotation @ axis_rotation_matrix("y", 90 * turn)).astype(np.int8)
+            orientations[i, turn] = np.flatnonzero((CUBE_ROTATIONS == matrix).all(axis=(1, 2)))[0]
+            directions[i, turn] = matrix[:, 0]
+    return orientations, directions
+
+
+def crawl(speed: float = 0.02, stride: float = 0.3, seed: Optional[int] = 0) -> Motion:
+    """Motion making every spider crawl around its box, over one face after another.
+
+    A spider crosses its face along its own x axis, then steps over the edge onto the next face.
+
+    Args:
+        speed (float, optional): faces crossed per frame. Defaults to 0.02.
+        stride (float, optional): distance crossed on each face. Defaults to 0.3.
+        seed (int, optional): seed of the starting point of each spider. Defaults to 0.
+
+    Returns:
+        Motion: the motion; the first frame records the starting orientations.
+    """
+    orientations, directions = _crawl_tables()
+    state = {}
+
+    def step(army: AnimatedArmy, frame: int) -> None:
+        if not state:
+            state["start"] = army.orientations.copy()
+            state["phases"] = np.random.default_rng(seed).uniform(0, 4, army.n_units)
+        phase = state["phases"] + frame * speed
+        turn = phase.astype(np.intp) % 4
+        across = (phase % 1.0 - 0.5).astype(np.float32) * stride
+        offsets = directions[state["start"], turn] * across[:, None]
+        army.move_spiders(army.box_translations + offsets, orientations[state["start"], turn])
+
+    return step
+
+
+MOTIONS = {"march": march, "cometh": cometh, "crawl": crawl}
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the animation demo.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Animate a random spider army.")
+    parser.add_argument("--n-units", type=int, default=10_000)
+    parser.add_argument("--motion", choices=sorted(MOTIONS), default="crawl")
+    parser.add_argument("--n-frames", type=int, default=1_000)
+    parser.add_argument("--lod-level", type=int, default=ANIMATION_LOD_LEVEL)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> pv.Plotter:
+    """Open a window animating a random army, with its frame rate.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        pv.Plotter: the plotter, once the window is closed.
+    """
+    args = parse_args(argv)
+    side = int(np.ceil(np.cbrt(args.n_units * 8))) // 2
+    army = generate_random_army(args.n_units, side, side, side, seed=args.seed)
+    plotter = pv.Plotter()
+    animated = AnimatedArmy(plotter, army.positions, army.orientations, lod_level=args.lod_level)
+    FrameRateCounter(plotter)
+    animated.play(MOTIONS[args.motion](), args.n_frames)
+    plotter.show()
+    return plotter
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+"""Vectorized builder that turns a whole spider army into one merged spider mesh and one merged box
+mesh.
+
+Instead of transforming one ``pv.PolyData`` per unit, the template points are transformed for all
+units at once with numpy and written into a single preallocated points buffer, and the template
+cell connectivity is tiled into a single preallocated offsets/connectivity buffer that is handed
+to VTK without copying. With ``n_workers``, blocks of units are transformed and tiled by a pool of
+processes, each writing straight into one shared memory buffer (see
+:func:`merge_transformed_shared`). :func:`build_unit_army_mesh` merges spiders, boxes and box
+edges further into a single mesh, drawn with one actor colored through a lookup table.
+"""
+import mmap
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from multiprocessing.pool import Pool
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+
+from xkcd_red_spider.lattice import box_surface
+from xkcd_red_spider.transforms import (
+    CUBE_ROTATIONS,
+    compose_transforms,
+    orientation_indices,
+    rotation_matrices,
+    transform_points,
+)
+from xkcd_red_spider.utils import ASSETS, get_spider_army_units
+
+
+# Largest block of copies written by one task of ``merge_transformed_shared``.
+SHARED_BLOCK_UNITS = 1024
+
+_ALIGNMENT = 64
+
+# Parts of the merged unit cell, in the order of the values of its ``PART_ARRAY`` cell array.
+UNIT_PARTS = ("spider", "box", "edges")
+PART_ARRAY = "part"
+
+
+def cell_index_mask(cells: np.ndarray) -> np.ndarray:
+    """Return a mask of the point-index entries in a flat ``[n, i0, i1, ..., n, i0, ...]`` cell
+    array, i.e. every entry that is not a cell size.
+
+    Args:
+        cells (np.ndarray): flat cell connectivity array, as in ``pv.PolyData.faces``.
+
+    Returns:
+        np.ndarray: boolean mask, True for point indices.
+    """
+    mask = np.ones(len(cells), dtype=bool)
+    stride = cells[0] + 1 if len(cells) else 1
+    if len(cells) % stride == 0 and np.all(cells[::stride] == cells[0]):
+        mask[::stride] = False  # fast path: every cell has the same size, e.g. all triangles
+        return mask
+    i = 0
+    while i < len(cells):
+        mask[i] = False
+        i += cells[i] + 1
+    return mask
+
+
+def cell_offsets_connectivity(cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Split a flat ``[n, i0, i1, ...]`` cell array into VTK offsets and connectivity arrays.
+
+    Args:
+        cells (np.ndarray): flat cell connectivity array, as in ``pv.PolyData.faces``.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ``(n_cells + 1,)`` offsets and the point indices of all
+        cells.
+    """
+    index_mask = cell_index_mask(cells)
+    offsets = np.zeros(len(cells) - index_mask.sum() + 1, dtype=np.int64)
+    np.cumsum(cells[~index_mask], out=offsets[1:])
+    return offsets, cells[index_mask]
+
+
+def index_dtype(n_points: int, n_indices: int) -> np.dtype:
+    """Pick the dtype of tiled cell arrays: 32-bit indices when they fit, 64-bit otherwise.
+
+    Args:
+        n_points (int): number of points of all copies.
+        n_indices (int): number of point indices of all copies.
+
+    Returns:
+        np.dtype: ``np.int32`` or ``np.int64``.
+    """
+    return np.dtype(np.int64 if max(n_points, n_indices) >= np.iinfo(np.int32).max else np.int32)
+
+
+def tile_cells(
+    offsets: np.ndarray,
+    connectivity: np.ndarray,
+    n_points: int,
+    n_copies: int,
+    first_copy: int = 0,
+    out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Tile template cells for ``n_copies`` copies of the same template.
+
+    The output buffers are allocated once, and use 32-bit indices when they fit.
+
+    Args:
+        offsets (np.ndarray): ``(n_cells + 1,)`` offsets of the template cells.
+        connectivity (np.ndarray): point indices of the template cells.
+        n_points (int): number of points in the template.
+        n_copies (int): number of copies.
+        first_copy (int, optional): index of the first copy, to fill one block of a larger set
+            of copies. Defaults to 0.
+        out (Tuple[np.ndarray, np.ndarray], optional): preallocated ``(n_copies * n_cells + 1,)``
+            offsets and ``(n_copies * n_indices,)`` connectivity buffers. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: offsets and connectivity of all copies, with the point
+        indices of copy ``k`` offset by ``k * n_points``.
+    """
+    n_cells, n_indices = len(offsets) - 1, len(connectivity)
+    if out is None:
+        n_total = first_copy + n_copies
+        dtype = index_dtype(n_total * n_points, n_total * n_indices)
+        out = np.empty(n_copies * n_cells + 1, dtype=dtype), np.empty(n_copies * n_indices, dtype)
+    tiled_offsets, tiled_connectivity = out
+    dtype = tiled_offsets.dtype
+    copies = np.arange(first_copy, first_copy + n_copies, dtype=dtype)[:, None]
+
+    np.add(
+        offsets[:-1].astype(dtype),
+        copies * n_indices,
+        out=tiled_offsets[:-1].reshape(n_copies, n_cells),
+    )
+    tiled_offsets[-1] = (first_copy + n_copies) * n_indices
+
+    np.add(
+        connectivity.astype(dtype),
+        copies * n_points,
+        out=tiled_connectivity.reshape(n_copies, n_indices),
+    )
+    return tiled_offsets, tiled_connectivity
+
+
+def to_vtk_cell_array(offsets: np.ndarray, connectivity: np.ndarray) -> vtkCellArray:
+    """Wrap offsets and connectivity arrays as a ``vtkCellArray`` without copying them.
+
+    Args:
+        offsets (np.ndarray): ``(n_cells + 1,)`` offsets.
+        connectivity (np.ndarray): point indices of all cells, same dtype as ``offsets``.
+
+    Returns:
+        vtkCellArray: cell array sharing memory with the numpy arrays.
+    """
+    cell_array = vtkCellArray()
+    cell_array.SetData(numpy_to_vtk(offsets, deep=False), numpy_to_vtk(connectivity, deep=False))
+    return cell_array
+
+
+def merge_copies(template: pv.PolyData, points: np.ndarray) -> pv.PolyData:
+    """Build one mesh from per-copy point blocks that all share the connectivity of ``template``.
+
+    Args:
+        template (pv.PolyData): template mesh.
+        points (np.ndarray): ``(N, P, 3)`` points, one block of ``P`` points per copy. The buffer
+            becomes the points of the returned mesh without being copied.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing all copies.
+    """
+    n_copies, n_points = points.shape[:2]
+    mesh = pv.PolyData()
+    mesh.points = points.reshape(-1, 3)
+    for key, setter in (
+        ("verts", mesh.SetVerts),
+        ("lines", mesh.SetLines),
+        ("faces", mesh.SetPolys),
+    ):
+        cells = np.asarray(getattr(template, key))
+        if cells.size:
+            offsets, connectivity = cell_offsets_connectivity(cells)
+            setter(to_vtk_cell_array(*tile_cells(offsets, connectivity, n_points, n_copies)))
+    return mesh
+
+
+def merge_transformed(template: pv.PolyData, transforms: np.ndarray) -> pv.PolyData:
+    """Build one mesh holding a transformed copy of ``template`` per 4x4 transform.
+
+    Args:
+        template (pv.PolyData): template mesh.
+        transforms (np.ndarray): ``(N, 4, 4)`` transform matrices.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing all transformed copies.
+    """
+    template_points = np.asarray(template.points)
+    points = np.empty((len(transforms), len(template_points), 3), dtype=np.float32)
+    return merge_copies(template, transform_points(template_points, transforms, out=points))
+
+
+def army_pool(n_workers: Optional[int] = None) -> Pool:
+    """Start a pool of worker processes for :func:`merge_transformed_shared`.
+
+    Workers are spawned, and import numpy and pyvista on start up, so reuse one pool across
+    builds rather than starting one per build.
+
+    Args:
+        n_workers (int, optional): number of worker processes. Defaults to None, which uses one
+            per CPU core.
+
+    Returns:
+        Pool: the pool; use it as a context manager to terminate it.
+    """
+    return multiprocessing.get_context("spawn").Pool(n_workers or os.cpu_count() or 1)
+
+
+def _template_cells(template: pv.PolyData) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    cells = {}
+    for key in ("verts", "lines", "faces"):
+        flat = np.asarray(getattr(template, key))
+        if flat.size:
+            cells[key] = cell_offsets_connectivity(flat)
+    return cells
+
+
+def _shared_layout(
+    n_points: int, cells: Dict[str, Tuple[np.ndarray, np.ndarray]], n_copies: int
+) -> Tuple[Dict[str, Tuple[int, str, Tuple[int, ...]]], int]:
+    columns = [("points", np.dtype(np.float32), (n_copies * n_points, 3))]
+    for key, (offsets, connectivity) in cells.items():
+        dtype = index_dtype(n_copies * n_points, n_copies * len(connectivity))
+        columns.append((f"{key}_offsets", dtype, (n_copies * (len(offsets) - 1) + 1,)))
+        columns.append((f"{key}_connectivity", dtype, (n_copies * len(connectivity),)))
+    layout, size = {}, 0
+    for name, dtype, shape in columns:
+        layout[name] = (size, dtype.str, shape)
+        size = -(-(size + int(np.prod(shape)) * dtype.itemsize) // _ALIGNMENT) * _ALIGNMENT
+    return layout, size
+
+
+def _shared_views(buffer, layout: Dict[str, Tuple[int, str, Tuple[int, ...]]]) -> Dict:
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        for name, (offset, dtype, shape) in layout.items()
+    }
+
+
+def _write_copies(buffer, layout, template_points, cells, first_copy, transforms) -> None:
+    views = _shared_views(buffer, layout)
+    n_points, stop = len(template_points), first_copy + len(transforms)
+    points = views["points"][first_copy * n_points : stop * n_points].reshape(-1, n_points, 3)
+    transform_points(template_points, transforms, out=points)
+    for key, (offsets, connectivity) in cells.items():
+        n_cells, n_indices = len(offsets) - 1, len(connectivity)
+        out = (
+            views[f"{key}_offsets"][first_copy * n_cells : stop * n_cells + 1],
+            views[f"{key}_connectivity"][first_copy * n_indices : stop * n_indices],
+        )
+        tile_cells(offsets, connectivity, n_points, len(transforms), first_copy, out)
+
+
+def _fill_copies(task: tuple) -> None:
+    name, *args = task
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # every view of the buffer is gone once _write_copies returns, so it can be closed
+        _write_copies(shm.buf, *args)
+    finally:
+        shm.close()
+
+
+def _map_privately(shm: shared_memory.SharedMemory) -> Union[mmap.mmap, bytearray]:
+    # A second mapping of the segment, owned by the arrays built on top of it: the memory is
+    # released with the last of them, however long the mesh lives. ``shm.buf`` cannot back them,
+    # as ``shm.close()`` fails while arrays still hold it.
+    if os.name == "nt":
+        return mmap.mmap(-1, shm.size, tagname=shm.name)
+    # Linux keeps POSIX shared memory segments as files in /dev/shm
+    path = os.path.join("/dev/shm", shm.name.lstrip("/"))
+    if os.path.exists(path):
+        with open(path, "r+b") as f:
+            return mmap.mmap(f.fileno(), shm.size)
+    # Elsewhere (e.g. macOS) the segment has no path to map it again from
+    return bytearray(shm.buf)
+
+
+def merge_transformed_shared(
+    template: pv.PolyData, transforms: np.ndarray, pool: Pool
+) -> pv.PolyData:
+    """Parallel version of :func:`merge_transformed`.
+
+    The points and cell arrays of all copies are preallocated in one shared memory segment.
+    Each worker transforms a block of copies and writes its points and cells straight into the
+    segment at the offsets of that block. The returned mesh wraps the segment without copying it.
+
+    Args:
+        template (pv.PolyData): template mesh.
+        transforms (np.ndarray): ``(N, 4, 4)`` transform matrices.
+        pool (Pool): worker processes, see :func:`army_pool`.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing all transformed copies.
+    """
+    n_copies = len(transforms)
+    if not n_copies:
+        return merge_transformed(template, transforms)
+    template_points = np.asarray(template.points, dtype=np.float32)
+    cells = _template_cells(template)
+    layout, size = _shared_layout(len(template_points), cells, n_copies)
+    # about 4 blocks per core, to even out the load, and no more than SHARED_BLOCK_UNITS copies
+    block = min(SHARED_BLOCK_UNITS, -(-n_copies // (4 * (os.cpu_count() or 1))))
+
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        tasks = [
+            (shm.name, layout, template_points, cells, start, transforms[start : start + block])
+            for start in range(0, n_copies, block)
+        ]
+        for _ in pool.imap_unordered(_fill_copies, tasks):
+            pass
+        buffer = _map_privately(shm)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    views = _shared_views(buffer, layout)
+    mesh = pv.PolyData()
+    mesh.SetPoints(pv.vtk_points(views["points"], deep=False))
+    for key, setter in (
+        ("verts", mesh.SetVerts),
+        ("lines", mesh.SetLines),
+        ("faces", mesh.SetPolys),
+    ):
+        if key in cells:
+            setter(to_vtk_cell_array(views[f"{key}_offsets"], views[f"{key}_connectivity"]))
+    return mesh
+
+
+def get_box_surface_mesh(positions: np.ndarray) -> pv.PolyData:
+    """Build the boxes of an army as one surface mesh, with the faces between touching boxes
+    removed.
+
+    Args:
+        positions (np.ndarray): ``(N, 3)`` box positions on the integer lattice.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing the exposed quads of all boxes.
+    """
+    points, quads = box_surface(positions)
+    offsets = np.arange(0, quads.size + 1, 4, dtype=np.int64)
+    mesh = pv.PolyData()
+    mesh.points = points
+    mesh.SetPolys(to_vtk_cell_array(offsets, quads.reshape(-1)))
+    return mesh
+
+
+def build_army_mesh(
+    translations: np.ndarray,
+    rotations: Union[np.ndarray, Sequence[Optional[List[Tuple[str, float]]]], None] = None,
+    scales: Union[float, np.ndarray] = 1.0,
+    spider: Optional[pv.PolyData] = None,
+    box: Optional[pv.PolyData] = None,
+    orientations: Optional[np.ndarray] = None,
+    cull_hidden_faces: bool = False,
+    n_workers: Optional[int] = 1,
+    pool: Optional[Pool] = None,
+) -> Tuple[pv.PolyData, pv.PolyData]:
+    """Build a whole army as one merged spider mesh and one merged box mesh.
+
+    Each unit is transformed like ``process_spider_box_unit_cell``: the spider is scaled, rotated
+    and translated, and the box is scaled and translated. When every rotation is a multiple of 90
+    degrees the rotation is looked up in ``CUBE_ROTATIONS`` instead of being composed step by step.
+
+    Args:
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        rotations (Union[np.ndarray, Sequence[List[Tuple[str, float]]]], optional): ``(N, 3, 3)``
+            rotation matrices, or one list of rotation steps (or None) per unit. Defaults to None.
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+        spider (pv.PolyData, optional): spider template. Defaults to None, which uses the
+            ``"spider"`` template from ``ASSETS``.
+        box (pv.PolyData, optional): box template. Defaults to None, which uses the ``"box"``
+            template from ``ASSETS``.
+        orientations (np.ndarray, optional): ``(N,)`` orientation indices (see
+            ``xkcd_red_spider.transforms.CUBE_ROTATIONS``), used instead of ``rotations``.
+            Defaults to None.
+        cull_hidden_faces (bool, optional): whether or not to build the boxes as one surface
+            with the faces between touching boxes removed (see :func:`get_box_surface_mesh`).
+            Requires unscaled boxes on the integer lattice, and ignores ``box``. Defaults to
+            False.
+        n_workers (int, optional): number of processes to split the units across (see
+            :func:`merge_transformed_shared`); None uses one per CPU core. Only worth it for
+            armies of many thousand units. Defaults to 1, which builds in the current process.
+        pool (Pool, optional): running pool to build with instead of starting one, see
+            :func:`army_pool`. Defaults to None.
+
+    Returns:
+        Tuple[pv.PolyData, pv.PolyData]: A tuple of ``pv.Polydata`` containing all spiders and all
+        boxes.
+    """
+    translations = np.asarray(translations, dtype=float).reshape(-1, 3)
+    if cull_hidden_faces and np.any(np.asarray(scales) != 1):
+        raise ValueError("cull_hidden_faces requires unscaled boxes")
+    if orientations is None and rotations is not None and not isinstance(rotations, np.ndarray):
+        orientations = orientation_indices(rotations)
+        if orientations is None:
+            rotations = rotation_matrices(rotations)
+    if orientations is not None:
+        # exact integer matrices from the lookup table, no trig or per-step composition
+        rotations = CUBE_ROTATIONS[np.asarray(orientations, dtype=np.intp)].astype(float)
+    spider = ASSETS.template("spider") if spider is None else spider
+    box = ASSETS.template("box") if box is None else box
+
+    if pool is None and n_workers != 1:
+        with army_pool(n_workers) as pool:
+            return build_army_mesh(
+                translations,
+                rotations,
+                scales,
+                spider,
+                box,
+                cull_hidden_faces=cull_hidden_faces,
+                pool=pool,
+            )
+
+    def merge(template: pv.PolyData, transforms: np.ndarray) -> pv.PolyData:
+        if pool is None:
+            return merge_transformed(template, transforms)
+        return merge_transformed_shared(template, transforms, pool)
+
+    spider_mesh = merge(spider, compose_transforms(scales, rotations, translations))
+    if cull_hidden_faces:
+        return spider_mesh, get_box_surface_mesh(translations)
+    return spider_mesh, merge(box, compose_transforms(scales, None, translations))
+
+
+def get_xkcd_spider_army_mesh(
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    extra_spider: bool = True,
+) -> Tuple[pv.PolyData, pv.PolyData]:
+    """Batch version of ``get_xkcd_spider_army`` that returns the army as two merged meshes.
+
+    Args:
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Check ``XKCD_SPIDER_ARMY_COORD`` for the example
+            setting. Defaults to None.
+        extra_spider (bool, optional): whether or not to add extra spiders on two boxes, to improve
+            fidelity with the original comic. Defaults to True.
+
+    Returns:
+        Tuple[pv.PolyData, pv.PolyData]: A tuple of ``pv.Polydata`` containing all spiders and all
+        boxes.
+    """
+    units = get_spider_army_units(spider_army_coord, extra_spider)
+    translations = np.array([translation for translation, _ in units], dtype=float)
+    return build_army_mesh(translations, [rotation for _, rotation in units])
+
+
+def polygon_edges(mesh: pv.PolyData) -> pv.PolyData:
+    """Return the edges of the polygons of a mesh as line cells, each shared edge once.
+
+    Drawn with the mesh, the lines look like ``show_edges=True`` but only on this mesh, so the
+    edges can be part of a larger mesh whose other parts show no edges.
+
+    Args:
+        mesh (pv.PolyData): mesh.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` with one 2-point line per edge, sharing the points of
+        ``mesh``.
+    """
+    polys = mesh.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray()).astype(np.int64)
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int64)
+    # the next point of every polygon corner, wrapping around to the first one
+    following = np.arange(1, len(connectivity) + 1)
+    following[offsets[1:] - 1] = offsets[:-1]
+    pairs = np.sort(np.column_stack([connectivity, connectivity[following]]), axis=1)
+    n_points = max(mesh.n_points, 1)
+    keys = np.unique(pairs[:, 0] * n_points + pairs[:, 1])
+    lines = np.column_stack([keys // n_points, keys % n_points])
+
+    edges = pv.PolyData()
+    edges.SetPoints(mesh.GetPoints())
+    edges.SetLines(to_vtk_cell_array(np.arange(0, lines.size + 1, 2), lines.reshape(-1)))
+    return edges
+
+
+def merge_parts(parts: Sequence[pv.PolyData]) -> pv.PolyData:
+    """Merge meshes into one, tagging every cell with the index of the mesh it comes from.
+
+    Args:
+        parts (Sequence[pv.PolyData]): meshes, e.g. spiders, boxes and box edges; their data
+            arrays are dropped. A part sharing the points of an earlier part, like
+            :func:`polygon_edges`, shares them in the merged mesh too.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` with the points of the parts in order and all their cells,
+        and a ``PART_ARRAY`` uint8 cell array holding the index of the part of each cell.
+    """
+    blocks, first_points, n_points = [], [], 0
+    for i, part in enumerate(parts):
+        earlier = [j for j in range(i) if parts[j].GetPoints() is part.GetPoints()]
+        if earlier:
+            first_points.append(first_points[earlier[0]])
+            continue
+        blocks.append(np.asarray(part.points, dtype=np.float32))
+        first_points.append(n_points)
+        n_points += part.n_points
+    points = np.concatenate(blocks)
+    merged = pv.PolyData()
+    merged.SetPoints(pv.vtk_points(points))
+    part_ids = []
+    # VTK numbers the verts first, then the lines, polys and strips, whatever the order of parts
+    for getter, setter in (
+        ("GetVerts", merged.SetVerts),
+        ("GetLines", merged.SetLines),
+        ("GetPolys", merged.SetPolys),
+        ("GetStrips", merged.SetStrips),
+    ):
+        offsets, connectivity = [np.zeros(1, dtype=np.int64)], []
+        for i, part in enumerate(parts):
+            cells = getattr(part, getter)()
+            part_offsets = vtk_to_numpy(cells.GetOffsetsArray()).astype(np.int64)
+            if len(part_offsets) < 2:
+                continue
+            offsets.append(part_offsets[1:] + offsets[-1][-1])
+            connectivity.append(vtk_to_numpy(cells.GetConnectivityArray()) + first_points[i])
+            part_ids.append(np.full(len(part_offsets) - 1, i, dtype=np.uint8))
+        if connectivity:
+            setter(
+                to_vtk_cell_array(
+                    np.concatenate(offsets), np.concatenate(connectivity).astype(np.int64)
+                )
+            )
+    merged.cell_data[PART_ARRAY] = np.concatenate(part_ids) if part_ids else np.empty(0, np.uint8)
+    return merged
+
+
+def get_unit_cell_mesh(
+    spider: Optional[pv.PolyData] = None, box: Optional[pv.PolyData] = None
+) -> pv.PolyData:
+    """Build the spider-on-box unit cell as one mesh, with the box edges as line cells.
+
+    Args:
+        spider (pv.PolyData, optional): spider. Defaults to None, which uses the ``"spider"``
+            template from ``ASSETS``.
+        box (pv.PolyData, optional): box. Defaults to None, which uses the ``"box"`` template
+            from ``ASSETS``.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` whose ``PART_ARRAY`` cell array indexes ``UNIT_PARTS``.
+    """
+    spider = ASSETS.template("spider") if spider is None else spider
+    box = ASSETS.template("box") if box is None else box
+    return merge_parts([spider, box, polygon_edges(box)])
+
+
+def build_unit_army_mesh(
+    translations: np.ndarray,
+    rotations: Union[np.ndarray, Sequence[Optional[List[Tuple[str, float]]]], None] = None,
+    scales: Union[float, np.ndarray] = 1.0,
+    orientations: Optional[np.ndarray] = None,
+    cull_hidden_faces: bool = False,
+) -> pv.PolyData:
+    """Build a whole army as one mesh of spiders, boxes and box edges, see
+    :func:`get_unit_cell_mesh`.
+
+    Args:
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        rotations (Union[np.ndarray, Sequence[List[Tuple[str, float]]]], optional): ``(N, 3, 3)``
+            rotation matrices, or one list of rotation steps (or None) per unit. Defaults to None.
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+        orientations (np.ndarray, optional): ``(N,)`` orientation indices, used instead of
+            ``rotations``. Defaults to None.
+        cull_hidden_faces (bool, optional): whether or not to drop the faces (and their edges)
+            between touching boxes, see :func:`build_army_mesh`. Defaults to False.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` whose ``PART_ARRAY`` cell array indexes ``UNIT_PARTS``.
+    """
+    spiders, boxes = build_army_mesh(
+        translations,
+        rotations,
+        scales,
+        orientations=orientations,
+        cull_hidden_faces=cull_hidden_faces,
+    )
+    return merge_parts([spiders, boxes, polygon_edges(boxes)])
@@ -0,0 +1,114 @@
+"""Lazy, memoized registry for the template meshes (spider, box, buildings) used in the scene."""
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pyvista as pv
+
+from xkcd_red_spider.transforms import oriented_points
+
+
+class AssetRegistry:
+    """Registry that builds each template mesh once, on first use, and hands out cheap copies.
+
+    Loaders are registered by name and are not called until the asset is first requested, so
+    registering them (e.g. at import time) does not touch the disk.
+
+    Example::
+
+        registry = AssetRegistry()
+        registry.register("box", get_unit_cell_box)
+        box = registry.get("box")  # calls get_unit_cell_box() once, then returns a copy
+    """
+
+    def __init__(self) -> None:
+        self._loaders: Dict[str, Callable[[], pv.PolyData]] = {}
+        self._templates: Dict[str, pv.PolyData] = {}
+        self._oriented: Dict[str, np.ndarray] = {}
+        self.load_counts: Dict[str, int] = {}
+
+    def register(self, name: str, loader: Callable[[], pv.PolyData]) -> None:
+        """Register a loader for a template mesh. Any previously loaded template is dropped.
+
+        Args:
+            name (str): name of the asset, e.g. ``"spider"``.
+            loader (Callable[[], pv.PolyData]): function that builds the template mesh.
+        """
+        self._loaders[name] = loader
+        self.clear(name)
+        self.load_counts.setdefault(name, 0)
+
+    def template(self, name: str) -> pv.PolyData:
+        """Return the shared template mesh, loading it on first use.
+
+        The returned mesh is shared by every caller and must not be modified in place. Use
+        :meth:`get` for a copy that can be transformed.
+
+        Args:
+            name (str): name of the asset.
+
+        Returns:
+            pv.PolyData: ``pv.Polydata`` containing the shared template mesh.
+        """
+        if name not in self._templates:
+            if name not in self._loaders:
+                raise KeyError(f"Unknown asset {name!r}; registered: {sorted(self._loaders)}")
+            self._templates[name] = self._loaders[name]()
+            self.load_counts[name] += 1
+        return self._templates[name]
+
+    def oriented(self, name: str) -> np.ndarray:
+        """Return the template points pre-rotated by each of the 24 cube rotations.
+
+        The table is computed once, on first use, and is shared by every caller.
+
+        Args:
+            name (str): name of the asset.
+
+        Returns:
+            np.ndarray: ``(24, P, 3)`` rotated points, indexed by orientation index (see
+            ``xkcd_red_spider.transforms.CUBE_ROTATIONS``).
+        """
+        if name not in self._oriented:
+            self._oriented[name] = oriented_points(np.asarray(self.template(name).points))
+        return self._oriented[name]
+
+    def get(self, name: str, orientation: Optional[int] = None) -> pv.PolyData:
+        """Return a copy of the template mesh that is safe to transform in place.
+
+        Only the points are copied; the cell connectivity and data arrays are shared with the
+        template, which keeps the copy cheap.
+
+        Args:
+            name (str): name of the asset.
+            orientation (int, optional): orientation index of a pre-rotated copy to return.
+                Defaults to None, which returns the unrotated template.
+
+        Returns:
+            pv.PolyData: ``pv.Polydata`` containing a copy of the template mesh.
+        """
+        template = self.template(name)
+        if orientation is None:
+            points = np.array(template.points)
+        else:
+            points = self.oriented(name)[orientation].copy()
+        mesh = template.copy(deep=False)
+        # New vtkPoints: assigning ``mesh.points`` could write into the points shared with template
+        mesh.SetPoints(pv.vtk_points(points))
+        return mesh
+
+    def clear(self, name: Optional[str] = None) -> None:
+        """Drop loaded templates so they are rebuilt on next use.
+
+        Args:
+            name (str, optional): name of the asset to drop. Defaults to None, which drops all.
+        """
+        if name is None:
+            self._templates.clear()
+            self._oriented.clear()
+        else:
+            self._templates.pop(name, None)
+            self._oriented.pop(name, None)
+
+
+# Registry shared across the package. Loaders are registered in ``xkcd_red_spider.utils``.
+ASSETS = AssetRegistry()
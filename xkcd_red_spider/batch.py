@@ -0,0 +1,290 @@
+"""Headless batch renderer: render many views of the scene to PNG files, in parallel.
+
+Every worker process keeps one off screen plotter and the loaded template meshes for its whole
+life, and only rebuilds the scene when the colors, the army or the render mode change, so a batch
+of camera positions over the same scene costs one render per image.
+
+To run::
+    python -m xkcd_red_spider.batch --orbit 36 --seeds 1 2 3 --output-dir renders
+
+On a Linux box without a display VTK renders off screen through EGL. Where no GPU driver is
+available, ``--backend osmesa`` selects OSMesa software rendering instead.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyvista as pv
+
+import xkcd_red_spider.main as scene
+import xkcd_red_spider.utils as utils
+from xkcd_red_spider.columnar import army_to_coord, generate_random_army
+from xkcd_red_spider.render import RENDER_MODES
+from xkcd_red_spider.transforms import axis_rotation_matrix
+
+
+# VTK render window class used for each ``--backend``; None lets VTK pick (X, then EGL, then
+# OSMesa).
+BACKENDS = {
+    "auto": None,
+    "egl": "vtkEGLRenderWindow",
+    "osmesa": "vtkOSOpenGLRenderWindow",
+}
+DEFAULT_COLORS = ("red", "tan", "lightgray")
+DEFAULT_WINDOW_SIZE = (1024, 768)
+
+# State of the current worker process, set up by ``_init_worker``.
+_WORKER = {}
+
+
+def orbit_camera_positions(
+    n_views: int, camera_position: Sequence[Sequence[float]] = scene.DEFAULT_CAMERA_POSITION
+) -> List[List[Tuple[float, float, float]]]:
+    """Return camera positions evenly spaced on a circle around the vertical axis through the
+    focal point.
+
+    Args:
+        n_views (int): number of camera positions.
+        camera_position (Sequence[Sequence[float]], optional): first camera position, as
+            ``[position, focal_point, view_up]``. Defaults to ``DEFAULT_CAMERA_POSITION``.
+
+    Returns:
+        List[List[Tuple[float, float, float]]]: ``n_views`` camera positions.
+    """
+    position, focal_point, view_up = (np.asarray(v, dtype=float) for v in camera_position)
+    views = []
+    for angle in np.arange(n_views) * 360.0 / n_views:
+        rotation = axis_rotation_matrix("z", angle)
+        views.append(
+            [
+                tuple(float(x) for x in focal_point + rotation @ (position - focal_point)),
+                tuple(float(x) for x in focal_point),
+                tuple(float(x) for x in rotation @ view_up),
+            ]
+        )
+    return views
+
+
+def make_jobs(
+    camera_positions: Sequence[Sequence[Sequence[float]]],
+    color_schemes: Optional[Sequence[Sequence[str]]] = None,
+    seeds: Optional[Sequence[Optional[int]]] = None,
+    render_mode: str = "per_unit",
+) -> List[Dict]:
+    """Make one render job per combination of seed, color scheme and camera position.
+
+    Jobs sharing a scene are listed one after another, so a worker can render them without
+    rebuilding the scene.
+
+    Args:
+        camera_positions (Sequence[Sequence[Sequence[float]]]): camera positions, each as
+            ``[position, focal_point, view_up]``.
+        color_schemes (Sequence[Sequence[str]], optional): ``(color_spider, color_box,
+            color_buildings)`` tuples. Defaults to None, which uses ``DEFAULT_COLORS``.
+        seeds (Sequence[Optional[int]], optional): random seeds of the spider army; None stands
+            for the army of the comic. Defaults to None, which renders the comic only.
+        render_mode (str, optional): how to draw the army, one of ``render.RENDER_MODES``.
+            Defaults to "per_unit".
+
+    Returns:
+        List[Dict]: render jobs.
+    """
+    jobs = []
+    for seed in seeds or [None]:
+        for colors in color_schemes or [DEFAULT_COLORS]:
+            for camera_position in camera_positions:
+                jobs.append(
+                    {
+                        "index": len(jobs),
+                        "seed": seed,
+                        "colors": list(colors),
+                        "camera_position": [list(v) for v in camera_position],
+                        "render_mode": render_mode,
+                    }
+                )
+    return jobs
+
+
+def _init_worker(output_dir: str, window_size: Sequence[int], backend: str) -> None:
+    if BACKENDS[backend] is not None:
+        os.environ["VTK_DEFAULT_OPENGL_WINDOW"] = BACKENDS[backend]
+    pv.set_plot_theme("document")
+    # Load the templates once per worker, before the first job is timed
+    for name in ("spider", "box", "buildings"):
+        utils.ASSETS.template(name)
+    _WORKER["plotter"] = pv.Plotter(off_screen=True, window_size=list(window_size))
+    _WORKER["scene_key"] = None
+    _WORKER["output_dir"] = output_dir
+
+
+def _set_scene(plotter: pv.Plotter, job: Dict) -> None:
+    plotter.clear()
+    # The lod and chunked render modes observe the camera and the renderer; drop their observers
+    # together with their actors.
+    plotter.renderer.RemoveObservers("StartEvent")
+    plotter.renderer.GetActiveCamera().RemoveObservers("ModifiedEvent")
+    spider_army_coord = None
+    if job["seed"] is not None:
+        spider_army_coord = army_to_coord(generate_random_army(seed=job["seed"]))
+    color_spider, color_box, color_buildings = job["colors"]
+    scene.main(
+        color_spider,
+        color_box,
+        color_buildings,
+        render_mode=job["render_mode"],
+        spider_army_coord=spider_army_coord,
+        plotter=plotter,
+    )
+
+
+def render_job(job: Dict) -> Tuple[int, str, float]:
+    """Render one job with the plotter of the current worker.
+
+    Args:
+        job (Dict): render job, see :func:`make_jobs`.
+
+    Returns:
+        Tuple[int, str, float]: index of the job, path of the PNG file, and render time in
+        seconds.
+    """
+    start = time.perf_counter()
+    plotter = _WORKER["plotter"]
+    scene_key = json.dumps([job["seed"], job["colors"], job["render_mode"]])
+    if scene_key != _WORKER["scene_key"]:
+        _set_scene(plotter, job)
+        _WORKER["scene_key"] = scene_key
+    plotter.camera_position = [tuple(v) for v in job["camera_position"]]
+    path = os.path.join(_WORKER["output_dir"], f"frame_{job['index']:05d}.png")
+    plotter.screenshot(path)
+    return job["index"], path, time.perf_counter() - start
+
+
+def render_batch(
+    jobs: Sequence[Dict],
+    output_dir: str,
+    n_workers: Optional[int] = None,
+    window_size: Sequence[int] = DEFAULT_WINDOW_SIZE,
+    backend: str = "auto",
+) -> Dict[str, float]:
+    """Render jobs to ``output_dir/frame_<index>.png`` across a pool of worker processes.
+
+    Args:
+        jobs (Sequence[Dict]): render jobs, see :func:`make_jobs`.
+        output_dir (str): directory to write the PNG files to.
+        n_workers (int, optional): number of worker processes. With 1, the jobs are rendered in
+            the current process. Defaults to None, which uses one per CPU core.
+        window_size (Sequence[int], optional): width and height of the images. Defaults to
+            ``DEFAULT_WINDOW_SIZE``.
+        backend (str, optional): off screen rendering backend, one of ``BACKENDS``. Defaults to
+            "auto".
+
+    Returns:
+        Dict[str, float]: number of images and workers, wall time, images per second, and mean
+        render time per image (excluding worker start up).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {sorted(BACKENDS)}, got {backend!r}")
+    os.makedirs(output_dir, exist_ok=True)
+    n_workers = min(n_workers or os.cpu_count() or 1, max(len(jobs), 1))
+    init_args = (output_dir, tuple(window_size), backend)
+
+    start = time.perf_counter()
+    if n_workers == 1:
+        _init_worker(*init_args)
+        results = [render_job(job) for job in jobs]
+        _WORKER.pop("plotter").close()
+    else:
+        # Spawned workers do not inherit any VTK or OpenGL state from the parent process
+        context = multiprocessing.get_context("spawn")
+        # Hand out runs of consecutive jobs, which mostly share their scene
+        chunksize = max(1, len(jobs) // (4 * n_workers))
+        with context.Pool(n_workers, initializer=_init_worker, initargs=init_args) as pool:
+            results = list(pool.imap_unordered(render_job, jobs, chunksize=chunksize))
+    seconds = time.perf_counter() - start
+
+    return {
+        "n_images": len(results),
+        "n_workers": n_workers,
+        "seconds": seconds,
+        "images_per_second": len(results) / seconds if seconds else 0.0,
+        "render_seconds_per_image": float(np.mean([r[2] for r in results])) if results else 0.0,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the batch renderer.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Render views of the red spider scene to PNG.")
+    parser.add_argument(
+        "--cameras",
+        help="JSON file with a list of camera positions, each [position, focal_point, view_up]",
+    )
+    parser.add_argument(
+        "--orbit",
+        type=int,
+        default=1,
+        help="number of views orbiting the default camera, when --cameras is not given",
+    )
+    parser.add_argument(
+        "--colors",
+        action="append",
+        metavar="SPIDER,BOX,BUILDINGS",
+        help="color scheme, e.g. red,tan,lightgray; can be repeated",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        nargs="+",
+        help="render random armies from these seeds instead of the comic",
+    )
+    parser.add_argument("--render-mode", choices=RENDER_MODES, default="per_unit")
+    parser.add_argument("--workers", type=int, help="number of worker processes")
+    parser.add_argument(
+        "--window-size", type=int, nargs=2, default=DEFAULT_WINDOW_SIZE, metavar=("W", "H")
+    )
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="auto")
+    parser.add_argument("--output-dir", default="renders")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """Render a batch of images from the command line and print the throughput.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        Dict[str, float]: report of :func:`render_batch`.
+    """
+    args = parse_args(argv)
+    if args.cameras:
+        with open(args.cameras) as f:
+            camera_positions = json.load(f)
+    else:
+        camera_positions = orbit_camera_positions(args.orbit)
+    color_schemes = [colors.split(",") for colors in args.colors or []]
+    for colors in color_schemes:
+        if len(colors) != 3:
+            raise ValueError(f"--colors takes SPIDER,BOX,BUILDINGS, got {','.join(colors)!r}")
+
+    jobs = make_jobs(camera_positions, color_schemes, args.seeds, args.render_mode)
+    report = render_batch(jobs, args.output_dir, args.workers, args.window_size, args.backend)
+    print(
+        f"{report['n_images']} images in {report['seconds']:.1f} s with "
+        f"{report['n_workers']} workers: {report['images_per_second']:.2f} images/s"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    main()
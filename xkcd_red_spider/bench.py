@@ -0,0 +1,466 @@
+"""Benchmark suite timing each stage of the scene pipeline, with regression tracking.
+
+The stages are:
+
+* ``load_spider_cold`` and ``load_buildings_cold``: ``get_unit_cell_spider`` and ``get_buildings``
+  with an empty mesh cache, so parsing the source file and writing the cache entry;
+* ``load_spider`` and ``load_buildings``: the same with the cache entry already written;
+* ``build_army_<n>``: ``get_xkcd_spider_army`` for a random army of ``n`` units, for every size in
+  ``ARMY_SIZES`` (14 is the size of the comic's army);
+* ``create_actors``: adding the scene to an off screen plotter with ``main()``;
+* ``render_frame``: the first off screen frame of that scene, which uploads it to the GPU;
+* ``export_vtkjs``: exporting that scene with ``export.export_vtkjs``.
+
+Every stage runs in its own spawned process, so the peak RSS of a stage is not hidden by the
+high-water mark of an earlier one, and no stage benefits from caches warmed by another. Setup (e.g.
+creating the plotter before ``render_frame``) is not timed. On Linux, the RSS high-water mark is
+also reset after setup, so ``peak_rss_mb`` is the peak during the timed runs (which still counts
+what the setup keeps resident, e.g. the plotter) and ``run_rss_mb`` its growth over the resident
+size before the run; elsewhere ``peak_rss_mb`` includes the setup and ``run_rss_mb`` is missing.
+
+To run, and later compare against the saved results::
+    python -m xkcd_red_spider.bench run --output bench.json
+    python -m xkcd_red_spider.bench run --output new.json --army-sizes 14 1000
+    python -m xkcd_red_spider.bench compare bench.json new.json --threshold 0.1
+
+``compare`` exits with status 1 when a stage got slower, or took more memory, by more than the
+threshold. The default army sizes fit in a few GB; a 100k unit army builds 100k pairs of meshes
+and needs about 20 GB of memory, so it only runs when asked for, e.g. ``--army-sizes 14 100000``.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import pyvista as pv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import xkcd_red_spider.cache as cache
+import xkcd_red_spider.export as export
+import xkcd_red_spider.main as scene
+import xkcd_red_spider.utils as utils
+from xkcd_red_spider.columnar import army_to_coord, generate_random_army
+from xkcd_red_spider.render import RENDER_MODES
+
+
+BENCH_FILE_VERSION = 1
+ARMY_SIZES = (14, 1_000, 10_000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.1
+
+# Metrics compared by ``compare_results``; a larger value is worse for each of them.
+COMPARED_METRICS = ("median_seconds", "peak_rss_mb")
+
+
+class Stage(NamedTuple):
+    """One benchmarked stage: ``run(setup())`` is timed, then ``teardown`` gets the setup state."""
+
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+    teardown: Callable[[Any], None] = lambda state: None
+
+
+def stage_names(army_sizes: Sequence[int] = ARMY_SIZES) -> List[str]:
+    """List the stages of the suite, in the order they run.
+
+    Args:
+        army_sizes (Sequence[int], optional): number of units of each army built. Defaults to
+            ``ARMY_SIZES``.
+
+    Returns:
+        List[str]: names of the stages.
+    """
+    return (
+        ["load_spider_cold", "load_spider", "load_buildings_cold", "load_buildings"]
+        + [f"build_army_{n_units}" for n_units in army_sizes]
+        + ["create_actors", "render_frame", "export_vtkjs"]
+    )
+
+
+def _random_army_coord(n_units: int, seed: int = 0) -> Dict:
+    # A flat lattice about three times as large as the army, like the comic's
+    half_width = max(int((n_units / 3) ** 0.5), 3)
+    army = generate_random_army(n_units, half_width, half_width, 1, seed=seed)
+    return army_to_coord(army)
+
+
+def _preload_assets() -> None:
+    for name in ("box", "buildings"):
+        utils.ASSETS.template(name)
+    utils.ASSETS.oriented("spider")
+
+
+def _scene_plotter(render_mode: str) -> pv.Plotter:
+    _preload_assets()
+    plotter = pv.Plotter(off_screen=True)
+    scene.main(render_mode=render_mode, plotter=plotter)
+    plotter.camera_position = scene.DEFAULT_CAMERA_POSITION
+    return plotter
+
+
+def _cold_cache_setup() -> Dict:
+    # Point the mesh cache to an empty directory, for this (spawned) process only
+    state = {"previous": cache.CACHE_DIR, "directory": tempfile.mkdtemp()}
+    cache.CACHE_DIR = state["directory"]
+    return state
+
+
+def _cold_cache_teardown(state: Dict) -> None:
+    cache.CACHE_DIR = state["previous"]
+    shutil.rmtree(state["directory"], ignore_errors=True)
+
+
+def _export_setup(render_mode: str) -> Dict:
+    return {"plotter": _scene_plotter(render_mode), "directory": tempfile.mkdtemp()}
+
+
+def _export_teardown(state: Dict) -> None:
+    state["plotter"].close()
+    shutil.rmtree(state["directory"], ignore_errors=True)
+
+
+def make_stage(name: str, render_mode: str = "per_unit") -> Stage:
+    """Build the stage of the given name.
+
+    Args:
+        name (str): name of the stage, see :func:`stage_names`.
+        render_mode (str, optional): render mode of the scene for ``create_actors``,
+            ``render_frame`` and ``export_vtkjs``. Defaults to "per_unit".
+
+    Returns:
+        Stage: the stage.
+    """
+    loaders = {"load_spider": utils.get_unit_cell_spider, "load_buildings": utils.get_buildings}
+    loader = loaders.get(name[: -len("_cold")] if name.endswith("_cold") else name)
+    if loader is not None and name.endswith("_cold"):
+        return Stage(_cold_cache_setup, lambda _: loader(), _cold_cache_teardown)
+    if loader is not None:
+
+        def setup() -> None:
+            loader()  # writes the cache entry if needed, so that every run reads it
+
+        return Stage(setup, lambda _: loader())
+    if name.startswith("build_army_"):
+        n_units = int(name[len("build_army_") :])
+
+        def setup() -> Dict:
+            _preload_assets()
+            return _random_army_coord(n_units)
+
+        return Stage(setup, lambda coord: utils.get_xkcd_spider_army(coord, extra_spider=False))
+    if name == "create_actors":
+
+        def setup() -> pv.Plotter:
+            _preload_assets()
+            return pv.Plotter(off_screen=True)
+
+        return Stage(
+            setup,
+            lambda plotter: scene.main(render_mode=render_mode, plotter=plotter),
+            lambda plotter: plotter.close(),
+        )
+    if name == "render_frame":
+        return Stage(
+            lambda: _scene_plotter(render_mode),
+            lambda plotter: plotter.ren_win.Render(),
+            lambda plotter: plotter.close(),
+        )
+    if name == "export_vtkjs":
+        return Stage(
+            lambda: _export_setup(render_mode),
+            lambda state: export.export_vtkjs(
+                state["plotter"], os.path.join(state["directory"], "scene"), force=True
+            ),
+            _export_teardown,
+        )
+    raise ValueError(f"Unknown stage {name!r}")
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    # Memory field of /proc/self/status, e.g. "VmRSS", on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets the high-water mark of the RSS (Linux 4.0 and later)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of the current process.
+
+    Returns:
+        Optional[float]: peak RSS in MB since the process started, or since it was last reset on
+        Linux, or None where the ``resource`` module is missing.
+    """
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None or resource is None:
+        return peak
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def run_stage(name: str, repeat: int = DEFAULT_REPEAT, render_mode: str = "per_unit") -> Dict:
+    """Time a stage in the current process.
+
+    Args:
+        name (str): name of the stage, see :func:`stage_names`.
+        repeat (int, optional): number of timed runs, each after a fresh setup. Defaults to
+            ``DEFAULT_REPEAT``.
+        render_mode (str, optional): render mode of the scene stages. Defaults to "per_unit".
+
+    Returns:
+        Dict: run times in seconds, their min and median, the peak RSS in MB and, on Linux, the
+        largest growth of the RSS during a run in MB (see the module docstring).
+    """
+    stage = make_stage(name, render_mode)
+    seconds, peaks, growths = [], [], []
+    for _ in range(repeat):
+        state = stage.setup()
+        before = _proc_status_mb("VmRSS")
+        reset = _reset_peak_rss()
+        start = time.perf_counter()
+        stage.run(state)
+        seconds.append(time.perf_counter() - start)
+        peaks.append(peak_rss_mb())
+        if reset and before is not None and peaks[-1] is not None:
+            growths.append(peaks[-1] - before)
+        stage.teardown(state)
+    return {
+        "seconds": seconds,
+        "min_seconds": min(seconds),
+        "median_seconds": statistics.median(seconds),
+        "peak_rss_mb": None if None in peaks else max(peaks),
+        "run_rss_mb": max(growths) if growths else None,
+    }
+
+
+def run_suite(
+    army_sizes: Sequence[int] = ARMY_SIZES,
+    repeat: int = DEFAULT_REPEAT,
+    render_mode: str = "per_unit",
+    stages: Optional[Sequence[str]] = None,
+) -> Dict:
+    """Run every stage of the suite, each in a fresh spawned process.
+
+    Args:
+        army_sizes (Sequence[int], optional): number of units of each army built. Defaults to
+            ``ARMY_SIZES``.
+        repeat (int, optional): number of timed runs of each stage. Defaults to
+            ``DEFAULT_REPEAT``.
+        render_mode (str, optional): render mode of the scene stages. Defaults to "per_unit".
+        stages (Sequence[str], optional): names of the stages to run. Defaults to None, which
+            runs them all.
+
+    Returns:
+        Dict: results, ready to be saved with :func:`save_results`.
+    """
+    names = stages or stage_names(army_sizes)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(run_stage, (name, repeat, render_mode))
+    return {
+        "version": BENCH_FILE_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "pyvista": pv.__version__,
+            "vtk": ".".join(str(v) for v in pv.vtk_version_info[:3]),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "render_mode": render_mode,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def save_results(path: str, results: Dict) -> None:
+    """Write benchmark results to a JSON file.
+
+    Args:
+        path (str): path to the file.
+        results (Dict): results of :func:`run_suite`.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    """Read benchmark results written by :func:`save_results`.
+
+    Args:
+        path (str): path to the file.
+
+    Returns:
+        Dict: the results.
+    """
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("version", 0) > BENCH_FILE_VERSION:
+        raise ValueError(f"{path} has version {results['version']}, newer than supported")
+    return results
+
+
+def compare_results(
+    baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[Dict]:
+    """Compare two sets of results, stage by stage.
+
+    Only the stages present in both are compared.
+
+    Args:
+        baseline (Dict): reference results.
+        current (Dict): new results.
+        threshold (float, optional): relative increase of a metric above which it counts as a
+            regression, e.g. 0.1 for 10%. Defaults to ``DEFAULT_THRESHOLD``.
+
+    Returns:
+        List[Dict]: one row per stage and metric in ``COMPARED_METRICS``, with the baseline and
+        current values, their relative change, and whether it is a regression.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = baseline["results"][name].get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            rows.append(
+                {
+                    "stage": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": change,
+                    "regression": change > threshold,
+                }
+            )
+    return rows
+
+
+def format_results(results: Dict) -> str:
+    """Format results as a table.
+
+    Args:
+        results (Dict): results of :func:`run_suite`.
+
+    Returns:
+        str: one line per stage.
+    """
+    lines = [
+        f"{'stage':<22}{'min (s)':>12}{'median (s)':>12}{'peak RSS (MB)':>16}{'run RSS (MB)':>15}"
+    ]
+    for name, result in results["results"].items():
+        rss = [result["peak_rss_mb"], result.get("run_rss_mb")]
+        rss = ["-" if value is None else format(value, ".1f") for value in rss]
+        lines.append(
+            f"{name:<22}{result['min_seconds']:>12.4f}{result['median_seconds']:>12.4f}"
+            f"{rss[0]:>16}{rss[1]:>15}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: Sequence[Dict]) -> str:
+    """Format the rows of :func:`compare_results` as a table.
+
+    Args:
+        rows (Sequence[Dict]): comparison rows.
+
+    Returns:
+        str: one line per stage and metric, regressions marked with ``REGRESSION``.
+    """
+    lines = [f"{'stage':<22}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>12}"]
+    for row in rows:
+        lines.append(
+            f"{row['stage']:<22}{row['metric']:<16}{row['baseline']:>12.4f}"
+            f"{row['current']:>12.4f}{row['change']:>+12.1%}"
+            + ("  REGRESSION" if row["regression"] else "")
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the benchmark suite.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the red spider scene pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="run the benchmarks and save the results")
+    run.add_argument("--output", default="bench.json", help="JSON file to write the results to")
+    run.add_argument("--army-sizes", type=int, nargs="+", default=list(ARMY_SIZES))
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--render-mode", choices=RENDER_MODES, default="per_unit")
+    run.add_argument("--stages", nargs="+", help="only run these stages")
+    run.add_argument("--baseline", help="JSON file of earlier results to compare against")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare = subparsers.add_parser("compare", help="compare two saved results")
+    compare.add_argument("baseline", help="JSON file of the reference results")
+    compare.add_argument("current", help="JSON file of the new results")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run or compare benchmarks from the command line.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        int: exit status, 1 when a regression was found and 0 otherwise.
+    """
+    args = parse_args(argv)
+    if args.command == "run":
+        current = run_suite(args.army_sizes, args.repeat, args.render_mode, args.stages)
+        save_results(args.output, current)
+        print(format_results(current))
+        if not args.baseline:
+            return 0
+        baseline = load_results(args.baseline)
+    else:
+        baseline, current = load_results(args.baseline), load_results(args.current)
+
+    rows = compare_results(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    return int(any(row["regression"] for row in rows))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
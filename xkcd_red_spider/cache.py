@@ -0,0 +1,234 @@
+"""Binary on-disk cache for template meshes that are slow to parse from their text sources.
+
+Each cached mesh is stored as an uncompressed ``.npz`` file holding the points, the cell
+connectivity and the numeric point/cell data arrays of the already-transformed mesh, so loading
+it is a handful of array reads instead of a PLY/OBJ parse. The cache entry records a fingerprint
+of the source files (size and mtime) and of the builder function, and is rebuilt whenever either
+of them changes. It also records the bounds of the mesh, which :func:`cached_bounds` reads without
+loading the mesh.
+"""
+import hashlib
+import inspect
+import os
+import types
+import zipfile
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyvista as pv
+
+
+# The cache lives in the per-user cache directory, as the package directory is usually read-only
+# once installed. Set XKCD_RED_SPIDER_CACHE_DIR to keep it somewhere else.
+CACHE_DIR = os.environ.get("XKCD_RED_SPIDER_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "xkcd_red_spider",
+)
+
+# Bump this when the on-disk layout changes, or to drop entries built with wrong geometry.
+CACHE_VERSION = 2
+
+_CELL_KEYS = ("verts", "lines", "faces")
+_FINGERPRINT_KEY = "__fingerprint__"
+_BOUNDS_KEY = "__bounds__"
+
+
+def file_fingerprint(path: str) -> str:
+    """Return a cheap fingerprint of a file based on its size and modification time.
+
+    Args:
+        path (str): path to the file.
+
+    Returns:
+        str: fingerprint of the file.
+    """
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _code_digest(code: types.CodeType) -> bytes:
+    # Nested code objects (comprehensions, lambdas, inner functions) are hashed by content: their
+    # repr holds a memory address, and frozenset constants are ordered by the per-process string
+    # hash, so neither is stable across runs.
+    parts = [code.co_code, repr(code.co_names).encode("utf-8")]
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            parts.append(_code_digest(const))
+        elif isinstance(const, frozenset):
+            parts.append(repr(sorted(repr(item) for item in const)).encode("utf-8"))
+        else:
+            parts.append(repr(const).encode("utf-8"))
+    return hashlib.sha1(b"\0".join(parts)).digest()
+
+
+def builder_fingerprint(builder: Callable) -> str:
+    """Return a fingerprint of a builder function's code, so editing it invalidates the cache.
+
+    The fingerprint is stable across processes, including for builders holding comprehensions,
+    lambdas or inner functions.
+
+    Args:
+        builder (Callable): function that builds the mesh.
+
+    Returns:
+        str: fingerprint of the builder.
+    """
+    # Look through decorators such as ``instrument.instrumented``
+    digest = _code_digest(inspect.unwrap(builder).__code__).hex()
+    return f"{builder.__qualname__}:{digest}"
+
+
+def mesh_to_arrays(mesh: pv.PolyData) -> Dict[str, np.ndarray]:
+    """Flatten a ``pv.PolyData`` into a dict of numpy arrays.
+
+    Args:
+        mesh (pv.PolyData): mesh to flatten.
+
+    Returns:
+        Dict[str, np.ndarray]: points, cell connectivity and numeric data arrays of the mesh.
+    """
+    arrays = {"points": np.asarray(mesh.points)}
+    for key in _CELL_KEYS:
+        cells = np.asarray(getattr(mesh, key))
+        if cells.size:
+            arrays[key] = cells
+    for prefix, data in (("point_data", mesh.point_data), ("cell_data", mesh.cell_data)):
+        for name in data.keys():
+            array = np.asarray(data[name])
+            if array.dtype.kind in "biuf":
+                arrays[f"{prefix}:{name}"] = array
+    return arrays
+
+
+def arrays_to_mesh(arrays: Dict[str, np.ndarray]) -> pv.PolyData:
+    """Rebuild a ``pv.PolyData`` from the arrays produced by :func:`mesh_to_arrays`.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): points, cell connectivity and data arrays.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing the mesh.
+    """
+    mesh = pv.PolyData()
+    mesh.points = arrays["points"]
+    for key in _CELL_KEYS:
+        if key in arrays:
+            setattr(mesh, key, arrays[key])
+    for key, array in arrays.items():
+        if key.startswith("point_data:"):
+            mesh.point_data[key.split(":", 1)[1]] = array
+        elif key.startswith("cell_data:"):
+            mesh.cell_data[key.split(":", 1)[1]] = array
+    return mesh
+
+
+def _cache_entry(
+    name: str,
+    sources: List[str],
+    builder: Callable[[], pv.PolyData],
+    cache_dir: Optional[str],
+    dependencies: Sequence[Callable],
+) -> Tuple[str, str]:
+    # Path and expected fingerprint of a cache entry
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    fingerprint = "|".join(
+        [f"v{CACHE_VERSION}"]
+        + [builder_fingerprint(function) for function in [builder, *dependencies]]
+        + [file_fingerprint(source) for source in sources]
+    )
+    return os.path.join(cache_dir, f"{name}.npz"), fingerprint
+
+
+def _read_entry(
+    cache_path: str, fingerprint: str, keys: Optional[Sequence[str]] = None
+) -> Optional[Dict]:
+    # Arrays of a fresh cache entry (only ``keys`` if given), or None if it is missing or stale
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if str(cached[_FINGERPRINT_KEY]) != fingerprint:
+                return None
+            if keys is None:
+                keys = [key for key in cached.files if not key.startswith("__")]
+            return {key: cached[key] for key in keys}
+    except (OSError, EOFError, zipfile.BadZipFile, ValueError, KeyError):
+        return None  # unreadable or incompatible cache entry
+
+
+def cached_mesh(
+    name: str,
+    sources: List[str],
+    builder: Callable[[], pv.PolyData],
+    cache_dir: Optional[str] = None,
+    dependencies: Sequence[Callable] = (),
+) -> pv.PolyData:
+    """Return the mesh built by ``builder``, reading it from the binary cache when it is fresh.
+
+    Args:
+        name (str): name of the cache entry, e.g. ``"spider"``.
+        sources (List[str]): paths to the source files the mesh is built from.
+        builder (Callable[[], pv.PolyData]): function that builds the mesh from the sources.
+        cache_dir (str, optional): directory holding the cache files. Defaults to None, which
+            uses ``CACHE_DIR``.
+        dependencies (Sequence[Callable], optional): other functions whose output ``builder``
+            reads, e.g. the builder of a template it derives the mesh from, so editing them also
+            invalidates the entry. Defaults to none.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing the mesh.
+    """
+    cache_path, fingerprint = _cache_entry(name, sources, builder, cache_dir, dependencies)
+    arrays = _read_entry(cache_path, fingerprint)
+    if arrays is not None:
+        return arrays_to_mesh(arrays)
+
+    mesh = builder()
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    meta = {_FINGERPRINT_KEY: np.array(fingerprint), _BOUNDS_KEY: np.array(mesh.bounds)}
+    np.savez(tmp_path, **meta, **mesh_to_arrays(mesh))
+    os.replace(tmp_path, cache_path)
+    return mesh
+
+
+def cached_bounds(
+    name: str,
+    sources: List[str],
+    builder: Callable[[], pv.PolyData],
+    cache_dir: Optional[str] = None,
+    dependencies: Sequence[Callable] = (),
+) -> Optional[Tuple[float, ...]]:
+    """Return the bounds of a cached mesh without loading the mesh, nor building it.
+
+    Args:
+        name (str): name of the cache entry, see :func:`cached_mesh`.
+        sources (List[str]): paths to the source files the mesh is built from.
+        builder (Callable[[], pv.PolyData]): function that builds the mesh from the sources.
+        cache_dir (str, optional): directory holding the cache files. Defaults to None, which
+            uses ``CACHE_DIR``.
+        dependencies (Sequence[Callable], optional): other functions the mesh depends on, see
+            :func:`cached_mesh`. Defaults to none.
+
+    Returns:
+        Optional[Tuple[float, ...]]: ``(xmin, xmax, ymin, ymax, zmin, zmax)``, or None while the
+        cache entry is missing or stale.
+    """
+    cache_path, fingerprint = _cache_entry(name, sources, builder, cache_dir, dependencies)
+    arrays = _read_entry(cache_path, fingerprint, [_BOUNDS_KEY])
+    return None if arrays is None else tuple(arrays[_BOUNDS_KEY].tolist())
+
+
+def clear_cache(cache_dir: Optional[str] = None) -> None:
+    """Delete all cached meshes.
+
+    Args:
+        cache_dir (str, optional): directory holding the cache files. Defaults to None, which
+            uses ``CACHE_DIR``.
+    """
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    if not os.path.isdir(cache_dir):
+        return
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".npz"):
+            os.remove(os.path.join(cache_dir, filename))
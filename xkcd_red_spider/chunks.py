@@ -0,0 +1,208 @@
+"""Split the scene into spatial chunks and test them against the camera frustum.
+
+A chunk is a merged mesh covering one cube of a regular grid, ``chunk_size`` units on a side. The
+army is split by unit position, so every spider and box lands whole in one chunk, and any other
+mesh (e.g. the buildings) is split by cell center. Each chunk keeps its bounding box, so culling
+the whole scene against the view frustum is one vectorized test over all the chunks.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+from xkcd_red_spider.army import build_army_mesh, get_box_surface_mesh, to_vtk_cell_array
+from xkcd_red_spider.lattice import pack_keys
+
+
+# Length of the side of a chunk, in box units.
+CHUNK_SIZE = 4.0
+
+
+def chunk_groups(positions: np.ndarray, chunk_size: float = CHUNK_SIZE) -> List[np.ndarray]:
+    """Group positions by the chunk they fall in.
+
+    Args:
+        positions (np.ndarray): ``(N, 3)`` positions.
+        chunk_size (float, optional): length of the side of a chunk. Defaults to ``CHUNK_SIZE``.
+
+    Returns:
+        List[np.ndarray]: indices into ``positions`` of each non-empty chunk.
+    """
+    coords = np.floor(np.asarray(positions, dtype=float).reshape(-1, 3) / chunk_size)
+    if not len(coords):
+        return []
+    keys = pack_keys(coords)
+    order = np.argsort(keys, kind="stable")
+    return np.split(order, np.flatnonzero(np.diff(keys[order])) + 1)
+
+
+def poly_offsets_connectivity(mesh: pv.PolyData) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the offsets and connectivity arrays of the polygons of a mesh.
+
+    Args:
+        mesh (pv.PolyData): mesh.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ``(n_polys + 1,)`` offsets and the point indices of all
+        polygons.
+    """
+    polys = mesh.GetPolys()
+    return vtk_to_numpy(polys.GetOffsetsArray()), vtk_to_numpy(polys.GetConnectivityArray())
+
+
+def count_triangles(mesh: pv.PolyData) -> int:
+    """Count the triangles a mesh is drawn with, i.e. ``n - 2`` for every polygon of ``n`` points.
+
+    Args:
+        mesh (pv.PolyData): mesh.
+
+    Returns:
+        int: number of triangles.
+    """
+    offsets, _ = poly_offsets_connectivity(mesh)
+    return int(offsets[-1] - 2 * (len(offsets) - 1)) if len(offsets) else 0
+
+
+def extract_polys(mesh: pv.PolyData, cell_ids: np.ndarray) -> pv.PolyData:
+    """Extract a subset of the polygons of a mesh, with only the points they use.
+
+    Point and cell data arrays are carried over.
+
+    Args:
+        mesh (pv.PolyData): mesh made of polygons only.
+        cell_ids (np.ndarray): indices of the polygons to extract.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` containing the extracted polygons.
+    """
+    offsets, connectivity = poly_offsets_connectivity(mesh)
+    starts = offsets[cell_ids]
+    sizes = offsets[cell_ids + 1] - starts
+    sub_offsets = np.zeros(len(cell_ids) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=sub_offsets[1:])
+    # index of every point index of the extracted polygons in ``connectivity``
+    within = np.arange(sub_offsets[-1]) - np.repeat(sub_offsets[:-1], sizes)
+    point_ids, sub_connectivity = np.unique(
+        connectivity[np.repeat(starts, sizes) + within], return_inverse=True
+    )
+
+    chunk = pv.PolyData()
+    chunk.SetPoints(pv.vtk_points(np.asarray(mesh.points)[point_ids]))
+    chunk.SetPolys(to_vtk_cell_array(sub_offsets, sub_connectivity.reshape(-1).astype(np.int64)))
+    for name in mesh.point_data.keys():
+        chunk.point_data[name] = np.asarray(mesh.point_data[name])[point_ids]
+    for name in mesh.cell_data.keys():
+        chunk.cell_data[name] = np.asarray(mesh.cell_data[name])[cell_ids]
+    return chunk
+
+
+def split_mesh(mesh: pv.PolyData, chunk_size: float = CHUNK_SIZE) -> List[pv.PolyData]:
+    """Split a mesh into chunks, assigning every polygon to the chunk of its center.
+
+    Args:
+        mesh (pv.PolyData): mesh made of polygons only.
+        chunk_size (float, optional): length of the side of a chunk. Defaults to ``CHUNK_SIZE``.
+
+    Returns:
+        List[pv.PolyData]: one ``pv.Polydata`` per non-empty chunk.
+    """
+    if mesh.n_verts or mesh.n_lines or mesh.n_strips:
+        raise ValueError("split_mesh only supports meshes made of polygons")
+    centers = mesh.cell_centers().points
+    return [extract_polys(mesh, cell_ids) for cell_ids in chunk_groups(centers, chunk_size)]
+
+
+def split_army(
+    translations: np.ndarray,
+    rotations: Optional[Sequence] = None,
+    chunk_size: float = CHUNK_SIZE,
+) -> List[Tuple[pv.PolyData, pv.PolyData]]:
+    """Build the army as one merged spider mesh and one box surface per chunk.
+
+    Args:
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        rotations (Sequence, optional): one list of rotation steps (or None) per unit. Defaults
+            to None.
+        chunk_size (float, optional): length of the side of a chunk. Defaults to ``CHUNK_SIZE``.
+
+    Returns:
+        List[Tuple[pv.PolyData, pv.PolyData]]: list of (spiders, boxes) ``pv.PolyData`` tuples,
+        one per non-empty chunk.
+    """
+    translations = np.asarray(translations, dtype=float).reshape(-1, 3)
+    chunks = []
+    for ids in chunk_groups(translations, chunk_size):
+        chunk_rotations = None if rotations is None else [rotations[i] for i in ids]
+        spiders = build_army_mesh(translations[ids], chunk_rotations)[0]
+        chunks.append((spiders, get_box_surface_mesh(translations[ids])))
+    return chunks
+
+
+def frustum_planes(camera, aspect: float) -> np.ndarray:
+    """Return the side planes of the camera's view frustum in world coordinates.
+
+    The near and far planes are left out on purpose: the clipping range is reset from the bounds
+    of the visible actors, so culling against it would feed back into the next clipping range.
+
+    Args:
+        camera (vtkCamera): camera.
+        aspect (float): width over height of the viewport.
+
+    Returns:
+        np.ndarray: ``(4, 4)`` plane coefficients ``(a, b, c, d)``, with ``a x + b y + c z + d >= 0``
+        inside the frustum.
+    """
+    planes = [0.0] * 24
+    camera.GetFrustumPlanes(aspect, planes)
+    return np.array(planes).reshape(6, 4)[:4]
+
+
+def boxes_in_frustum(bounds: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """Test axis-aligned bounding boxes against a set of planes.
+
+    A box is kept unless it is entirely outside of one plane, which is conservative: a few boxes
+    near the frustum corners are kept although they are not in view.
+
+    Args:
+        bounds (np.ndarray): ``(N, 6)`` bounds, ``(x_min, x_max, y_min, y_max, z_min, z_max)``.
+        planes (np.ndarray): ``(M, 4)`` plane coefficients, positive inside.
+
+    Returns:
+        np.ndarray: ``(N,)`` boolean array, True for the boxes that may be in view.
+    """
+    bounds = np.asarray(bounds, dtype=float).reshape(-1, 3, 2)
+    # corner of each box furthest along each plane normal: (N, M, 3)
+    corners = np.where(planes[None, :, :3] >= 0, bounds[:, None, :, 1], bounds[:, None, :, 0])
+    distances = np.einsum("nmk,mk->nm", corners, planes[:, :3])
+    return np.all(distances + planes[:, 3] >= 0, axis=1)
+
+
+def chunk_bounds(meshes: Sequence[pv.PolyData]) -> np.ndarray:
+    """Stack the bounds of a list of meshes.
+
+    Args:
+        meshes (Sequence[pv.PolyData]): meshes.
+
+    Returns:
+        np.ndarray: ``(N, 6)`` bounds.
+    """
+    return np.array([mesh.bounds for mesh in meshes], dtype=float).reshape(-1, 6)
+
+
+def chunk_stats(triangles: np.ndarray, visible: np.ndarray) -> Dict[str, int]:
+    """Summarize how much of a chunked scene is live.
+
+    Args:
+        triangles (np.ndarray): ``(N,)`` triangle count of each chunk.
+        visible (np.ndarray): ``(N,)`` boolean visibility of each chunk.
+
+    Returns:
+        Dict[str, int]: live and total counts of chunks and triangles.
+    """
+    return {
+        "live_chunks": int(np.count_nonzero(visible)),
+        "total_chunks": len(visible),
+        "live_triangles": int(np.sum(triangles[visible])),
+        "total_triangles": int(np.sum(triangles)),
+    }
@@ -0,0 +1,135 @@
+"""Tile the buildings over a grid to make a city backdrop of any size.
+
+The buildings are parsed and compacted once (see ``utils.get_buildings``), and every tile of the
+city is an instance of that one mesh: like the spiders of the ``"instanced"`` render mode, the
+tiles are the points of a point cloud drawn by a single ``vtkGlyph3DMapper``. Thousands of tiles
+cost no more parsing than one, and one point each on top of the buildings.
+
+Tiles can be turned by quarter turns about the vertical axis, each turn being its own glyph
+source selected by the ``orientation`` point array, and jittered in the ground plane.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkRenderingCore import vtkActor
+
+from xkcd_red_spider.render import add_glyphs, get_army_point_cloud
+from xkcd_red_spider.transforms import axis_rotation_matrix
+
+
+# Space left between the footprints of neighbouring tiles.
+CITY_GAP = 1.0
+# Largest random offset of a tile; under half of the gap, so tiles never overlap.
+CITY_JITTER = 0.25
+QUARTER_TURNS = 4
+
+
+def quarter_turn_templates(buildings: pv.PolyData) -> List[pv.PolyData]:
+    """Center the buildings on the vertical axis and turn them by 0, 90, 180 and 270 degrees.
+
+    Only the points are rotated; the cells of every turn are shared with ``buildings``.
+
+    Args:
+        buildings (pv.PolyData): buildings; they are not modified.
+
+    Returns:
+        List[pv.PolyData]: one template per quarter turn, centered on the vertical axis.
+    """
+    points = np.asarray(buildings.points)
+    center = np.array([*buildings.center[:2], 0.0])
+    templates = []
+    for turn in range(QUARTER_TURNS):
+        template = buildings.copy(deep=False)
+        rotated = (points - center) @ axis_rotation_matrix("z", 90 * turn).T
+        template.SetPoints(pv.vtk_points(rotated.astype(points.dtype)))
+        templates.append(template)
+    return templates
+
+
+def city_tiles(
+    shape: Tuple[int, int],
+    footprint: Tuple[float, float],
+    gap: float = CITY_GAP,
+    rotate: bool = False,
+    jitter: float = 0.0,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Lay the tiles of a city out on a grid centered on the origin.
+
+    Args:
+        shape (Tuple[int, int]): number of rows (along y) and columns (along x) of tiles.
+        footprint (Tuple[float, float]): width (along x) and depth (along y) of one tile.
+        gap (float, optional): space between neighbouring footprints. Defaults to ``CITY_GAP``.
+        rotate (bool, optional): whether or not to turn every tile by a random number of quarter
+            turns. The grid is then square, so that turned tiles do not overlap. Defaults to
+            False.
+        jitter (float, optional): largest random offset of a tile along x and y; tiles do not
+            overlap as long as it is under half of ``gap``. Defaults to 0.0.
+        seed (int, optional): seed of the random turns and offsets. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ``(N, 3)`` tile centers and ``(N,)`` quarter turns, row
+        by row. With an odd number of rows and columns, the middle tile is at the origin and
+        not turned.
+    """
+    n_rows, n_cols = shape
+    width, depth = footprint
+    if rotate:
+        width = depth = max(width, depth)
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(n_rows * n_cols), n_cols)
+    centers = np.zeros((n_rows * n_cols, 3))
+    centers[:, 0] = (cols - (n_cols - 1) / 2) * (width + gap)
+    centers[:, 1] = (rows - (n_rows - 1) / 2) * (depth + gap)
+    if jitter:
+        centers[:, :2] += rng.uniform(-jitter, jitter, (len(centers), 2))
+    if rotate:
+        turns = rng.integers(0, QUARTER_TURNS, len(centers), dtype=np.int32)
+    else:
+        turns = np.zeros(len(centers), dtype=np.int32)
+    if n_rows % 2 and n_cols % 2:
+        # Keep the middle tile exactly where the buildings are
+        middle = len(centers) // 2
+        centers[middle] = 0.0
+        turns[middle] = 0
+    return centers, turns
+
+
+def add_city(
+    plotter: pv.Plotter,
+    shape: Tuple[int, int],
+    buildings: pv.PolyData,
+    gap: float = CITY_GAP,
+    rotate: bool = True,
+    jitter: float = CITY_JITTER,
+    seed: Optional[int] = 0,
+    **kwargs,
+) -> vtkActor:
+    """Add a city tiled from the buildings with a single actor.
+
+    The grid is centered on the buildings, so with an odd number of rows and columns the middle
+    tile is the buildings exactly where they are.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the city to.
+        shape (Tuple[int, int]): number of rows (along y) and columns (along x) of tiles.
+        buildings (pv.PolyData): buildings to tile, e.g. from ``utils.get_buildings``.
+        gap (float, optional): space between neighbouring tiles. Defaults to ``CITY_GAP``.
+        rotate (bool, optional): whether or not to turn the tiles by random quarter turns.
+            Defaults to True.
+        jitter (float, optional): largest random offset of a tile along x and y. Defaults to
+            ``CITY_JITTER``.
+        seed (int, optional): seed of the random turns and offsets. Defaults to 0, so the same
+            shape always gives the same city.
+        **kwargs: keyword arguments passed to ``plotter.add_mesh``, e.g. ``color``.
+
+    Returns:
+        vtkActor: the glyph actor drawing all the tiles.
+    """
+    xmin, xmax, ymin, ymax = buildings.bounds[:4]
+    centers, turns = city_tiles(shape, (xmax - xmin, ymax - ymin), gap, rotate, jitter, seed)
+    centers[:, :2] += buildings.center[:2]
+    cloud = get_army_point_cloud(centers, turns)
+    templates = quarter_turn_templates(buildings)
+    return add_glyphs(plotter, cloud, templates, "orientation", **kwargs)
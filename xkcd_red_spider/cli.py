@@ -0,0 +1,300 @@
+"""Command line interface of the red spider scene, installed as the ``xkcd-red-spider`` command.
+
+The subcommands are:
+
+* ``view``: open a window with the scene, like ``python xkcd_red_spider/main.py``;
+* ``render``: render the scene off screen to a PNG file;
+* ``export``: export the scene to a ``.vtkjs`` archive, unless its inputs did not change;
+* ``generate-army``: write a random army to an army file (see ``columnar.save_army``), which the
+  other subcommands read with ``--army``;
+* ``bench``: measure how long the command takes to start and to import the heavy modules, then
+  optionally run the stage benchmarks of ``xkcd_red_spider.bench``.
+
+Only the standard library is imported to parse the arguments, so ``--help`` and invalid arguments
+return at once. numpy is imported by the subcommands handling armies, and pyvista and VTK only by
+the subcommands drawing the scene. For example::
+
+    xkcd-red-spider generate-army army.xrs --n-units 100000 --placement exposed
+    xkcd-red-spider render --army army.xrs --render-mode merged --output army.png
+    xkcd-red-spider bench --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Sequence
+
+
+# Copies of ``render.RENDER_MODES``, ``lattice.PLACEMENTS``, ``export.POINT_ENCODINGS`` and the
+# keys of ``picking.PICK_EVENTS``: importing those modules to validate the arguments would load VTK
+# and numpy.
+RENDER_MODES = ("per_unit", "instanced", "lod", "merged", "chunked")
+PLACEMENTS = ("random", "exposed")
+POINT_ENCODINGS = ("float32", "int16")
+PICK_MODES = ("click", "hover")
+
+DEFAULT_COLORS = ("red", "tan", "lightgray")
+DEFAULT_WINDOW_SIZE = (1024, 768)
+DEFAULT_STARTUP_REPEAT = 5
+
+# Python code run in a fresh interpreter by ``measure_startup``, one entry per measurement.
+STARTUP_PROBES = {
+    "interpreter": "pass",
+    "cli_help": (
+        "import contextlib, io\n"
+        "from xkcd_red_spider.cli import main\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+        "    main(['--help'])"
+    ),
+    "import_columnar": "import xkcd_red_spider.columnar",
+    "import_pyvista": "import pyvista",
+    "import_scene": "import xkcd_red_spider.main",
+}
+
+
+def measure_startup(repeat: int = DEFAULT_STARTUP_REPEAT) -> Dict[str, float]:
+    """Time each of ``STARTUP_PROBES`` in a fresh interpreter.
+
+    Every probe includes the start of the interpreter itself, which the ``"interpreter"`` probe
+    measures alone.
+
+    Args:
+        repeat (int, optional): number of runs of each probe. Defaults to
+            ``DEFAULT_STARTUP_REPEAT``.
+
+    Returns:
+        Dict[str, float]: median wall time of each probe, in seconds.
+    """
+    # Run from this checkout even when the package is not installed
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    medians = {}
+    for name, code in STARTUP_PROBES.items():
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], env=env, check=True)
+            seconds.append(time.perf_counter() - start)
+        medians[name] = statistics.median(seconds)
+    return medians
+
+
+def format_startup(medians: Dict[str, float]) -> str:
+    """Format the results of :func:`measure_startup` as a table.
+
+    Args:
+        medians (Dict[str, float]): median wall time of each probe, in seconds.
+
+    Returns:
+        str: one line per probe, with its time over the interpreter start.
+    """
+    baseline = medians.get("interpreter", 0.0)
+    lines = [f"{'probe':<22}{'median_seconds':>16}{'over_python':>14}"]
+    for name, seconds in medians.items():
+        lines.append(f"{name:<22}{seconds:>16.4f}{seconds - baseline:>14.4f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of ``xkcd-red-spider``.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="xkcd-red-spider", description="Draw the red spiders cometh scene of xkcd 126."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scene = argparse.ArgumentParser(add_help=False)
+    scene.add_argument("--army", help="army file to draw instead of the comic's army")
+    scene.add_argument("--render-mode", choices=RENDER_MODES, default="per_unit")
+    scene.add_argument(
+        "--colors", nargs=3, default=DEFAULT_COLORS, metavar=("SPIDER", "BOX", "BUILDINGS")
+    )
+    scene.add_argument(
+        "--city", type=int, nargs=2, metavar=("ROWS", "COLS"), help="tile the buildings"
+    )
+
+    view = subparsers.add_parser("view", parents=[scene], help="open a window with the scene")
+    view.add_argument(
+        "--progressive",
+        action="store_true",
+        help="open the window at once and load the scene in the background (merged mode only)",
+    )
+    view.add_argument(
+        "--pick",
+        choices=PICK_MODES,
+        help="name the unit under the mouse on left clicks or on every mouse move",
+    )
+
+    render = subparsers.add_parser("render", parents=[scene], help="render the scene to PNG")
+    render.add_argument("--output", default="red_spiders_cometh.png")
+    render.add_argument(
+        "--window-size", type=int, nargs=2, default=DEFAULT_WINDOW_SIZE, metavar=("W", "H")
+    )
+
+    export = subparsers.add_parser("export", parents=[scene], help="export the scene to vtkjs")
+    export.add_argument("--output", default="red_spiders_cometh")
+    export.add_argument("--force", action="store_true", help="export even if nothing changed")
+    export.add_argument(
+        "--compact", action="store_true", help="drop unused arrays and share copies of meshes"
+    )
+    export.add_argument("--point-encoding", choices=POINT_ENCODINGS, default="float32")
+    export.add_argument(
+        "--compare",
+        action="store_true",
+        help="also print the size and decode time of the archive against a default export",
+    )
+
+    generate = subparsers.add_parser("generate-army", help="write a random army file")
+    generate.add_argument("output", help="army file to write")
+    generate.add_argument("--n-units", type=int, default=15)
+    generate.add_argument("--range", type=int, nargs=3, default=(10, 3, 1), metavar=("X", "Y", "Z"))
+    generate.add_argument("--placement", choices=PLACEMENTS, default="random")
+    generate.add_argument("--seed", type=int)
+
+    bench = subparsers.add_parser(
+        "bench", help="measure the startup time, then run the stage benchmarks if given arguments"
+    )
+    bench.add_argument("--repeat", type=int, default=DEFAULT_STARTUP_REPEAT)
+    bench.add_argument(
+        "suite_args",
+        nargs=argparse.REMAINDER,
+        help="arguments of python -m xkcd_red_spider.bench, e.g. run --army-sizes 14",
+    )
+
+    args = parser.parse_args(argv)
+    if getattr(args, "progressive", False) and args.render_mode != "merged":
+        parser.error("--progressive requires --render-mode merged")
+    if args.command == "generate-army" and args.n_units < 0:
+        parser.error("--n-units must not be negative")
+    if args.command == "bench" and args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+
+def _scene_kwargs(args: argparse.Namespace) -> Dict:
+    spider_army_coord = None
+    if args.army:
+        from xkcd_red_spider.columnar import army_to_coord, load_army
+
+        spider_army_coord = army_to_coord(load_army(args.army))
+    color_spider, color_box, color_buildings = args.colors
+    return {
+        "color_spider": color_spider,
+        "color_box": color_box,
+        "color_buildings": color_buildings,
+        "render_mode": args.render_mode,
+        "spider_army_coord": spider_army_coord,
+        "city_shape": tuple(args.city) if args.city else None,
+    }
+
+
+def _draw_scene(args: argparse.Namespace, **plotter_kwargs):
+    # The army file is read first, so a bad file fails before VTK is loaded
+    kwargs = _scene_kwargs(args)
+    import pyvista as pv
+
+    import xkcd_red_spider.main as scene
+
+    pv.set_plot_theme("document")
+    plotter = pv.Plotter(**plotter_kwargs)
+    scene.main(
+        plotter=plotter,
+        progressive_loading=getattr(args, "progressive", False),
+        unit_picking=getattr(args, "pick", None),
+        **kwargs,
+    )
+    plotter.camera_position = scene.DEFAULT_CAMERA_POSITION
+    return plotter, kwargs
+
+
+def _compare_exports(plotter, path: str) -> str:
+    import xkcd_red_spider.export as export
+
+    path = path if path.endswith(".vtkjs") else path + ".vtkjs"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        default_path = os.path.join(tmp_dir, os.path.basename(path))
+        export.export_vtkjs(plotter, default_path)
+        rows = {"default": export.archive_stats(default_path), "this": export.archive_stats(path)}
+    lines = [f"{'archive':<10}{'archive_bytes':>15}{'payload_bytes':>15}{'decode_ms':>11}"]
+    for name, stats in rows.items():
+        lines.append(
+            f"{name:<10}{stats['archive_bytes']:>15}{stats['payload_bytes']:>15}"
+            f"{1000 * stats['decode_seconds']:>11.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _generate_army(args: argparse.Namespace) -> int:
+    from xkcd_red_spider.columnar import generate_random_army, save_army
+
+    x_range, y_range, z_range = args.range
+    army = generate_random_army(
+        args.n_units, x_range, y_range, z_range, seed=args.seed, placement=args.placement
+    )
+    save_army(args.output, army)
+    print(f"{army.n_units} units, {army.nbytes} bytes written to {args.output}")
+    return 0
+
+
+def _bench(args: argparse.Namespace) -> int:
+    print(format_startup(measure_startup(args.repeat)))
+    if not args.suite_args:
+        return 0
+    import xkcd_red_spider.bench as bench
+
+    return bench.main(args.suite_args)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run ``xkcd-red-spider`` from the command line.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        int: exit status.
+    """
+    args = parse_args(argv)
+    if args.command == "generate-army":
+        return _generate_army(args)
+    if args.command == "bench":
+        return _bench(args)
+
+    if args.command == "view":
+        plotter, _ = _draw_scene(args)
+        plotter.show()
+        print(plotter.camera_position)
+    elif args.command == "render":
+        plotter, _ = _draw_scene(args, off_screen=True, window_size=list(args.window_size))
+        plotter.screenshot(args.output)
+        plotter.close()
+        print(f"Rendered {args.output}")
+    else:
+        import xkcd_red_spider.export as export
+        import xkcd_red_spider.main as scene
+
+        plotter, kwargs = _draw_scene(args, off_screen=True)
+        scene_hash = scene.get_scene_hash(**kwargs)
+        report = export.export_vtkjs(
+            plotter, args.output, scene_hash, args.force, args.compact, args.point_encoding
+        )
+        status = "Exported" if report["exported"] else "Unchanged"
+        print(f"{status}: {args.output}, {report['n_datasets']} datasets")
+        if args.compare:
+            print(_compare_exports(plotter, args.output))
+        plotter.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Compact struct-of-arrays representation of a spider army, with a memory-mappable file format.
+
+A dict such as ``XKCD_SPIDER_ARMY_COORD`` holds a few Python objects per unit. ``ArmyArrays``
+holds one column per attribute instead:
+
+* ``positions``: ``(N, 3)`` int16 lattice coordinates, or int32 when they do not fit in int16;
+* ``orientations``: ``(N,)`` uint8 orientation indices (see ``transforms.CUBE_ROTATIONS``);
+* ``scales``: ``(N,)`` float32 scaling factors.
+
+That is 11 bytes per unit, so a million-unit army takes 11 MB. The columns can be passed as they
+are to ``army.build_army_mesh`` and ``render.get_army_point_cloud``.
+
+The file format is a small JSON header followed by each column as raw little-endian bytes, aligned
+on 64 bytes (column offsets in the header are relative to the end of the padded header)::
+
+    b"XRSARMY\\0" | uint32 header length | JSON header | padding | positions | orientations | scales
+
+so :func:`load_army` memory-maps the columns instead of reading them.
+"""
+import json
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from xkcd_red_spider.lattice import PLACEMENTS, exposed_orientations
+from xkcd_red_spider.transforms import ORIENTATION_STEPS, orientation_indices
+
+
+ARMY_FILE_MAGIC = b"XRSARMY\0"
+ARMY_FILE_VERSION = 1
+
+_ALIGNMENT = 64
+_COLUMNS = ("positions", "orientations", "scales")
+
+
+class ArmyArrays(NamedTuple):
+    """Spider army as one array per attribute. See :func:`make_army`."""
+
+    positions: np.ndarray
+    orientations: np.ndarray
+    scales: np.ndarray
+
+    @property
+    def n_units(self) -> int:
+        """int: number of units."""
+        return len(self.positions)
+
+    @property
+    def nbytes(self) -> int:
+        """int: memory taken by the columns, in bytes."""
+        return sum(column.nbytes for column in self)
+
+
+def make_army(
+    positions: np.ndarray,
+    orientations: Optional[np.ndarray] = None,
+    scales: Union[float, np.ndarray] = 1.0,
+) -> ArmyArrays:
+    """Build an army from its columns, converting them to the compact dtypes.
+
+    Args:
+        positions (np.ndarray): ``(N, 2)`` or ``(N, 3)`` integer unit positions; 2D positions get
+            ``z = 0``.
+        orientations (np.ndarray, optional): ``(N,)`` orientation indices. Defaults to None,
+            which means no rotation.
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+
+    Returns:
+        ArmyArrays: the army.
+    """
+    positions = np.asarray(positions)
+    if positions.ndim != 2 or positions.shape[1] not in (2, 3):
+        raise ValueError(f"positions must have shape (N, 2) or (N, 3), got {positions.shape}")
+    if positions.dtype.kind == "f" and not np.array_equal(positions, np.rint(positions)):
+        raise ValueError("positions must be integers")
+    if positions.shape[1] == 2:
+        positions = np.column_stack([positions, np.zeros(len(positions), dtype=positions.dtype)])
+    int16 = np.iinfo(np.int16)
+    fits_int16 = not positions.size or (
+        positions.min() >= int16.min and positions.max() <= int16.max
+    )
+    positions = np.ascontiguousarray(positions, dtype=np.int16 if fits_int16 else np.int32)
+
+    n_units = len(positions)
+    if orientations is None:
+        orientations = np.zeros(n_units, dtype=np.uint8)
+    orientations = np.asarray(orientations)
+    n_orientations = len(ORIENTATION_STEPS)
+    if orientations.size and (orientations.min() < 0 or orientations.max() >= n_orientations):
+        raise ValueError(f"orientations must be in [0, {n_orientations})")
+    orientations = np.ascontiguousarray(np.broadcast_to(orientations, (n_units,)), dtype=np.uint8)
+    scales = np.ascontiguousarray(np.broadcast_to(scales, (n_units,)), dtype=np.float32)
+    return ArmyArrays(positions, orientations, scales)
+
+
+def army_from_coord(
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    extra_spider: bool = True,
+) -> ArmyArrays:
+    """Convert army coordinates in the dict format into columns.
+
+    Args:
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army; all rotations must be multiples of 90 degrees.
+            Defaults to None, which uses ``XKCD_SPIDER_ARMY_COORD``.
+        extra_spider (bool, optional): whether or not to add the extra spiders of the comic, see
+            ``get_spider_army_units``. Defaults to True.
+
+    Returns:
+        ArmyArrays: the army.
+    """
+    # Imported here, so that army files can be read and written without loading VTK
+    from xkcd_red_spider.utils import get_spider_army_units
+
+    units = get_spider_army_units(spider_army_coord, extra_spider)
+    orientations = orientation_indices([rotation for _, rotation in units])
+    if orientations is None:
+        raise ValueError("Only rotations that are multiples of 90 degrees can be stored")
+    positions = np.array([translation for translation, _ in units], dtype=np.int64).reshape(-1, 3)
+    return make_army(positions, orientations)
+
+
+def army_to_coord(army: ArmyArrays) -> Dict[Tuple[int, int, int], List[Tuple[str, int]]]:
+    """Convert an army back to the dict format.
+
+    Every orientation becomes its shortest list of rotation steps (see
+    ``transforms.ORIENTATION_STEPS``), and the scales are dropped. Units sharing a position, like
+    the extra spiders of the comic, collapse to the last one.
+
+    Args:
+        army (ArmyArrays): the army.
+
+    Returns:
+        Dict[Tuple[int, int, int], List[Tuple[str, int]]]: Coordinates and rotation steps of the
+        red spider army.
+    """
+    return {
+        tuple(position): ORIENTATION_STEPS[orientation]
+        for position, orientation in zip(army.positions.tolist(), army.orientations.tolist())
+    }
+
+
+def generate_random_army(
+    num_spider: int = 15,
+    x_range: int = 10,
+    y_range: int = 3,
+    z_range: int = 1,
+    seed: Union[int, np.random.Generator, None] = None,
+    placement: str = "random",
+) -> ArmyArrays:
+    """Generate an army at random, with ``num_spider`` units on distinct positions.
+
+    Unlike ``generate_random_spider_army_coord``, positions are sampled without replacement from
+    the lattice, so no unit overwrites another, and each orientation index is drawn directly and
+    uniformly from the 24 axis-aligned orientations.
+
+    Args:
+        num_spider (int, optional): number of spider-box units. Defaults to 15.
+        x_range (int, optional): limit (-x_range, x_range) of the spider x-coordinate, inclusive.
+            Defaults to 10.
+        y_range (int, optional): limit (-y_range, y_range) of the spider y-coordinate, inclusive.
+            Defaults to 3.
+        z_range (int, optional): limit (-z_range, z_range) of the spider z-coordinate, inclusive.
+            Defaults to 1.
+        seed (Union[int, np.random.Generator], optional): seed or generator, for reproducible
+            armies. Defaults to None, which draws fresh entropy.
+        placement (str, optional): one of ``lattice.PLACEMENTS``. ``"random"`` draws every
+            orientation uniformly, ``"exposed"`` stands every spider on an exposed face of its box
+            (see ``lattice.exposed_orientations``). Units whose box is buried on all 6 sides are
+            dropped, as neither their box nor their spider can be seen, so fewer than
+            ``num_spider`` units may be returned. Defaults to "random".
+
+    Returns:
+        ArmyArrays: the army.
+    """
+    if placement not in PLACEMENTS:
+        raise ValueError(f"placement must be one of {PLACEMENTS}, got {placement!r}")
+    rng = np.random.default_rng(seed)
+    shape = (2 * x_range + 1, 2 * y_range + 1, 2 * z_range + 1)
+    n_cells = int(np.prod(shape, dtype=np.int64))
+    if num_spider > n_cells:
+        raise ValueError(f"Cannot place {num_spider} units on a lattice of {n_cells} positions")
+    cells = rng.choice(n_cells, size=num_spider, replace=False)
+    positions = np.column_stack(np.unravel_index(cells, shape)) - [x_range, y_range, z_range]
+    if placement == "exposed":
+        orientations, visible = exposed_orientations(positions, rng)
+        positions, orientations = positions[visible], orientations[visible]
+    else:
+        orientations = rng.integers(0, len(ORIENTATION_STEPS), size=num_spider, dtype=np.uint8)
+    return make_army(positions, orientations)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def save_army(path: str, army: ArmyArrays) -> None:
+    """Write an army to a binary file that :func:`load_army` can memory-map.
+
+    Args:
+        path (str): path to the file.
+        army (ArmyArrays): the army.
+    """
+    columns, offset = [], 0
+    for name in _COLUMNS:
+        column = getattr(army, name)
+        dtype = column.dtype.newbyteorder("<").str
+        columns.append({"name": name, "dtype": dtype, "shape": column.shape, "offset": offset})
+        offset = _aligned(offset + column.nbytes)
+    header = {"version": ARMY_FILE_VERSION, "n_units": army.n_units, "columns": columns}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(ARMY_FILE_MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ARMY_FILE_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for column in columns:
+            f.write(b"\0" * (data_start + column["offset"] - f.tell()))
+            data = np.ascontiguousarray(getattr(army, column["name"]), dtype=column["dtype"])
+            f.write(data.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_army(path: str, mmap: bool = True) -> ArmyArrays:
+    """Read an army written by :func:`save_army`.
+
+    Args:
+        path (str): path to the file.
+        mmap (bool, optional): whether or not to memory-map the columns read-only instead of
+            reading them into memory. Defaults to True.
+
+    Returns:
+        ArmyArrays: the army.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(ARMY_FILE_MAGIC))
+        if magic != ARMY_FILE_MAGIC:
+            raise ValueError(f"{path} is not an army file")
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+        if header["version"] > ARMY_FILE_VERSION:
+            raise ValueError(f"{path} has version {header['version']}, newer than supported")
+
+        data_start = _aligned(len(ARMY_FILE_MAGIC) + 4 + header_length)
+
+        arrays = {}
+        for column in header["columns"]:
+            shape, dtype = tuple(column["shape"]), np.dtype(column["dtype"])
+            offset, count = data_start + column["offset"], int(np.prod(shape))
+            if mmap and count:
+                arrays[column["name"]] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=offset, shape=shape
+                )
+            else:
+                f.seek(offset)
+                arrays[column["name"]] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return ArmyArrays(**arrays)
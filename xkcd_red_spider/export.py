@@ -0,0 +1,799 @@
+"""Content-addressed export of a plotter's scene to a vtk.js ``.vtkjs`` archive.
+
+The archive has the layout read by the vtk.js ``SceneExplorer`` (see ``page/view_scene.html``):
+``<name>/index.json`` lists the actors with their properties and the camera, and every dataset
+lives in ``<name>/data_0_<i>/index.json`` with its arrays stored as raw little-endian blobs in
+``<name>/data_0_<i>/data/<md5 of the blob>``.
+
+Two levels of content addressing keep re-exports cheap:
+
+* the archive records a hash of the scene inputs (army coordinates, colors, camera, asset files
+  and the code that builds the scene, see :func:`scene_hash`), and is not rewritten at all while
+  that hash is unchanged;
+* when the scene did change, every blob whose md5 is already in the old archive is copied over
+  still compressed, so only the arrays that actually changed are deflated again.
+
+Compact exports (``compact=True``) shrink what the web viewer downloads and parses: only the
+arrays used to color a mesh are kept, a mesh that is a moved, turned or scaled copy of one
+already exported is drawn from that dataset with its own actor transform, and cells are stored
+as 16-bit indices when they fit. ``point_encoding="int16"`` additionally quantizes the points of
+every dataset to int16 over its bounding box; the offset and the scale of the quantization are
+folded into the actor transforms, so the viewer decodes them for free.
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+import warnings
+import zipfile
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from vtkmodules.vtkCommonCore import VTK_COLOR_MODE_MAP_SCALARS
+from vtkmodules.vtkCommonDataModel import vtkDataObject
+from vtkmodules.vtkCommonTransforms import vtkTransform
+from vtkmodules.vtkRenderingCore import (
+    VTK_SCALAR_MODE_USE_CELL_FIELD_DATA,
+    vtkActor,
+    vtkCamera,
+    vtkGlyph3DMapper,
+    vtkPolyDataMapper,
+)
+
+from xkcd_red_spider.army import merge_transformed
+from xkcd_red_spider.cache import builder_fingerprint, file_fingerprint
+from xkcd_red_spider.transforms import compose_transforms
+
+
+# Bump this when the layout of the exported archive changes.
+EXPORT_VERSION = 1
+# Directory of the package's own modules, hashed by :func:`code_digest`.
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Level 9 compresses no better on the exported arrays (the cell arrays even come out larger), and
+# about 7 times slower.
+COMPRESS_LEVEL = 6
+POINT_ENCODINGS = ("float32", "int16")
+# Cell array holding the lookup table colors baked by :func:`_bake_cell_colors`.
+BAKED_COLORS_ARRAY = "colors"
+
+_CELL_KEYS = (("verts", "verts"), ("lines", "lines"), ("faces", "polys"), ("strips", "strips"))
+_JS_TYPES = {
+    "int8": "Int8Array",
+    "uint8": "Uint8Array",
+    "int16": "Int16Array",
+    "uint16": "Uint16Array",
+    "int32": "Int32Array",
+    "uint32": "Uint32Array",
+    "float32": "Float32Array",
+    "float64": "Float64Array",
+}
+_ACTIVE_ATTRIBUTES = (
+    "GlobalIds",
+    "Normals",
+    "PedigreeIds",
+    "Scalars",
+    "TCoords",
+    "Tensors",
+    "Vectors",
+)
+
+
+class Blob(NamedTuple):
+    """Array blob as stored in the archive: raw deflate stream, CRC-32 and uncompressed size."""
+
+    compressed: bytes
+    crc: int
+    size: int
+
+
+def scene_hash(inputs: Dict, builders: Sequence[Callable] = (), sources: Sequence[str] = ()) -> str:
+    """Hash everything the exported scene is built from.
+
+    Args:
+        inputs (Dict): JSON-serializable scene inputs, e.g. army coordinates, colors and camera.
+        builders (Sequence[Callable], optional): functions that build the scene; editing any of
+            them changes the hash. Defaults to ().
+        sources (Sequence[str], optional): paths to the asset files the scene is built from.
+            Defaults to ().
+
+    Returns:
+        str: hex digest of the scene inputs.
+    """
+    fingerprint = "|".join(
+        [f"v{EXPORT_VERSION}", json.dumps(inputs, sort_keys=True, default=str)]
+        + [builder_fingerprint(builder) for builder in builders]
+        + [file_fingerprint(source) for source in sources]
+    )
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def code_digest(package_dir: str = PACKAGE_DIR) -> str:
+    """Hash the content of every Python module of a package.
+
+    Listing the functions that build a scene (the ``builders`` of :func:`scene_hash`) misses the
+    helpers they call, so scenes built by the package itself are keyed on all of its modules: an
+    edit anywhere re-exports the scene at worst once, and never leaves a stale archive.
+
+    Args:
+        package_dir (str, optional): directory of the package. Defaults to ``PACKAGE_DIR``.
+
+    Returns:
+        str: hex digest of the module names and contents.
+    """
+    digest = hashlib.sha1()
+    for filename in sorted(os.listdir(package_dir)):
+        if filename.endswith(".py"):
+            with open(os.path.join(package_dir, filename), "rb") as f:
+                digest.update(filename.encode("utf-8") + b"\0" + f.read() + b"\0")
+    return digest.hexdigest()
+
+
+def read_scene_hash(path: str) -> Optional[str]:
+    """Return the scene hash recorded in a ``.vtkjs`` archive.
+
+    Args:
+        path (str): path to the archive.
+
+    Returns:
+        Optional[str]: the scene hash, or None if the archive does not exist, is unreadable, or
+        was not written by :func:`export_vtkjs`.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            index = next(name for name in archive.namelist() if name.count("/") == 1)
+            return json.loads(archive.read(index)).get("sceneHash")
+    except (OSError, zipfile.BadZipFile, StopIteration, ValueError):
+        return None
+
+
+def _compress(data: bytes) -> Blob:
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    return Blob(compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data))
+
+
+def _read_blobs(path: str) -> Dict[str, Blob]:
+    # Compressed blobs of an existing archive, keyed by their md5 file name
+    blobs = {}
+    try:
+        with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+            for info in archive.infolist():
+                if "/data/" not in info.filename or info.compress_type != zipfile.ZIP_DEFLATED:
+                    continue
+                # skip the local file header, whose name and extra field lengths may differ from
+                # the ones in the central directory
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack("<HH", f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                blob = Blob(f.read(info.compress_size), info.CRC, info.file_size)
+                blobs[info.filename.rsplit("/", 1)[1]] = blob
+    except (OSError, zipfile.BadZipFile, struct.error):
+        return {}
+    return blobs
+
+
+def _append_deflated(archive: zipfile.ZipFile, info: zipfile.ZipInfo, data: bytes) -> bool:
+    # The one place relying on zipfile internals: ``ZipFile.writestr`` compresses its data itself,
+    # so an already deflated entry is appended the way it does, through the private ``fp``,
+    # ``filelist``, ``NameToInfo`` and ``start_dir`` of the archive. Archives needing zip64
+    # extensions, or a zipfile without these attributes, are left to ``writestr`` (False).
+    internals = ("fp", "filelist", "NameToInfo", "start_dir")
+    if archive.mode != "w" or not all(hasattr(archive, name) for name in internals):
+        return False
+    offset = archive.fp.tell()
+    if max(offset, len(data), info.file_size) >= zipfile.ZIP64_LIMIT:
+        return False
+    info.header_offset = offset
+    archive.fp.write(info.FileHeader())
+    archive.fp.write(data)
+    archive.filelist.append(info)
+    archive.NameToInfo[info.filename] = info
+    archive.start_dir = archive.fp.tell()
+    return True
+
+
+def _write_blob(archive: zipfile.ZipFile, name: str, blob: Blob) -> None:
+    # Blobs reused from the previous archive are written without compressing them again
+    info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o600 << 16
+    info.CRC, info.compress_size, info.file_size = blob.crc, len(blob.compressed), blob.size
+    if not _append_deflated(archive, info, blob.compressed):
+        archive.writestr(info, zlib.decompress(blob.compressed, -15))
+
+
+def _array_ranges(array: np.ndarray) -> List[Dict]:
+    array = array.reshape(len(array), -1).astype(float)
+    if not array.size:
+        return [{"min": 0.0, "max": 0.0, "component": None}]
+    ranges = [
+        {"min": float(column.min()), "max": float(column.max()), "component": None}
+        for column in array.T
+    ]
+    if array.shape[1] > 1:
+        magnitude = np.linalg.norm(array, axis=1)
+        ranges.append(
+            {"min": float(magnitude.min()), "max": float(magnitude.max()), "component": None}
+        )
+    return ranges
+
+
+class _DatasetWriter:
+    """Serialize datasets to the vtk.js ``index.json`` layout, collecting their blobs by md5.
+
+    Args:
+        old_blobs (Dict[str, Blob]): compressed blobs of the previous archive, reused as is.
+    """
+
+    def __init__(self, old_blobs: Dict[str, Blob]) -> None:
+        self.old_blobs = old_blobs
+        self.blobs: Dict[str, Blob] = {}
+        self.n_reused = 0
+        self._refs: List[str] = []
+
+    def array(self, array: np.ndarray, name: Optional[str], vtk_class: str) -> Dict:
+        array = np.asarray(array)
+        if array.dtype == bool:
+            array = array.astype(np.uint8)
+        elif array.dtype.kind in "iu" and array.dtype.itemsize == 8:
+            array = array.astype(np.int32)  # vtk.js has no 64-bit integer arrays
+        data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes()
+        md5 = hashlib.md5(data).hexdigest()
+        if md5 not in self.blobs:
+            if md5 in self.old_blobs:
+                self.blobs[md5] = self.old_blobs[md5]
+                self.n_reused += 1
+            else:
+                self.blobs[md5] = _compress(data)
+        self._refs.append(md5)
+        return {
+            "ref": {"id": md5, "encode": "LittleEndian", "basepath": "data"},
+            "vtkClass": vtk_class,
+            "name": name,
+            "dataType": _JS_TYPES[array.dtype.name],
+            "numberOfComponents": int(np.prod(array.shape[1:], dtype=int)),
+            "size": int(array.size),
+            "ranges": _array_ranges(array),
+        }
+
+    def attributes(
+        self,
+        vtk_attributes,
+        data: Optional[pv.DataSetAttributes],
+        keep: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        names = [] if data is None else [n for n in data.keys() if data[n].dtype.kind in "biuf"]
+        if keep is not None:
+            names = [name for name in names if name in keep]
+        attributes = {"vtkClass": "vtkDataSetAttributes"}
+        for attribute in _ACTIVE_ATTRIBUTES:
+            active = None if data is None else getattr(vtk_attributes, f"Get{attribute}")()
+            name = active.GetName() if active is not None else None
+            attributes[f"active{attribute}"] = names.index(name) if name in names else -1
+        attributes["arrays"] = [
+            {"data": self.array(data[name], name, "vtkDataArray")} for name in names
+        ]
+        return attributes
+
+    def dataset(
+        self,
+        mesh: pv.PolyData,
+        name: str,
+        points: Optional[np.ndarray] = None,
+        keep: Optional[Sequence[str]] = None,
+    ) -> Tuple[Dict, List[str]]:
+        # ``points`` replaces the points of the mesh, e.g. quantized; ``keep`` lists the data
+        # arrays to write, all of them when None. Cells shrink to 16 bits along with the arrays.
+        self._refs = []
+        dataset = {"metadata": {"name": name}, "vtkClass": "vtkPolyData"}
+        if points is None:
+            points = np.asarray(mesh.points, dtype=np.float32)
+        dataset["points"] = self.array(points, "Points", "vtkPoints")
+        for key, js_key in _CELL_KEYS:
+            cells = np.asarray(getattr(mesh, key))
+            if cells.size:
+                small = keep is not None and cells.max() <= np.iinfo(np.uint16).max
+                cells = cells.astype(np.uint16 if small else np.uint32)
+                dataset[js_key] = self.array(cells, None, "vtkCellArray")
+        dataset["pointData"] = self.attributes(mesh.GetPointData(), mesh.point_data, keep)
+        dataset["cellData"] = self.attributes(mesh.GetCellData(), mesh.cell_data, keep)
+        dataset["fieldData"] = self.attributes(None, None)
+        return dataset, list(dict.fromkeys(self._refs))
+
+
+def _glyph_meshes(mapper: vtkGlyph3DMapper) -> List[pv.PolyData]:
+    # One merged mesh per glyph source, placed like ``render.get_glyph_mapper`` places them
+    if mapper.GetOrient():
+        raise ValueError("Exporting oriented glyphs is not supported")
+    cloud = pv.wrap(mapper.GetInputDataObject(0, 0))
+
+    def input_array(index: int) -> Optional[np.ndarray]:
+        name = mapper.GetInputArrayInformation(index).Get(vtkDataObject.FIELD_NAME())
+        return np.asarray(cloud.point_data[name]) if name in cloud.point_data else None
+
+    translations = np.asarray(cloud.points, dtype=float)
+    scales = np.full(len(translations), mapper.GetScaleFactor())
+    scale_array = input_array(vtkGlyph3DMapper.SCALE)
+    if mapper.GetScaling() and scale_array is not None:
+        scales *= np.linalg.norm(scale_array.reshape(len(translations), -1), axis=1)
+    n_sources = mapper.GetNumberOfInputConnections(1)
+    indices = np.zeros(len(translations), dtype=int)
+    index_array = input_array(vtkGlyph3DMapper.SOURCE_INDEX)
+    if mapper.GetSourceIndexing() and index_array is not None:
+        indices = np.clip(index_array.astype(int), 0, n_sources - 1)
+
+    meshes = []
+    for i in np.unique(indices):
+        selected = indices == i
+        transforms = compose_transforms(scales[selected], None, translations[selected])
+        meshes.append(merge_transformed(pv.wrap(mapper.GetSource(int(i))), transforms))
+    return meshes
+
+
+def actor_meshes(actor: vtkActor) -> List[pv.PolyData]:
+    """Return the surface meshes an actor draws.
+
+    Args:
+        actor (vtkActor): actor, with a mesh or a ``vtkGlyph3DMapper`` as mapper.
+
+    Returns:
+        List[pv.PolyData]: meshes drawn by the actor; glyph actors give one mesh per source.
+    """
+    mapper = actor.GetMapper()
+    if mapper is None:
+        return []
+    if isinstance(mapper, vtkGlyph3DMapper):
+        return _glyph_meshes(mapper)
+    data = pv.wrap(mapper.GetInputDataObject(0, 0))
+    if data is None:
+        return []
+    if not isinstance(data, pv.PolyData):
+        data = data.extract_surface()
+    return [data]
+
+
+def _bake_cell_colors(mapper, mesh: pv.PolyData) -> Optional[pv.PolyData]:
+    # The vtkjs scene only describes a lookup table by its hue range, so cell scalars mapped
+    # through explicit table values (e.g. the part colors of merged unit meshes) are exported
+    # as RGB colors instead.
+    if not mapper.GetScalarVisibility():
+        return None
+    if mapper.GetScalarMode() != VTK_SCALAR_MODE_USE_CELL_FIELD_DATA:
+        return None
+    if mapper.GetColorMode() != VTK_COLOR_MODE_MAP_SCALARS:
+        return None
+    array = mesh.GetCellData().GetArray(mapper.GetArrayName())
+    if array is None:
+        return None
+    colors = mapper.GetLookupTable().MapScalars(array, VTK_COLOR_MODE_MAP_SCALARS, -1)
+    baked = mesh.copy(deep=False)
+    baked.cell_data[BAKED_COLORS_ARRAY] = vtk_to_numpy(colors)[:, :3]
+    return baked
+
+
+def _color_arrays(mapper, mesh: pv.PolyData, baked_colors: bool) -> List[str]:
+    # Names of the arrays the viewer colors the mesh by; compact exports drop all the others
+    if baked_colors:
+        return [BAKED_COLORS_ARRAY]
+    if not mapper.GetScalarVisibility():
+        return []
+    point_scalars, cell_scalars = (
+        mesh.point_data.active_scalars_name,
+        mesh.cell_data.active_scalars_name,
+    )
+    return [name for name in (mapper.GetArrayName(), point_scalars, cell_scalars) if name]
+
+
+def quantize_points(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize points to int16 over their bounding box.
+
+    Args:
+        points (np.ndarray): ``(N, 3)`` points.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ``(N, 3)`` int16 points, and the ``(4, 4)`` matrix taking
+        them back to the points, within half of ``1 / 65534`` of the bounding box size along each
+        axis.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if not len(points):
+        return np.zeros((0, 3), dtype=np.int16), np.eye(4)
+    low, high = points.min(axis=0), points.max(axis=0)
+    center = (low + high) / 2
+    step = (high - low) / (2 * np.iinfo(np.int16).max)
+    step[step == 0] = 1.0
+    decode = np.diag([*step, 1.0])
+    decode[:3, 3] = center
+    return np.rint((points - center) / step).astype(np.int16), decode
+
+
+def _actor_placement(matrix: np.ndarray) -> Optional[Dict]:
+    # Split a 4x4 matrix into the scale, rotation and position of a vtk.js actor, which scales
+    # along its own axes before it rotates; None when the matrix shears
+    linear = matrix[:3, :3]
+    scale = np.linalg.norm(linear, axis=0)
+    if not scale.all():
+        return None
+    rotation = linear / scale
+    if not np.allclose(rotation.T @ rotation, np.eye(3), atol=1e-6):
+        return None
+    if np.linalg.det(rotation) < 0:
+        scale[0], rotation[:, 0] = -scale[0], -rotation[:, 0]
+    transform = vtkTransform()
+    transform.SetMatrix([*np.column_stack([rotation, np.zeros(3)]).ravel(), 0, 0, 0, 1])
+    return {
+        "actor": {"origin": [0.0] * 3, "scale": scale.tolist(), "position": matrix[:3, 3].tolist()},
+        "actorRotation": list(transform.GetOrientationWXYZ()),
+    }
+
+
+def _template_key(mesh: pv.PolyData, keep: Sequence[str]) -> str:
+    # Meshes can only be copies of each other when their cells and colors are the same
+    md5 = hashlib.md5(str(mesh.n_points).encode("utf-8"))
+    for key, _ in _CELL_KEYS:
+        md5.update(key.encode("utf-8") + np.asarray(getattr(mesh, key)).tobytes())
+    for data in (mesh.point_data, mesh.cell_data):
+        for name in keep:
+            if name in data:
+                md5.update(name.encode("utf-8") + np.ascontiguousarray(data[name]).tobytes())
+    return md5.hexdigest()
+
+
+def _find_template(
+    templates: List[Tuple[str, np.ndarray, np.ndarray]],
+    points: np.ndarray,
+    actor_matrix: np.ndarray,
+) -> Tuple[Optional[str], Optional[np.ndarray]]:
+    # Look for a template whose points map onto ``points`` by a transform an actor can apply
+    tolerance = 1e-5 * max(1.0, float(np.ptp(points, axis=0).max()))
+    for name, template, decode in templates:
+        homogeneous = np.column_stack([template, np.ones(len(template))])
+        fit = np.linalg.lstsq(homogeneous, points, rcond=None)[0]
+        if np.abs(homogeneous @ fit - points).max() > tolerance:
+            continue
+        affine = np.eye(4)
+        affine[:3] = fit.T
+        matrix = actor_matrix @ affine @ decode
+        if _actor_placement(matrix) is not None:
+            return name, matrix
+    return None, None
+
+
+def _scene_entry(
+    actor: vtkActor, name: str, baked_colors: bool = False, placement: Optional[Dict] = None
+) -> Dict:
+    prop, mapper = actor.GetProperty(), actor.GetMapper()
+    lookup_table = mapper.GetLookupTable()
+    color_by = mapper.GetArrayName() if mapper.GetScalarVisibility() else ""
+    if placement is None:
+        placement = {
+            "actor": {
+                "origin": list(actor.GetOrigin()),
+                "scale": list(actor.GetScale()),
+                "position": list(actor.GetPosition()),
+            },
+            "actorRotation": list(actor.GetOrientationWXYZ()),
+        }
+    return {
+        "name": name,
+        "type": "httpDataSetReader",
+        "httpDataSetReader": {"url": name},
+        **placement,
+        "mapper": {
+            "colorByArrayName": BAKED_COLORS_ARRAY if baked_colors else color_by,
+            # the default color mode draws unsigned char arrays as colors
+            "colorMode": 0 if baked_colors else mapper.GetColorMode(),
+            "scalarMode": mapper.GetScalarMode(),
+        },
+        "property": {
+            "representation": prop.GetRepresentation(),
+            "edgeVisibility": prop.GetEdgeVisibility(),
+            "diffuseColor": list(prop.GetDiffuseColor()),
+            "pointSize": prop.GetPointSize(),
+            "opacity": prop.GetOpacity(),
+        },
+        "lookupTable": {
+            "tableRange": list(lookup_table.GetRange()),
+            "hueRange": list(lookup_table.GetHueRange()),
+        },
+    }
+
+
+def _scene_index(
+    background: Sequence[float], camera: vtkCamera, scene: List[Dict], scene_hash: Optional[str]
+) -> Dict:
+    return {
+        "fetchGzip": False,
+        "background": list(background),
+        "camera": {
+            "focalPoint": list(camera.GetFocalPoint()),
+            "position": list(camera.GetPosition()),
+            "viewUp": list(camera.GetViewUp()),
+            "clippingRange": list(camera.GetClippingRange()),
+        },
+        "centerOfRotation": list(camera.GetFocalPoint()),
+        "scene": scene,
+        "sceneHash": scene_hash,
+    }
+
+
+def export_vtkjs(
+    plotter: pv.Plotter,
+    path: str,
+    scene_hash: Optional[str] = None,
+    force: bool = False,
+    compact: bool = False,
+    point_encoding: str = "float32",
+) -> Dict[str, int]:
+    """Export the scene of a plotter to a ``.vtkjs`` archive, if it changed.
+
+    Args:
+        plotter (pv.Plotter): plotter holding the scene.
+        path (str): path to the archive; ``.vtkjs`` is appended if missing.
+        scene_hash (str, optional): hash of the scene inputs, see :func:`scene_hash`. When it
+            matches the hash recorded in the existing archive nothing is written. Defaults to
+            None, which always exports.
+        force (bool, optional): whether or not to export even if the scene hash is unchanged.
+            Defaults to False.
+        compact (bool, optional): whether or not to only keep the arrays used for coloring, draw
+            copies of a mesh from one dataset, and store small cell arrays as 16-bit. Defaults to
+            False.
+        point_encoding (str, optional): one of ``POINT_ENCODINGS``; ``"int16"`` quantizes the
+            points of every dataset over its bounding box (see :func:`quantize_points`).
+            Defaults to "float32".
+
+    Returns:
+        Dict[str, int]: whether or not the archive was written (``"exported"``), the number of
+        datasets, of datasets drawn by more than one actor (``"n_shared"``), of unique blobs and
+        of blobs reused from the previous archive.
+    """
+    if point_encoding not in POINT_ENCODINGS:
+        raise ValueError(f"point_encoding must be one of {POINT_ENCODINGS}, got {point_encoding!r}")
+    if not path.endswith(".vtkjs"):
+        path += ".vtkjs"
+    if scene_hash is not None and (compact or point_encoding != "float32"):
+        # The same scene exported another way is another archive
+        options = f"{scene_hash}|compact={compact}|points={point_encoding}"
+        scene_hash = hashlib.sha1(options.encode("utf-8")).hexdigest()
+    report = {"exported": False, "n_datasets": 0, "n_shared": 0, "n_blobs": 0, "n_reused_blobs": 0}
+    if scene_hash is not None and not force and read_scene_hash(path) == scene_hash:
+        return report
+
+    writer = _DatasetWriter(_read_blobs(path) if os.path.isfile(path) else {})
+    datasets, scene = [], []
+    templates: Dict[str, List[Tuple[str, np.ndarray, np.ndarray]]] = {}
+    renderer = plotter.renderer
+    for actor in renderer.GetActors():
+        if actor.GetProperty().GetOpacity() == 0:
+            continue
+        mapper = actor.GetMapper()
+        actor_matrix = pv.array_from_vtkmatrix(actor.GetMatrix())
+        for mesh in actor_meshes(actor):
+            if not mesh.n_points:
+                continue
+            baked = _bake_cell_colors(mapper, mesh)
+            mesh = mesh if baked is None else baked
+            keep, name, matrix = None, None, None
+            if compact:
+                keep = _color_arrays(mapper, mesh, baked is not None)
+                key = _template_key(mesh, keep)
+                points = np.asarray(mesh.points, dtype=float)
+                name, matrix = _find_template(templates.get(key, []), points, actor_matrix)
+            if name is None:
+                name = f"data_0_{len(datasets)}"
+                points, decode = None, np.eye(4)
+                if point_encoding == "int16":
+                    points, decode = quantize_points(mesh.points)
+                    matrix = actor_matrix @ decode
+                datasets.append((name, *writer.dataset(mesh, name, points, keep)))
+                if compact:
+                    templates.setdefault(key, []).append((name, mesh.points, decode))
+            placement = None if matrix is None else _actor_placement(matrix)
+            scene.append(_scene_entry(actor, name, baked is not None, placement))
+    if not scene:
+        warnings.warn("Exporting a scene without any mesh")
+
+    index = _scene_index(renderer.GetBackground(), renderer.GetActiveCamera(), scene, scene_hash)
+
+    root = os.path.splitext(os.path.basename(path))[0]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    indent = None if compact else 2
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as f:
+        f.writestr(f"{root}/index.json", json.dumps(index, indent=indent))
+        for name, dataset, refs in datasets:
+            f.writestr(f"{root}/{name}/index.json", json.dumps(dataset, indent=indent))
+            for md5 in refs:
+                _write_blob(f, f"{root}/{name}/data/{md5}", writer.blobs[md5])
+    os.replace(tmp_path, path)
+
+    urls = [entry["httpDataSetReader"]["url"] for entry in scene]
+    report.update(
+        exported=True,
+        n_datasets=len(datasets),
+        n_shared=sum(urls.count(name) > 1 for name, _, _ in datasets),
+        n_blobs=len(writer.blobs),
+        n_reused_blobs=writer.n_reused,
+    )
+    return report
+
+
+def archive_stats(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Measure what the web viewer downloads and decodes for a ``.vtkjs`` archive.
+
+    Decoding inflates every entry, parses the JSON indexes, and converts the points to the
+    float32 the viewer uploads to the GPU, like the vtk.js ``SceneExplorer`` does.
+
+    Args:
+        path (str): path to the archive.
+        repeat (int, optional): number of decodes; the fastest one is reported. Defaults to 3.
+
+    Returns:
+        Dict[str, float]: size of the archive (``"archive_bytes"``), of its inflated entries
+        (``"payload_bytes"``), number of datasets and of actors, and ``"decode_seconds"``.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with zipfile.ZipFile(path) as archive:
+            entries = {info.filename: archive.read(info) for info in archive.infolist()}
+        datasets = {}
+        for name, data in entries.items():
+            if name.endswith("/index.json"):
+                datasets[name[: -len("index.json")]] = json.loads(data)
+        index = datasets.pop(min(datasets, key=len))
+        for prefix, dataset in datasets.items():
+            points = dataset["points"]
+            blob = entries[f"{prefix}data/{points['ref']['id']}"]
+            dtype = np.dtype(points["dataType"].replace("Array", "").lower()).newbyteorder("<")
+            np.frombuffer(blob, dtype=dtype).astype(np.float32)
+        seconds.append(time.perf_counter() - start)
+    return {
+        "archive_bytes": os.path.getsize(path),
+        "payload_bytes": sum(len(data) for data in entries.values()),
+        "n_datasets": len(datasets),
+        "n_actors": len(index["scene"]),
+        "decode_seconds": min(seconds),
+    }
+
+
+class VtkjsSink:
+    """Stream the chunks of an army straight into a ``.vtkjs`` archive.
+
+    Every chunk becomes one spider dataset and one box dataset, whose blobs are compressed and
+    written as soon as the chunk arrives; only the small scene index is kept until
+    :meth:`close`, so memory stays bounded however many chunks are written. Use it with
+    ``stream.stream_army``, or as a context manager::
+
+        with VtkjsSink("invasion") as sink:
+            for spiders, boxes in iter_army_chunks(army):
+                sink.write(spiders, boxes)
+
+    Args:
+        path (str): path to the archive; ``.vtkjs`` is appended if missing.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        camera_position (Sequence[Sequence[float]], optional): camera position, as
+            ``[position, focal_point, view_up]``. Defaults to None, which looks at the whole army
+            from the -y side.
+        background (Sequence[float], optional): background color. Defaults to white.
+        point_encoding (str, optional): one of ``POINT_ENCODINGS``, see :func:`export_vtkjs`.
+            Defaults to "float32".
+    """
+
+    def __init__(
+        self,
+        path: str,
+        color_spider: str = "red",
+        color_box: str = "tan",
+        camera_position: Optional[Sequence[Sequence[float]]] = None,
+        background: Sequence[float] = (1.0, 1.0, 1.0),
+        point_encoding: str = "float32",
+    ) -> None:
+        if point_encoding not in POINT_ENCODINGS:
+            raise ValueError(
+                f"point_encoding must be one of {POINT_ENCODINGS}, got {point_encoding!r}"
+            )
+        self.path = path if path.endswith(".vtkjs") else path + ".vtkjs"
+        self.camera_position = camera_position
+        self.background = background
+        self.point_encoding = point_encoding
+        self._root = os.path.splitext(os.path.basename(self.path))[0]
+        self._tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._archive = zipfile.ZipFile(
+            self._tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL
+        )
+        self._writer = _DatasetWriter({})
+        self._actors = [
+            self._template_actor(color_spider, edges=False),
+            self._template_actor(color_box, edges=True),
+        ]
+        self._scene: List[Dict] = []
+        self._bounds: List[Sequence[float]] = []
+
+    @staticmethod
+    def _template_actor(color: Union[str, Sequence[float]], edges: bool) -> vtkActor:
+        # Actor holding the properties written to the scene index for each dataset
+        mapper = vtkPolyDataMapper()
+        mapper.ScalarVisibilityOff()
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().SetColor(pv.Color(color).float_rgb)
+        actor.GetProperty().SetEdgeVisibility(edges)
+        return actor
+
+    def write(self, spiders: pv.PolyData, boxes: pv.PolyData) -> None:
+        """Write one chunk of the army.
+
+        Args:
+            spiders (pv.PolyData): merged spiders of the chunk.
+            boxes (pv.PolyData): merged boxes of the chunk.
+        """
+        for actor, mesh in zip(self._actors, (spiders, boxes)):
+            if not mesh.n_points:
+                continue
+            name = f"data_0_{len(self._scene)}"
+            points, placement = None, None
+            if self.point_encoding == "int16":
+                points, decode = quantize_points(mesh.points)
+                placement = _actor_placement(decode)
+            dataset, refs = self._writer.dataset(mesh, name, points)
+            self._archive.writestr(f"{self._root}/{name}/index.json", json.dumps(dataset))
+            for md5 in refs:
+                _write_blob(
+                    self._archive, f"{self._root}/{name}/data/{md5}", self._writer.blobs[md5]
+                )
+            self._writer.blobs.clear()
+            self._scene.append(_scene_entry(actor, name, placement=placement))
+            self._bounds.append(mesh.bounds)
+
+    def _camera(self) -> vtkCamera:
+        camera = vtkCamera()
+        bounds = np.array(self._bounds, dtype=float).reshape(-1, 6)
+        if len(bounds):
+            low, high = bounds[:, ::2].min(axis=0), bounds[:, 1::2].max(axis=0)
+        else:
+            low, high = np.zeros(3), np.zeros(3)
+        center, radius = (low + high) / 2, max(np.linalg.norm(high - low) / 2, 1.0)
+        if self.camera_position is None:
+            camera.SetFocalPoint(*center)
+            camera.SetPosition(*(center + [0.0, -3.0 * radius, 0.5 * radius]))
+            camera.SetViewUp(0.0, 0.0, 1.0)
+        else:
+            position, focal_point, view_up = self.camera_position
+            camera.SetPosition(*position)
+            camera.SetFocalPoint(*focal_point)
+            camera.SetViewUp(*view_up)
+        distance = np.linalg.norm(center - camera.GetPosition())
+        camera.SetClippingRange(max(distance - radius, 0.01 * radius), distance + radius)
+        return camera
+
+    def close(self) -> None:
+        """Write the scene index and move the archive in place."""
+        if self._archive is None:
+            return
+        index = _scene_index(self.background, self._camera(), self._scene, None)
+        self._archive.writestr(f"{self._root}/index.json", json.dumps(index, indent=2))
+        self._archive.close()
+        self._archive = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Delete the partial archive, leaving any previous archive at ``path`` untouched."""
+        if self._archive is None:
+            return
+        self._archive.close()
+        self._archive = None
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "VtkjsSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # A failed export must not replace the previous archive with a partial one
+        if exc_info[0] is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,309 @@
+"""Opt-in instrumentation of the scene build: wall time, call counts, mesh sizes and memory.
+
+Stages are marked with the :func:`instrumented` decorator or the :func:`span` context manager.
+Nothing is recorded unless a :class:`Recorder` is active, and a disabled stage costs one global
+lookup on top of the call itself::
+
+    with instrument.record() as recorder:
+        main()
+    print(json.dumps(recorder.report(), indent=2))
+    recorder.save_trace("main.trace.json")  # open in chrome://tracing, Perfetto or speedscope
+
+For every stage the report gives the number of calls, the total time, the time not spent in
+nested stages ("self" time), the points, cells and triangles of the meshes it returned, and the
+change in resident memory. :meth:`Recorder.folded_stacks` gives the self times in the folded
+format of ``flamegraph.pl``.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pyvista as pv
+
+
+# The recorder that stages report to, or None when instrumentation is off.
+_ACTIVE = None
+
+# Shared by every stage while instrumentation is off; nullcontext is reusable.
+_DISABLED_SPAN = nullcontext()
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> Optional[float]:
+    """Return the resident set size of the current process.
+
+    Returns:
+        Optional[float]: RSS in MB, or None where ``/proc/self/statm`` is missing (i.e. outside
+        of Linux).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2**20
+    except OSError:
+        return None
+
+
+def mesh_counts(result: Any) -> Dict[str, int]:
+    """Count the points, cells and triangles of the meshes in a stage's return value.
+
+    Meshes nested in lists and tuples, e.g. the (spider, box) tuples of an army, are summed.
+
+    Args:
+        result (Any): return value of a stage.
+
+    Returns:
+        Dict[str, int]: ``n_points``, ``n_cells`` and ``n_triangles``; empty when there are no
+        meshes.
+    """
+    from xkcd_red_spider.chunks import count_triangles
+
+    counts = {"n_points": 0, "n_cells": 0, "n_triangles": 0}
+    found, pending = False, [result]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, pv.PolyData):
+            found = True
+            counts["n_points"] += item.n_points
+            counts["n_cells"] += item.n_cells
+            counts["n_triangles"] += count_triangles(item)
+        elif isinstance(item, (list, tuple)):
+            pending.extend(item)
+    return counts if found else {}
+
+
+class Span:
+    """One timed call of a stage, as recorded by :class:`Recorder`."""
+
+    __slots__ = ("name", "stack", "thread", "start", "seconds", "child_seconds", "rss", "counts")
+
+    def __init__(self, name: str, stack: tuple, thread: int, rss: Optional[float]) -> None:
+        self.name = name
+        self.stack = stack
+        self.thread = thread
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.child_seconds = 0.0
+        self.rss = rss
+        self.counts: Dict[str, int] = {}
+
+    def set_result(self, result: Any) -> None:
+        """Record the mesh sizes of the stage's return value.
+
+        Args:
+            result (Any): return value of the stage.
+        """
+        self.counts = mesh_counts(result)
+
+    @property
+    def self_seconds(self) -> float:
+        """float: time not spent in nested stages."""
+        return self.seconds - self.child_seconds
+
+
+class Recorder:
+    """Collect the spans of every instrumented stage while it is active.
+
+    Args:
+        memory (bool, optional): whether or not to record the change in resident memory of every
+            span, which costs a read of ``/proc/self/statm`` at each end. Defaults to True.
+        on_span (Callable[[Span], None], optional): hook called with every finished span, e.g.
+            to log slow stages as they happen. Defaults to None.
+    """
+
+    def __init__(
+        self, memory: bool = True, on_span: Optional[Callable[[Span], None]] = None
+    ) -> None:
+        self.memory = memory
+        self.on_span = on_span
+        self.spans: List[Span] = []
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """Time a stage, nested under the stages already open in the current thread.
+
+        Args:
+            name (str): name of the stage.
+
+        Yields:
+            Span: the span, whose :meth:`Span.set_result` records mesh sizes.
+        """
+        stack = self._stack()
+        parent = stack[-1].stack if stack else ()
+        rss = current_rss_mb() if self.memory else None
+        span = Span(name, parent + (name,), threading.get_ident(), rss)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - span.start
+            if span.rss is not None:
+                span.rss = current_rss_mb() - span.rss
+            stack.pop()
+            if stack:
+                stack[-1].child_seconds += span.seconds
+            self.spans.append(span)
+            if self.on_span is not None:
+                self.on_span(span)
+
+    def report(self) -> Dict:
+        """Summarize the spans per stage.
+
+        Returns:
+            Dict: recording time, number of spans, and for each stage its number of calls,
+            total, self and max time in seconds, mesh sizes returned, and change in RSS in MB.
+        """
+        stages: Dict[str, Dict] = {}
+        for span in self.spans:
+            stage = stages.setdefault(
+                span.name,
+                {"calls": 0, "total_seconds": 0.0, "self_seconds": 0.0, "max_seconds": 0.0},
+            )
+            stage["calls"] += 1
+            stage["total_seconds"] += span.seconds
+            stage["self_seconds"] += span.self_seconds
+            stage["max_seconds"] = max(stage["max_seconds"], span.seconds)
+            for key, count in span.counts.items():
+                stage[key] = stage.get(key, 0) + count
+            if span.rss is not None:
+                stage["rss_delta_mb"] = stage.get("rss_delta_mb", 0.0) + span.rss
+        return {
+            "seconds": self.seconds or time.perf_counter() - self.start,
+            "n_spans": len(self.spans),
+            "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["total_seconds"])),
+        }
+
+    def trace(self) -> Dict:
+        """Return the spans in the Chrome trace event format.
+
+        Returns:
+            Dict: trace with one complete ("X") event per span, times in microseconds.
+        """
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = dict(span.counts)
+            if span.rss is not None:
+                args["rss_delta_mb"] = span.rss
+            events.append(
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": (span.start - self.start) * 1e6,
+                    "dur": span.seconds * 1e6,
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def folded_stacks(self) -> str:
+        """Return the self time of every stack of stages in the folded format of
+        ``flamegraph.pl``.
+
+        Returns:
+            str: one ``stage;nested_stage;... microseconds`` line per stack.
+        """
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            key = ";".join(span.stack)
+            totals[key] = totals.get(key, 0.0) + span.self_seconds
+        return "\n".join(f"{key} {round(seconds * 1e6)}" for key, seconds in sorted(totals.items()))
+
+    def save_report(self, path: str) -> None:
+        """Write :meth:`report` to a JSON file.
+
+        Args:
+            path (str): path to the file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def save_trace(self, path: str) -> None:
+        """Write :meth:`trace` to a JSON file.
+
+        Args:
+            path (str): path to the file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+
+@contextmanager
+def record(memory: bool = True, on_span: Optional[Callable[[Span], None]] = None):
+    """Activate a :class:`Recorder` for the duration of the block.
+
+    Args:
+        memory (bool, optional): whether or not to record memory deltas. Defaults to True.
+        on_span (Callable[[Span], None], optional): hook called with every finished span.
+            Defaults to None.
+
+    Yields:
+        Recorder: the active recorder.
+    """
+    global _ACTIVE
+    previous = _ACTIVE
+    recorder = _ACTIVE = Recorder(memory, on_span)
+    try:
+        yield recorder
+    finally:
+        recorder.seconds = time.perf_counter() - recorder.start
+        _ACTIVE = previous
+
+
+def span(name: str):
+    """Mark a block of code as a stage.
+
+    Args:
+        name (str): name of the stage.
+
+    Returns:
+        ContextManager: context manager yielding the :class:`Span`, or None when no recorder is
+        active.
+    """
+    if _ACTIVE is None:
+        return _DISABLED_SPAN
+    return _ACTIVE.span(name)
+
+
+def instrumented(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator marking a function as a stage; the meshes it returns are counted.
+
+    Args:
+        name (str, optional): name of the stage. Defaults to None, which uses
+            ``<module>.<function>``.
+
+    Returns:
+        Callable[[Callable], Callable]: decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _ACTIVE
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.span(label) as stage:
+                result = func(*args, **kwargs)
+                stage.set_result(result)
+                return result
+
+        return wrapper
+
+    return decorator
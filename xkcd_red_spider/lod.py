@@ -0,0 +1,101 @@
+"""Level-of-detail pyramid for the spider mesh.
+
+Most spiders of a large army are only a few pixels tall, so they are drawn with a decimated
+spider, or just a box covering the spider, depending on their distance from the camera. Each
+level of the pyramid is built once from the spider template and stored in the binary mesh cache.
+"""
+from typing import List, Sequence
+
+import numpy as np
+import pyvista as pv
+
+from xkcd_red_spider.assets import ASSETS
+from xkcd_red_spider.cache import cached_mesh
+from xkcd_red_spider.utils import SPIDER_PATH, _read_unit_cell_spider
+
+
+# Fraction of the spider's triangles kept at each level; the last level is a box proxy.
+LOD_FRACTIONS = (1.0, 0.25, 0.05)
+# Camera distance up to which each level is used; farther spiders use the box proxy. A unit box
+# is still ~40 px tall at 30 units, the distance of ``DEFAULT_CAMERA_POSITION`` to the army.
+LOD_DISTANCES = (30.0, 60.0, 120.0)
+
+
+def _lod_name(level: int) -> str:
+    return f"spider_lod{level}"
+
+
+def _make_lod_loader(level: int):
+    if level < len(LOD_FRACTIONS):
+        fraction = LOD_FRACTIONS[level]
+        cache_name = f"spider_lod_{fraction:g}"
+    else:
+        cache_name = "spider_lod_proxy"
+
+    def build_spider_lod() -> pv.PolyData:
+        spider = ASSETS.template("spider")
+        if level == len(LOD_FRACTIONS):
+            return pv.Box(bounds=spider.bounds)
+        return spider.decimate(1.0 - fraction)
+
+    def load_spider_lod() -> pv.PolyData:
+        if level < len(LOD_FRACTIONS) and fraction >= 1.0:
+            return ASSETS.template("spider")
+        # Keyed on the spider template's builder too, as the levels are derived from its output
+        return cached_mesh(
+            cache_name, [SPIDER_PATH], build_spider_lod, dependencies=[_read_unit_cell_spider]
+        )
+
+    return load_spider_lod
+
+
+def get_spider_lods() -> List[pv.PolyData]:
+    """Return the spider LOD pyramid, from the full spider down to the box proxy.
+
+    Levels are registered in ``ASSETS`` as ``"spider_lod0"``, ``"spider_lod1"``, ..., so they
+    are loaded (from the disk cache when possible) once, on first use, and their 24 pre-rotated
+    copies are available through ``ASSETS.oriented``.
+
+    Returns:
+        List[pv.PolyData]: ``len(LOD_FRACTIONS) + 1`` shared template meshes.
+    """
+    return [ASSETS.template(_lod_name(level)) for level in range(len(LOD_FRACTIONS) + 1)]
+
+
+def get_oriented_spider_lods() -> List[pv.PolyData]:
+    """Return every LOD level in every cube orientation, as glyph sources.
+
+    Returns:
+        List[pv.PolyData]: ``24 * (len(LOD_FRACTIONS) + 1)`` meshes; the mesh for ``level`` and
+        ``orientation`` is at index ``level * 24 + orientation``.
+    """
+    return [
+        ASSETS.get(_lod_name(level), orientation=orientation)
+        for level in range(len(LOD_FRACTIONS) + 1)
+        for orientation in range(24)
+    ]
+
+
+def select_lod_levels(
+    translations: np.ndarray,
+    camera_position: Sequence[float],
+    distances: Sequence[float] = LOD_DISTANCES,
+) -> np.ndarray:
+    """Pick an LOD level for every unit from its distance to the camera.
+
+    Args:
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        camera_position (Sequence[float]): position of the camera.
+        distances (Sequence[float], optional): increasing camera distance up to which each level
+            is used. Defaults to ``LOD_DISTANCES``.
+
+    Returns:
+        np.ndarray: ``(N,)`` LOD levels, ``len(distances)`` for units beyond the last distance.
+    """
+    offsets = np.asarray(translations, dtype=float) - np.asarray(camera_position, dtype=float)
+    squared = np.einsum("ij,ij->i", offsets, offsets)
+    return np.searchsorted(np.square(distances), squared).astype(np.int32)
+
+
+for _level in range(len(LOD_FRACTIONS) + 1):
+    ASSETS.register(_lod_name(_level), _make_lod_loader(_level))
@@ -7,6 +7,12 @@ import os
 
 import pyvista as pv
 
+import xkcd_red_spider.city as city
+import xkcd_red_spider.export as export
+import xkcd_red_spider.instrument as instrument
+import xkcd_red_spider.picking as picking
+import xkcd_red_spider.progressive as progressive
+import xkcd_red_spider.render as render
 import xkcd_red_spider.utils as utils
 
 
@@ -17,7 +23,18 @@ DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "
 DEFAULT_CAMERA_POSITION = [(-0.7, -26.7, -7.3), (-0.47, 0, -4.6), (0, -0.1, 1)]
 
 
-def main(color_spider="red", color_box="tan", color_buildings="lightgray") -> pv.Plotter:
+@instrument.instrumented()
+def main(
+    color_spider="red",
+    color_box="tan",
+    color_buildings="lightgray",
+    render_mode="per_unit",
+    spider_army_coord=None,
+    plotter=None,
+    progressive_loading=False,
+    city_shape=None,
+    unit_picking=None,
+) -> pv.Plotter:
     """Main function for rendering the 3D scene for
     `red spider cometh xkcd comic <https://xkcd.com/126/>`_.
 
@@ -25,36 +42,138 @@ def main(color_spider="red", color_box="tan", color_buildings="lightgray") -> pv
         color_spider (str, optional): color of the spiders. Defaults to "red".
         color_box (str, optional): color of the boxes. Defaults to "tan".
         color_buildings (str, optional): color of the buildings. Defaults to "lightgray".
+        render_mode (str, optional): how to draw the army, one of ``render.RENDER_MODES``.
+            ``"per_unit"`` adds one spider and one box actor per unit, ``"instanced"`` instances
+            the spider and box templates with two actors in total, and ``"lod"`` additionally
+            draws far away spiders with decimated meshes. ``"merged"`` draws spiders, boxes and
+            box edges as one mesh with a single actor. ``"chunked"`` splits the army and the
+            buildings into spatial chunks, hides the chunks out of view, and shows how many are
+            live. Defaults to "per_unit".
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army, e.g. from
+            ``utils.generate_random_spider_army_coord()``. Defaults to None, which gives a high
+            fidelity reproduction of the comic.
+        plotter (pv.Plotter, optional): plotter to add the scene to, e.g. an off screen plotter.
+            Defaults to None, which creates a new ``pv.Plotter``.
+        progressive_loading (bool, optional): whether or not to return at once, with the army and
+            the buildings drawn as outlines that are replaced as they load in the background
+            (see ``progressive.load_scene``). Requires the ``"merged"`` render mode and an on
+            screen plotter with an interactor. Defaults to False.
+        city_shape (Tuple[int, int], optional): rows and columns of a grid to tile the buildings
+            over (see ``city.add_city``); the comic's block stays in the middle of odd grids.
+            Defaults to None, which draws the block alone.
+        unit_picking (str, optional): ``"click"`` or ``"hover"`` to name the unit under the mouse
+            in the lower right corner, from a spatial index of the army (see
+            ``picking.UnitPicker``); works with every render mode and any rotation. Defaults to
+            None.
 
     Returns:
         pv.Plotter: pyvista plotter for plotting the 3D scene.
     """
-    plotter = pv.Plotter()
-    # Use this line for high fidelity reproduction of comic
-    spider_army = utils.get_xkcd_spider_army()
-    # use this line for randomly-generated coords
-    # spider_army = utils.get_xkcd_spider_army(
-    #     spider_army_coord=utils.generate_random_spider_army_coord()
-    # )
-
-    buildings = utils.get_buildings()
-    buildings.points *= 1
-    buildings.translate([0, 0, -10])
-
-    for unit in spider_army:
-        plotter.add_mesh(unit[0], color=color_spider)  # spider
-        plotter.add_mesh(unit[1], color=color_box, show_edges=True)  # box
-    plotter.add_mesh(buildings, color=color_buildings, show_edges=True)
+    if unit_picking is not None and unit_picking not in picking.PICK_EVENTS:
+        raise ValueError(
+            f"unit_picking must be one of {sorted(picking.PICK_EVENTS)}, got {unit_picking!r}"
+        )
+    if plotter is None:
+        plotter = pv.Plotter()
+
+    if unit_picking is not None:
+        with instrument.span("main.index_army"):
+            index = picking.ArmyIndex.from_coord(spider_army_coord)
+        picking.UnitPicker(plotter, index, unit_picking)
+
+    if progressive_loading:
+        if render_mode != "merged":
+            raise ValueError(f"progressive loading draws the army merged, got {render_mode!r}")
+        if plotter.off_screen or plotter.iren is None:
+            # No event loop would swap the loaded meshes in: use progressive.load_scene and wait()
+            raise ValueError("progressive loading requires an on screen plotter with an interactor")
+        progressive.load_scene(
+            plotter, spider_army_coord, color_spider, color_box, color_buildings, city_shape
+        )
+        return plotter
+
+    with instrument.span("main.load_buildings"):
+        buildings = utils.ASSETS.get("buildings")
+        buildings.translate(progressive.BUILDINGS_OFFSET, inplace=True)
+
+    if render_mode == "chunked":
+        scene = render.ChunkedScene(plotter)
+        with instrument.span("main.add_army"):
+            scene.add_army(spider_army_coord, color_spider, color_box)
+        with instrument.span("main.add_buildings"):
+            if city_shape is None:
+                scene.add_mesh(buildings, color=color_buildings, show_edges=True)
+            else:
+                city.add_city(
+                    plotter, city_shape, buildings, color=color_buildings, show_edges=True
+                )
+        return plotter
+
+    adders = {
+        "per_unit": render.add_army_per_unit,
+        "instanced": render.add_army_instanced,
+        "lod": render.add_army_lod,
+        "merged": render.add_army_merged,
+    }
+    if render_mode not in adders:
+        raise ValueError(f"render_mode must be one of {render.RENDER_MODES}, got {render_mode!r}")
+    with instrument.span("main.add_army"):
+        adders[render_mode](plotter, spider_army_coord, color_spider, color_box)
+    with instrument.span("main.add_buildings"):
+        if city_shape is None:
+            plotter.add_mesh(buildings, color=color_buildings, show_edges=True)
+        else:
+            city.add_city(plotter, city_shape, buildings, color=color_buildings, show_edges=True)
 
     return plotter
 
 
+def get_scene_hash(
+    color_spider="red",
+    color_box="tan",
+    color_buildings="lightgray",
+    render_mode="per_unit",
+    spider_army_coord=None,
+    camera_position=DEFAULT_CAMERA_POSITION,
+    city_shape=None,
+) -> str:
+    """Hash the inputs of the scene built by :func:`main`, so that an exported scene is only
+    re-exported when they change.
+
+    Args:
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        color_buildings (str, optional): color of the buildings. Defaults to "lightgray".
+        render_mode (str, optional): how to draw the army. Defaults to "per_unit".
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None.
+        camera_position (List[Tuple[float, float, float]], optional): camera position. Defaults
+            to ``DEFAULT_CAMERA_POSITION``.
+        city_shape (Tuple[int, int], optional): rows and columns of the city. Defaults to None.
+
+    Returns:
+        str: hex digest of the scene inputs.
+    """
+    inputs = {
+        "units": utils.get_spider_army_units(spider_army_coord),
+        "colors": [color_spider, color_box, color_buildings],
+        "render_mode": render_mode,
+        "camera_position": camera_position,
+        # Every module of the package, as the army is placed and drawn across most of them
+        "code": export.code_digest(),
+    }
+    if city_shape is not None:
+        inputs["city_shape"] = list(city_shape)
+    return export.scene_hash(inputs, sources=[utils.SPIDER_PATH, utils.BUILDINGS_PATH])
+
+
 if __name__ == "__main__":
     pv.set_plot_theme("document")
     p = main()
     p.camera_position = DEFAULT_CAMERA_POSITION
     vtkjs_file_path = os.path.join(DATA_DIR, "red_spiders_cometh")
-    if not os.path.isfile(vtkjs_file_path + ".vtkjs"):
-        p.export_vtkjs(vtkjs_file_path)
+    # Only re-exported when the scene inputs change
+    export.export_vtkjs(p, vtkjs_file_path, scene_hash=get_scene_hash())
     p.show()
     print(p.camera_position)  # print the final camera position to the stdout
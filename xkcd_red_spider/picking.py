@@ -0,0 +1,389 @@
+"""Spatial index of the units of an army, to find the unit under the mouse without VTK picking.
+
+VTK cell picking tests the meshes of every actor, which gets slow with thousands of actors and
+only gives a cell id once the army is merged into one mesh. :class:`ArmyIndex` works from the
+unit positions and orientations instead, so it answers the same for every render mode.
+
+Each unit is bounded by one axis-aligned box per part: its box and its spider, whose bounds in
+each of the 24 orientations come from the pre-rotated templates (see ``AssetRegistry.oriented``).
+Units rotated by other angles are bounded from their own rotated templates.
+The units are bucketed into a uniform grid of cells centered on the lattice points, sorted by
+packed cell coordinates (see ``lattice.pack_keys``). A ray walks the grid one cell at a time
+(3D DDA) and only tests the parts of the units bucketed in the cells it crosses, stopping as soon
+as the nearest hit is behind it::
+
+    index = ArmyIndex.from_coord()
+    hit = index.ray(origin=(0, -20, 0), direction=(0, 1, 0))
+    print(hit.position, hit.orientation, hit.part)
+"""
+from bisect import bisect_left
+from itertools import product
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyvista as pv
+
+from xkcd_red_spider.columnar import ArmyArrays, army_from_coord
+from xkcd_red_spider.lattice import pack_keys
+from xkcd_red_spider.transforms import orientation_index, rotation_matrices
+from xkcd_red_spider.utils import ASSETS, get_spider_army_units
+
+
+# Parts of a unit that rays are tested against, by asset name.
+PICK_PARTS = ("spider", "box")
+# Interactor event that picks a unit, for each ``UnitPicker`` mode.
+PICK_EVENTS = {"click": "LeftButtonPressEvent", "hover": "MouseMoveEvent"}
+# Parts that ``process_spider_box_unit_cell`` never rotates; it makes no difference in the 24
+# orientations, but does under other rotations.
+UNROTATED_PARTS = ("box",)
+# Corner of the render window describing the picked unit, and its index in vtkCornerAnnotation
+PICK_TEXT_POSITION = "lower_right"
+_PICK_TEXT_CORNER = 1
+
+
+class UnitHit(NamedTuple):
+    """Part of a unit hit by a ray. See :meth:`ArmyIndex.ray`."""
+
+    unit: int
+    position: Tuple[float, float, float]
+    orientation: Optional[int]
+    part: str
+    distance: float
+    point: Tuple[float, float, float]
+
+
+def part_bounds(parts: Sequence[str] = PICK_PARTS) -> np.ndarray:
+    """Return the bounds of template parts in each of the 24 orientations.
+
+    Args:
+        parts (Sequence[str], optional): asset names of the parts. Defaults to ``PICK_PARTS``.
+
+    Returns:
+        np.ndarray: ``(n_parts, 24, 2, 3)`` lower and upper corners, indexed by part and by
+        orientation index.
+    """
+    bounds = []
+    for part in parts:
+        oriented = ASSETS.oriented(part)
+        bounds.append(np.stack([oriented.min(axis=1), oriented.max(axis=1)], axis=1))
+    return np.stack(bounds).astype(float)
+
+
+class ArmyIndex:
+    """Uniform grid over the units of an army, answering ray queries.
+
+    Args:
+        positions (np.ndarray): ``(N, 3)`` unit positions.
+        orientations (np.ndarray, optional): ``(N,)`` orientation indices, -1 for the units
+            rotated by ``rotations`` instead. Defaults to None, which means no rotation.
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+        parts (Sequence[str], optional): asset names of the parts of a unit. Defaults to
+            ``PICK_PARTS``.
+        cell_size (float, optional): length of the side of a grid cell. Defaults to 1.0, the
+            size of a box.
+        rotations (np.ndarray, optional): ``(N, 3, 3)`` rotation matrices of the units, used for
+            the units whose orientation is -1, e.g. from ``transforms.rotation_matrices``.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        orientations: Optional[np.ndarray] = None,
+        scales: Union[float, np.ndarray] = 1.0,
+        parts: Sequence[str] = PICK_PARTS,
+        cell_size: float = 1.0,
+        rotations: Optional[np.ndarray] = None,
+    ) -> None:
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n_units = len(self.positions)
+        if orientations is None:
+            orientations = np.zeros(n_units, dtype=np.uint8)
+        self.orientations = np.broadcast_to(orientations, (n_units,))
+        rotated = np.flatnonzero(self.orientations < 0)
+        if len(rotated) and rotations is None:
+            raise ValueError("Units with orientation -1 need rotation matrices")
+        self.scales = np.broadcast_to(np.asarray(scales, dtype=float), (n_units,))
+        self.parts = tuple(parts)
+        self.cell_size = cell_size
+
+        # (N, n_parts, 2, 3) bounds of every part of every unit, and (N, 3) corners of their hull
+        table = part_bounds(self.parts).transpose(1, 0, 2, 3)
+        relative = table[np.maximum(self.orientations, 0)]
+        for unit in rotated:
+            for part, name in enumerate(self.parts):
+                if name in UNROTATED_PARTS:
+                    continue
+                points = ASSETS.oriented(name)[0] @ np.asarray(rotations[unit]).T
+                relative[unit, part] = points.min(axis=0), points.max(axis=0)
+        self.bounds = self.positions[:, None, None] + self.scales[:, None, None, None] * relative
+        lower, upper = self.bounds[:, :, 0].min(axis=1), self.bounds[:, :, 1].max(axis=1)
+        self.lower = lower.min(axis=0) if n_units else np.zeros(3)
+        self.upper = upper.max(axis=0) if n_units else np.zeros(3)
+
+        # Cells are centered on the lattice points, so that a box fills exactly one cell
+        first = np.floor(lower / cell_size + 0.5).astype(np.int64)
+        last = np.maximum(np.ceil(upper / cell_size + 0.5).astype(np.int64) - 1, first)
+        spans = last - first + 1
+        units, cells = [], []
+        for offset in product(*(range(span) for span in spans.max(axis=0, initial=1))):
+            inside = np.flatnonzero((np.array(offset) < spans).all(axis=1))
+            units.append(inside)
+            cells.append(first[inside] + offset)
+        keys = pack_keys(np.concatenate(cells))
+        order = np.argsort(keys)
+        keys = keys[order]
+        # Units of the cell self._keys[i] are self._units[self._offsets[i] : self._offsets[i + 1]];
+        # lists, as bisecting them is much faster than a numpy search for a single key
+        self._units = np.concatenate(units)[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1))
+        self._keys: List[int] = keys[starts].tolist()
+        self._offsets: List[int] = np.append(starts, len(keys)).tolist()
+        # Packed keys are linear in the cell coordinates: key = origin + cell . strides
+        self._key_origin = int(pack_keys(np.zeros((1, 3)))[0])
+        self._key_strides = (pack_keys(np.eye(3)) - self._key_origin).tolist()
+
+    @classmethod
+    def from_army(cls, army: ArmyArrays, **kwargs) -> "ArmyIndex":
+        """Index the units of an army.
+
+        Args:
+            army (ArmyArrays): the army.
+            **kwargs: keyword arguments passed to :class:`ArmyIndex`.
+
+        Returns:
+            ArmyIndex: the index.
+        """
+        return cls(army.positions, army.orientations, army.scales, **kwargs)
+
+    @classmethod
+    def from_coord(
+        cls,
+        spider_army_coord: Dict[Tuple[int, int], Sequence[Tuple[str, int]]] = None,
+        extra_spider: bool = True,
+        **kwargs,
+    ) -> "ArmyIndex":
+        """Index the units of an army in the dict format, as ``get_xkcd_spider_army`` places them.
+
+        Rotations that are not multiples of 90 degrees are supported, and give hits without an
+        orientation index.
+
+        Args:
+            spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates
+                and rotation steps of the red spider army. Defaults to None, which uses
+                ``XKCD_SPIDER_ARMY_COORD``.
+            extra_spider (bool, optional): whether or not to add the extra spiders of the comic.
+                Defaults to True.
+            **kwargs: keyword arguments passed to :class:`ArmyIndex`.
+
+        Returns:
+            ArmyIndex: the index.
+        """
+        units = get_spider_army_units(spider_army_coord, extra_spider)
+        steps = [rotation if isinstance(rotation, list) else None for _, rotation in units]
+        if all(orientation_index(rotation) is not None for rotation in steps):
+            return cls.from_army(army_from_coord(spider_army_coord, extra_spider), **kwargs)
+        orientations = [orientation_index(rotation) for rotation in steps]
+        return cls(
+            [translation for translation, _ in units],
+            [-1 if orientation is None else orientation for orientation in orientations],
+            rotations=rotation_matrices(steps),
+            **kwargs,
+        )
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _test_units(
+        self, units: np.ndarray, origin: np.ndarray, inverse: np.ndarray
+    ) -> Optional[Tuple[float, int, int]]:
+        # Slab test of the ray against every part of the units
+        bounds = self.bounds[units]
+        near = (bounds[:, :, 0] - origin) * inverse
+        far = (bounds[:, :, 1] - origin) * inverse
+        t_near = np.maximum(np.minimum(near, far).max(axis=2), 0.0)
+        t_far = np.maximum(near, far).min(axis=2)
+        t_near[t_near > t_far] = np.inf
+        unit, part = np.unravel_index(np.argmin(t_near), t_near.shape)
+        if np.isinf(t_near[unit, part]):
+            return None
+        return float(t_near[unit, part]), int(units[unit]), int(part)
+
+    def ray(
+        self, origin: Sequence[float], direction: Sequence[float], max_distance: float = np.inf
+    ) -> Optional[UnitHit]:
+        """Find the first unit part hit by a ray.
+
+        Args:
+            origin (Sequence[float]): origin of the ray.
+            direction (Sequence[float]): direction of the ray; it does not need to be normalized.
+            max_distance (float, optional): length of the ray. Defaults to infinite.
+
+        Returns:
+            Optional[UnitHit]: the nearest hit, or None if the ray misses every unit.
+        """
+        origin = np.asarray(origin, dtype=float)
+        direction = np.asarray(direction, dtype=float)
+        length = np.linalg.norm(direction)
+        if not length:
+            raise ValueError("The direction of a ray must not be zero")
+        direction = direction / length
+        # A tiny component instead of zero keeps the slab tests free of 0 * inf
+        inverse = 1.0 / np.where(direction == 0, 1e-300, direction)
+        if not len(self):
+            return None
+
+        near, far = (self.lower - origin) * inverse, (self.upper - origin) * inverse
+        t = max(float(np.minimum(near, far).max()), 0.0)
+        t_exit = min(float(np.maximum(near, far).min()), max_distance)
+        if t > t_exit:
+            return None
+
+        # Walk the grid from the cell the ray enters the army in
+        grid = (origin + t * direction) / self.cell_size + 0.5
+        cell = np.floor(grid).astype(np.int64)
+        step = np.sign(direction).astype(np.int64)
+        to_boundary = np.where(step > 0, cell + 1 - grid, grid - cell) * self.cell_size
+        t_next = np.where(step != 0, t + to_boundary * np.abs(inverse), np.inf).tolist()
+        t_delta = (self.cell_size * np.abs(inverse)).tolist()
+        key = self._key_origin + sum(c * k for c, k in zip(cell.tolist(), self._key_strides))
+        key_steps = [s * k for s, k in zip(step.tolist(), self._key_strides)]
+
+        best = None
+        while t <= t_exit:
+            slot = bisect_left(self._keys, key)
+            if slot < len(self._keys) and self._keys[slot] == key:
+                units = self._units[self._offsets[slot] : self._offsets[slot + 1]]
+                hit = self._test_units(units, origin, inverse)
+                if hit is not None and (best is None or hit < best):
+                    best = hit
+            axis = min(range(3), key=t_next.__getitem__)
+            t = t_next[axis]
+            if best is not None and best[0] <= t:
+                break
+            t_next[axis] += t_delta[axis]
+            key += key_steps[axis]
+
+        if best is None or best[0] > max_distance:
+            return None
+        distance, unit, part = best
+        return UnitHit(
+            unit=unit,
+            position=tuple(self.positions[unit].tolist()),
+            orientation=int(self.orientations[unit]) if self.orientations[unit] >= 0 else None,
+            part=self.parts[part],
+            distance=distance,
+            point=tuple((origin + distance * direction).tolist()),
+        )
+
+    def pick(self, renderer: pv.Renderer, x: float, y: float) -> Optional[UnitHit]:
+        """Find the first unit part under a point of the render window.
+
+        Args:
+            renderer (pv.Renderer): renderer drawing the army, e.g. ``plotter.renderer``.
+            x (float): horizontal display coordinate, in pixels from the left.
+            y (float): vertical display coordinate, in pixels from the bottom.
+
+        Returns:
+            Optional[UnitHit]: the nearest hit, or None if there is no unit under the point.
+        """
+        ends = []
+        for depth in (0.0, 1.0):  # near and far clipping planes
+            renderer.SetDisplayPoint(x, y, depth)
+            renderer.DisplayToWorld()
+            world = np.array(renderer.GetWorldPoint())
+            ends.append(world[:3] / world[3])
+        near, far = ends
+        return self.ray(near, far - near, float(np.linalg.norm(far - near)))
+
+
+def format_hit(hit: Optional[UnitHit]) -> str:
+    """Describe a hit in one line.
+
+    Args:
+        hit (UnitHit, optional): the hit.
+
+    Returns:
+        str: the unit, its position and its orientation, or an empty string without a hit.
+    """
+    if hit is None:
+        return ""
+    position = ", ".join(f"{coordinate:g}" for coordinate in hit.position)
+    if hit.orientation is None:
+        return f"unit {hit.unit} ({hit.part}): ({position}), rotated"
+    return f"unit {hit.unit} ({hit.part}): ({position}), orientation {hit.orientation}"
+
+
+class UnitPicker:
+    """Report the unit under the mouse of a plotter, from an :class:`ArmyIndex`.
+
+    Example::
+
+        picker = UnitPicker(plotter, ArmyIndex.from_coord(), "hover")
+        plotter.show()  # the lower right corner names the unit under the mouse
+
+    Args:
+        plotter (pv.Plotter): plotter drawing the army.
+        index (ArmyIndex): index of the army.
+        event (str, optional): key of ``PICK_EVENTS``: ``"click"`` picks on left clicks,
+            ``"hover"`` on every mouse move. Defaults to "click".
+        callback (Callable[[Optional[UnitHit]], None], optional): function called with every
+            pick, None when no unit is under the mouse. Defaults to None.
+        show_text (bool, optional): whether or not to describe the picked unit in the
+            ``PICK_TEXT_POSITION`` corner. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        plotter: pv.Plotter,
+        index: ArmyIndex,
+        event: str = "click",
+        callback: Optional[Callable[[Optional[UnitHit]], None]] = None,
+        show_text: bool = True,
+    ) -> None:
+        if event not in PICK_EVENTS:
+            raise ValueError(f"event must be one of {sorted(PICK_EVENTS)}, got {event!r}")
+        self.plotter = plotter
+        self.index = index
+        self.callback = callback
+        self.hit: Optional[UnitHit] = None
+        self.text_actor = None
+        if show_text:
+            self.text_actor = plotter.add_text("", position=PICK_TEXT_POSITION, font_size=10)
+        self._observer = None
+        if plotter.iren is not None:
+            self._observer = plotter.iren.add_observer(PICK_EVENTS[event], self._on_event)
+
+    def pick(self, x: float, y: float) -> Optional[UnitHit]:
+        """Pick the unit under a point of the render window, and report it.
+
+        Args:
+            x (float): horizontal display coordinate, in pixels from the left.
+            y (float): vertical display coordinate, in pixels from the bottom.
+
+        Returns:
+            Optional[UnitHit]: the nearest hit, or None if there is no unit under the point.
+        """
+        self.hit = self.index.pick(self.plotter.renderer, x, y)
+        if self.text_actor is not None:
+            self.text_actor.SetText(_PICK_TEXT_CORNER, format_hit(self.hit))
+        if self.callback is not None:
+            self.callback(self.hit)
+        return self.hit
+
+    def close(self) -> None:
+        """Stop picking."""
+        if self._observer is not None:
+            self.plotter.iren.remove_observer(self._observer)
+            self._observer = None
+
+    def _on_event(self, *args) -> None:
+        previous = self.hit
+        hit = self.pick(*self.plotter.iren.get_event_position())
+        # Hovering within one part does not need a new frame
+        changed = (previous is None) != (hit is None) or (
+            hit is not None and (hit.unit, hit.part) != (previous.unit, previous.part)
+        )
+        if self.text_actor is not None and changed:
+            self.plotter.render()
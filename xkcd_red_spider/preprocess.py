@@ -0,0 +1,142 @@
+"""One-time compaction of parsed meshes before they are cached, drawn and exported.
+
+The buildings come out of the Sketchfab OBJ with their own copy of every vertex for every face,
+float64 points, and per-vertex normals and texture coordinates that the scene never uses (it draws
+them in a single flat color). :func:`compact_mesh` merges the duplicate vertices, drops the data
+arrays, degenerate and unused cells, and stores the points as float32, which takes the buildings
+from about 15 MB to about 1.3 MB while rendering the same image.
+
+To print the before/after report for the buildings::
+    python -m xkcd_red_spider.preprocess
+"""
+import argparse
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+
+# Tolerance for merging vertices, as a fraction of the length of the bounding box diagonal.
+MERGE_TOLERANCE = 1e-6
+
+
+def mesh_stats(mesh: pv.PolyData) -> Dict[str, int]:
+    """Count the points, cells and triangles of a mesh, and the memory it takes.
+
+    Args:
+        mesh (pv.PolyData): mesh.
+
+    Returns:
+        Dict[str, int]: ``n_points``, ``n_cells``, ``n_triangles`` (``n - 2`` for every polygon
+        of ``n`` points) and ``n_bytes``.
+    """
+    offsets = vtk_to_numpy(mesh.GetPolys().GetOffsetsArray())
+    return {
+        "n_points": mesh.n_points,
+        "n_cells": mesh.n_cells,
+        "n_triangles": int(offsets[-1] - 2 * (len(offsets) - 1)) if len(offsets) else 0,
+        "n_bytes": mesh.actual_memory_size * 1024,
+    }
+
+
+def compact_mesh(
+    mesh: pv.PolyData,
+    triangulate: bool = False,
+    target_triangles: Optional[int] = None,
+    tolerance: float = MERGE_TOLERANCE,
+) -> Tuple[pv.PolyData, Dict[str, Dict[str, int]]]:
+    """Compact a mesh for drawing in a single color.
+
+    Point and cell data are dropped, the points are converted to float32, duplicate vertices are
+    merged, and polygons left with fewer than 3 distinct points, as well as points no longer used
+    by any cell, are removed. Vertices, lines and triangle strips are kept as they are.
+
+    Args:
+        mesh (pv.PolyData): mesh; it is not modified.
+        triangulate (bool, optional): whether or not to split the polygons into triangles. The GPU
+            draws triangles either way, but triangulating adds a diagonal edge to every quad drawn
+            with ``show_edges``, and 50% more connectivity. Defaults to False.
+        target_triangles (int, optional): triangle budget to decimate the mesh down to; implies
+            ``triangulate``. Defaults to None, which does not decimate.
+        tolerance (float, optional): distance under which vertices are merged, as a fraction of
+            the length of the bounding box diagonal. Defaults to ``MERGE_TOLERANCE``.
+
+    Returns:
+        Tuple[pv.PolyData, Dict[str, Dict[str, int]]]: the compacted mesh, and the
+        :func:`mesh_stats` of the mesh ``"before"`` and ``"after"`` compaction.
+    """
+    before = mesh_stats(mesh)
+    cells = {key: getattr(mesh, key) for key in ("verts", "lines", "faces", "strips")}
+    compacted = pv.PolyData(
+        np.asarray(mesh.points, dtype=np.float32),
+        **{key: cell_array for key, cell_array in cells.items() if cell_array.size},
+    )
+    compacted = compacted.clean(
+        tolerance=tolerance,
+        absolute=False,
+        lines_to_points=False,
+        polys_to_lines=False,
+        strips_to_polys=False,
+    )
+    if triangulate or target_triangles is not None:
+        compacted = compacted.triangulate()
+    if target_triangles is not None and compacted.n_cells > target_triangles:
+        compacted = compacted.decimate(1 - target_triangles / compacted.n_cells)
+    # filters over-allocate their output arrays; release the slack
+    compacted.Squeeze()
+    return compacted, {"before": before, "after": mesh_stats(compacted)}
+
+
+def format_report(report: Dict[str, Dict[str, int]]) -> str:
+    """Format the report of :func:`compact_mesh` as a table.
+
+    Args:
+        report (Dict[str, Dict[str, int]]): ``"before"`` and ``"after"`` stats.
+
+    Returns:
+        str: one line per stat.
+    """
+    lines = [f"{'':<12}{'before':>12}{'after':>12}{'ratio':>8}"]
+    for key, before in report["before"].items():
+        after = report["after"][key]
+        ratio = f"{after / before:.2f}" if before else "-"
+        lines.append(f"{key:<12}{before:>12}{after:>12}{ratio:>8}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the buildings preprocessing report.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Compact the buildings mesh and report savings.")
+    parser.add_argument("--triangulate", action="store_true")
+    parser.add_argument("--target-triangles", type=int, help="decimate down to this many")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Compact the raw buildings and print the before/after report.
+
+    Args:
+        argv (Sequence[str], optional): arguments. Defaults to None, which uses ``sys.argv``.
+
+    Returns:
+        Dict[str, Dict[str, int]]: report of :func:`compact_mesh`.
+    """
+    from xkcd_red_spider.utils import get_buildings
+
+    args = parse_args(argv)
+    raw = get_buildings(use_cache=False, compact=False)
+    _, report = compact_mesh(raw, args.triangulate, args.target_triangles)
+    print(format_report(report))
+    return report
+
+
+if __name__ == "__main__":
+    main()
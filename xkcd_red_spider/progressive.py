@@ -0,0 +1,299 @@
+"""Progressive loading of the scene, so the window opens before the meshes are ready.
+
+:func:`xkcd_red_spider.main.main` parses the buildings and builds the whole army before it returns
+the plotter. :class:`ProgressiveScene` instead draws a cheap placeholder for every mesh right
+away, loads the real meshes on a background thread, and swaps each one in as soon as it is ready.
+VTK rendering is not thread safe, so the swap happens on the render thread: a repeating timer of
+the interactor polls the finished loads between frames.
+
+The placeholders are the outlines of bounding boxes known without loading any mesh (the army's
+from its coordinates, the buildings' from their cache entry), so the time to the first frame does
+not depend on the size of the scene::
+
+    plotter = pv.Plotter()
+    scene = load_scene(plotter)
+    plotter.show()  # shows the outlines, then the army and the buildings as they load
+"""
+import time
+import warnings
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkRenderingCore import vtkActor
+
+from xkcd_red_spider.army import build_unit_army_mesh
+from xkcd_red_spider.city import add_city
+from xkcd_red_spider.render import add_unit_mesh, unit_lookup_table
+from xkcd_red_spider.utils import (
+    ASSETS,
+    XKCD_SPIDER_ARMY_COORD,
+    get_buildings_bounds,
+    get_spider_army_units,
+)
+
+
+# Milliseconds between two polls of the background loads while the window is open.
+POLL_INTERVAL_MS = 50
+
+# Offset moving the buildings below the army, applied by ``main`` and by :func:`load_scene`.
+BUILDINGS_OFFSET = (0, 0, -10)
+
+
+class _Load:
+    __slots__ = ("name", "future", "add", "placeholder")
+
+    def __init__(
+        self,
+        name: str,
+        future: Future,
+        add: Callable[[Any], Any],
+        placeholder: Optional[vtkActor],
+    ) -> None:
+        self.name = name
+        self.future = future
+        self.add = add
+        self.placeholder = placeholder
+
+
+class ProgressiveScene:
+    """Scene whose meshes are loaded in the background and drawn as placeholders until then.
+
+    Example::
+
+        scene = ProgressiveScene(plotter)
+        scene.load("buildings", pv.Box(get_buildings_bounds()), get_buildings, plotter.add_mesh)
+        plotter.show()
+
+    Plotters with an interactor poll the loads every ``poll_interval`` ms while the window is
+    open. Off screen plotters have no interactor: call :meth:`poll` or :meth:`wait` instead.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the meshes to.
+        executor (Executor, optional): executor running the loaders. Defaults to None, which
+            runs them one after the other on a background thread owned by the scene, started by
+            :meth:`load` and stopped once every load finished.
+        poll_interval (int, optional): milliseconds between two polls. Defaults to
+            ``POLL_INTERVAL_MS``.
+    """
+
+    def __init__(
+        self,
+        plotter: pv.Plotter,
+        executor: Optional[Executor] = None,
+        poll_interval: int = POLL_INTERVAL_MS,
+    ) -> None:
+        self.plotter = plotter
+        self.start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.pending: List[_Load] = []
+        self._owns_executor = executor is None
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self._timer = None
+
+    def load(
+        self,
+        name: str,
+        placeholder: Optional[pv.PolyData],
+        loader: Callable[[], Any],
+        add: Callable[[Any], Any],
+        **kwargs,
+    ) -> Future:
+        """Draw a placeholder now and start loading the real mesh in the background.
+
+        Args:
+            name (str): name of the load, used in :attr:`timings` and :attr:`errors`.
+            placeholder (pv.PolyData, optional): mesh drawn as a wireframe until the load
+                finishes, or None to draw nothing until then.
+            loader (Callable[[], Any]): function building the mesh; it runs on the background
+                thread and must not touch the plotter.
+            add (Callable[[Any], Any]): function adding what ``loader`` returned to the plotter;
+                it runs on the render thread.
+            **kwargs: keyword arguments passed to ``plotter.add_mesh`` for the placeholder, e.g.
+                its color.
+
+        Returns:
+            Future: the result of ``loader``.
+        """
+        actor = None
+        if placeholder is not None:
+            actor = self.plotter.add_mesh(placeholder, style="wireframe", **kwargs)
+        if self.executor is None:
+            # One worker: the loaders share the asset registry, which is not thread safe
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix="xkcd-loader")
+        future = self.executor.submit(loader)
+        self.pending.append(_Load(name, future, add, actor))
+        if self._timer is None and self.plotter.iren is not None:
+            iren = self.plotter.iren
+            observer = iren.add_observer("TimerEvent", self._on_timer)
+            self._timer = (observer, iren.create_timer(self.poll_interval))
+        return future
+
+    def poll(self) -> int:
+        """Swap the finished loads in for their placeholders. Must run on the render thread.
+
+        A load that raised keeps its placeholder; its exception is stored in :attr:`errors`
+        and reported as a warning.
+
+        Returns:
+            int: number of loads finished since the last poll.
+        """
+        finished = [load for load in self.pending if load.future.done()]
+        for load in finished:
+            self.pending.remove(load)
+            error = load.future.exception()
+            if error is not None:
+                self.errors[load.name] = error
+                warnings.warn(f"Could not load {load.name!r}: {error!r}")
+                continue
+            load.add(load.future.result())
+            if load.placeholder is not None:
+                self.plotter.remove_actor(load.placeholder, render=False)
+            self.timings[load.name] = time.perf_counter() - self.start
+        if not self.pending:
+            self._finish()
+        return len(finished)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every load finished, then swap them in.
+
+        Args:
+            timeout (float, optional): maximum number of seconds to wait. Defaults to None,
+                which waits for as long as it takes.
+
+        Returns:
+            bool: whether or not every load finished.
+        """
+        wait_futures([load.future for load in self.pending], timeout)
+        self.poll()
+        return self.done
+
+    @property
+    def done(self) -> bool:
+        """bool: whether or not every load finished."""
+        return not self.pending
+
+    def close(self) -> None:
+        """Cancel the loads not started yet and stop polling."""
+        for load in self.pending:
+            load.future.cancel()
+        self.pending = []
+        self._finish()
+
+    def _on_timer(self, *args) -> None:
+        if self.poll():
+            self.plotter.render()
+
+    def _finish(self) -> None:
+        if self._timer is not None:
+            observer, timer = self._timer
+            self.plotter.iren.remove_observer(observer)
+            self.plotter.iren.interactor.DestroyTimer(timer)
+            self._timer = None
+        if self._owns_executor and self.executor is not None:
+            # Started again by the next load
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+def army_bounds(
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None
+) -> Tuple[float, ...]:
+    """Return the bounds of the boxes of an army, straight from its coordinates.
+
+    Args:
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+
+    Returns:
+        Tuple[float, ...]: ``(xmin, xmax, ymin, ymax, zmin, zmax)``.
+    """
+    if spider_army_coord is None:
+        spider_army_coord = XKCD_SPIDER_ARMY_COORD
+    positions = np.array(list(spider_army_coord), dtype=float)
+    # Units given by (x, y) stand at z = 0
+    positions = np.pad(positions, ((0, 0), (0, 3 - positions.shape[1])))
+    lower, upper = positions.min(axis=0) - 0.5, positions.max(axis=0) + 0.5
+    return tuple(float(bound) for pair in zip(lower, upper) for bound in pair)
+
+
+def _build_army(spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]]) -> pv.PolyData:
+    units = get_spider_army_units(spider_army_coord)
+    translations = np.array([translation for translation, _ in units], dtype=float)
+    rotations = [rotation for _, rotation in units]
+    return build_unit_army_mesh(translations, rotations, cull_hidden_faces=True)
+
+
+def _load_buildings() -> pv.PolyData:
+    buildings = ASSETS.get("buildings")
+    buildings.translate(BUILDINGS_OFFSET, inplace=True)
+    return buildings
+
+
+def load_scene(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+    color_buildings: str = "lightgray",
+    city_shape: Optional[Tuple[int, int]] = None,
+    executor: Optional[Executor] = None,
+) -> ProgressiveScene:
+    """Start loading the scene of ``main`` progressively, with the army drawn as in the
+    ``"merged"`` render mode.
+
+    Until they are loaded, the army and the buildings are drawn as the outlines of their bounding
+    boxes. Only the bounds of the army are computed before returning; the units are flattened and
+    merged in the background. The bounds of the buildings are read from their cache entry, so
+    they have no placeholder while the buildings are not cached yet.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the scene to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        color_buildings (str, optional): color of the buildings. Defaults to "lightgray".
+        city_shape (Tuple[int, int], optional): rows and columns of a city to tile the buildings
+            over, see ``city.add_city``; the placeholder only outlines the middle block. Defaults
+            to None, which draws the block alone.
+        executor (Executor, optional): executor running the loaders. Defaults to None, which
+            uses a background thread.
+
+    Returns:
+        ProgressiveScene: the scene, e.g. to :meth:`ProgressiveScene.wait` for off screen.
+    """
+    lookup_table = unit_lookup_table(color_spider, color_box)
+
+    def add_buildings(buildings: pv.PolyData) -> None:
+        if city_shape is None:
+            plotter.add_mesh(buildings, color=color_buildings, show_edges=True)
+        else:
+            add_city(plotter, city_shape, buildings, color=color_buildings, show_edges=True)
+
+    scene = ProgressiveScene(plotter, executor)
+    scene.load(
+        "army",
+        pv.Box(army_bounds(spider_army_coord)),
+        lambda: _build_army(spider_army_coord),
+        lambda army: add_unit_mesh(plotter, army, lookup_table, name="unit_army"),
+        color=color_box,
+    )
+    buildings_placeholder = None
+    buildings_bounds = get_buildings_bounds()
+    if buildings_bounds is not None:
+        buildings_placeholder = pv.Box(np.add(buildings_bounds, np.repeat(BUILDINGS_OFFSET, 2)))
+    scene.load(
+        "buildings",
+        buildings_placeholder,
+        _load_buildings,
+        add_buildings,
+        color=color_buildings,
+    )
+    return scene
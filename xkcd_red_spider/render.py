@@ -0,0 +1,624 @@
+"""Helpers for adding the spider army to a ``pv.Plotter`` and timing how fast it renders.
+
+The render modes are:
+
+* ``"per_unit"``: one spider actor and one box actor per unit, as built by
+  ``get_xkcd_spider_army``.
+* ``"instanced"``: the army is a point cloud with per-point ``orientation`` and ``scale`` arrays,
+  and the spider templates are instanced on the GPU by a ``vtkGlyph3DMapper``. The boxes are drawn
+  as their merged outer surface, so the whole army costs two actors regardless of its size.
+* ``"lod"``: like ``"instanced"``, but each spider is drawn with a level of the LOD pyramid picked
+  from its distance to the camera, and re-picked whenever the camera moves.
+* ``"merged"``: spiders, boxes and box edges are one mesh drawn by a single actor, colored by
+  its ``part`` cell array through a lookup table.
+* ``"chunked"``: the army is split into spatial chunks of merged meshes, and the chunks outside of
+  the view frustum are hidden before every frame, so they are never drawn or uploaded.
+"""
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkCommonCore import vtkLookupTable
+from vtkmodules.vtkRenderingCore import vtkActor, vtkGlyph3DMapper, vtkPolyDataMapper
+
+from xkcd_red_spider.army import (
+    PART_ARRAY,
+    UNIT_PARTS,
+    build_army_mesh,
+    build_unit_army_mesh,
+    get_box_surface_mesh,
+    merge_parts,
+    polygon_edges,
+)
+from xkcd_red_spider.chunks import (
+    CHUNK_SIZE,
+    boxes_in_frustum,
+    chunk_bounds,
+    chunk_stats,
+    count_triangles,
+    frustum_planes,
+    split_army,
+    split_mesh,
+)
+from xkcd_red_spider.lod import (
+    LOD_DISTANCES,
+    LOD_FRACTIONS,
+    get_oriented_spider_lods,
+    select_lod_levels,
+)
+from xkcd_red_spider.transforms import CUBE_ROTATIONS, orientation_indices
+from xkcd_red_spider.utils import ASSETS, get_spider_army_units, get_xkcd_spider_army
+
+
+RENDER_MODES = ("per_unit", "instanced", "lod", "merged", "chunked")
+
+
+def get_army_point_cloud(
+    translations: np.ndarray, orientations: np.ndarray, scales: Union[float, np.ndarray] = 1.0
+) -> pv.PolyData:
+    """Represent the army as a point cloud, one point per unit.
+
+    Args:
+        translations (np.ndarray): ``(N, 3)`` unit positions.
+        orientations (np.ndarray): ``(N,)`` orientation indices (see
+            ``xkcd_red_spider.transforms.CUBE_ROTATIONS``).
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+
+    Returns:
+        pv.PolyData: ``pv.Polydata`` point cloud with ``orientation`` and ``scale`` point arrays.
+    """
+    translations = np.asarray(translations, dtype=np.float32).reshape(-1, 3)
+    cloud = pv.PolyData(translations)
+    cloud.point_data["orientation"] = np.asarray(orientations, dtype=np.int32)
+    cloud.point_data["scale"] = np.broadcast_to(
+        np.asarray(scales, dtype=np.float32), (len(translations),)
+    ).copy()
+    return cloud
+
+
+def get_glyph_mapper(
+    cloud: pv.PolyData, sources: Sequence[pv.PolyData], index_array: Optional[str] = None
+) -> vtkGlyph3DMapper:
+    """Return a mapper that instances ``sources`` at every point of ``cloud``.
+
+    Args:
+        cloud (pv.PolyData): point cloud with a ``scale`` point array.
+        sources (Sequence[pv.PolyData]): glyph sources. With more than one source,
+            ``index_array`` selects the source for each point.
+        index_array (str, optional): name of the point array selecting the source. Defaults to
+            None.
+
+    Returns:
+        vtkGlyph3DMapper: the glyph mapper.
+    """
+    mapper = vtkGlyph3DMapper()
+    mapper.SetInputData(cloud)
+    for i, source in enumerate(sources):
+        mapper.SetSourceData(i, source)
+    if index_array is not None:
+        mapper.SourceIndexingOn()
+        mapper.SetSourceIndexArray(index_array)
+    mapper.OrientOff()
+    mapper.ScalingOn()
+    mapper.SetScaleModeToScaleByMagnitude()
+    mapper.SetScaleArray("scale")
+    mapper.SetScaleFactor(1.0)
+    mapper.ScalarVisibilityOff()
+    return mapper
+
+
+def add_glyphs(
+    plotter: pv.Plotter,
+    cloud: pv.PolyData,
+    sources: Sequence[pv.PolyData],
+    index_array: Optional[str] = None,
+    **kwargs,
+) -> vtkActor:
+    """Add one actor instancing ``sources`` at every point of ``cloud``.
+
+    The actor is created with ``plotter.add_mesh`` so that ``kwargs`` (``color``, ``show_edges``,
+    ...) are handled exactly as for any other mesh, then its mapper is swapped for a glyph mapper.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the actor to.
+        cloud (pv.PolyData): point cloud with a ``scale`` point array.
+        sources (Sequence[pv.PolyData]): glyph sources.
+        index_array (str, optional): name of the point array selecting the source. Defaults to
+            None.
+        **kwargs: keyword arguments passed to ``plotter.add_mesh``.
+
+    Returns:
+        vtkActor: the glyph actor.
+    """
+    actor = plotter.add_mesh(cloud, **kwargs)
+    actor.SetMapper(get_glyph_mapper(cloud, sources, index_array))
+    return actor
+
+
+def add_army_per_unit(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+) -> List[vtkActor]:
+    """Add the army with one spider actor and one box actor per unit.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+
+    Returns:
+        List[vtkActor]: the actors added.
+    """
+    actors = []
+    for unit in get_xkcd_spider_army(spider_army_coord=spider_army_coord):
+        actors.append(plotter.add_mesh(unit[0], color=color_spider))  # spider
+        actors.append(plotter.add_mesh(unit[1], color=color_box, show_edges=True))  # box
+    return actors
+
+
+def add_army_instanced(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+) -> List[vtkActor]:
+    """Add the army with two actors: the instanced spider templates and the boxes' outer surface.
+
+    Units whose rotation is not a multiple of 90 degrees cannot be instanced from the 24
+    pre-rotated spiders, so in that case the spiders are drawn as one merged mesh instead.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+
+    Returns:
+        List[vtkActor]: the actors added.
+    """
+    units = get_spider_army_units(spider_army_coord)
+    translations = np.array([translation for translation, _ in units], dtype=float)
+    rotations = [rotation for _, rotation in units]
+    orientations = orientation_indices(rotations)
+
+    if orientations is None:
+        spiders = build_army_mesh(translations, rotations)[0]
+        spider_actor = plotter.add_mesh(spiders, color=color_spider, name="spider_army")
+    else:
+        cloud = get_army_point_cloud(translations, orientations)
+        sources = [ASSETS.get("spider", orientation=i) for i in range(len(CUBE_ROTATIONS))]
+        spider_actor = add_glyphs(
+            plotter, cloud, sources, "orientation", color=color_spider, name="spider_army"
+        )
+
+    # Boxes sit on the integer lattice: draw only their outer surface, which has no internal
+    # faces to z-fight with and merges the boxes that several units share.
+    boxes = get_box_surface_mesh(translations)
+    box_actor = plotter.add_mesh(boxes, color=color_box, show_edges=True, name="box_army")
+    return [spider_actor, box_actor]
+
+
+def unit_lookup_table(
+    color_spider: str = "red", color_box: str = "tan", color_edges: str = "black"
+) -> vtkLookupTable:
+    """Return the lookup table coloring the ``part`` cell array of merged unit meshes.
+
+    Args:
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        color_edges (str, optional): color of the box edges. Defaults to "black".
+
+    Returns:
+        vtkLookupTable: one entry per part of ``UNIT_PARTS``.
+    """
+    lookup_table = vtkLookupTable()
+    lookup_table.SetNumberOfTableValues(len(UNIT_PARTS))
+    for i, color in enumerate((color_spider, color_box, color_edges)):
+        lookup_table.SetTableValue(i, *pv.Color(color).float_rgb, 1.0)
+    lookup_table.SetTableRange(0, len(UNIT_PARTS) - 1)
+    return lookup_table
+
+
+def use_unit_colors(actor: vtkActor, lookup_table: vtkLookupTable) -> None:
+    """Color an actor drawing a merged unit mesh by its ``part`` cell array.
+
+    Args:
+        actor (vtkActor): actor whose mesh has a ``PART_ARRAY`` cell array.
+        lookup_table (vtkLookupTable): colors of the parts, see :func:`unit_lookup_table`.
+    """
+    mapper = actor.GetMapper()
+    mapper.SetLookupTable(lookup_table)
+    mapper.SetScalarModeToUseCellFieldData()
+    mapper.SelectColorArray(PART_ARRAY)
+    mapper.SetScalarRange(0, len(UNIT_PARTS) - 1)
+    mapper.SetColorModeToMapScalars()
+    mapper.ScalarVisibilityOn()
+
+
+def add_unit_mesh(
+    plotter: pv.Plotter, mesh: pv.PolyData, lookup_table: vtkLookupTable, **kwargs
+) -> vtkActor:
+    """Add a merged unit mesh, colored by its ``part`` cell array through a lookup table.
+
+    Changing the colors of the lookup table recolors every actor sharing it, without touching the
+    meshes.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the mesh to.
+        mesh (pv.PolyData): mesh with a ``PART_ARRAY`` cell array, see
+            ``army.build_unit_army_mesh``.
+        lookup_table (vtkLookupTable): colors of the parts, see :func:`unit_lookup_table`.
+        **kwargs: keyword arguments passed to ``plotter.add_mesh``.
+
+    Returns:
+        vtkActor: the actor.
+    """
+    # A solid color keeps pyvista from setting up its own scalar coloring
+    actor = plotter.add_mesh(mesh, color="white", **kwargs)
+    use_unit_colors(actor, lookup_table)
+    return actor
+
+
+def add_army_merged(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+) -> List[vtkActor]:
+    """Add the army as a single actor drawing spiders, boxes and box edges.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+
+    Returns:
+        List[vtkActor]: the actors added.
+    """
+    units = get_spider_army_units(spider_army_coord)
+    translations = np.array([translation for translation, _ in units], dtype=float)
+    army = build_unit_army_mesh(
+        translations, [rotation for _, rotation in units], cull_hidden_faces=True
+    )
+    lookup_table = unit_lookup_table(color_spider, color_box)
+    return [add_unit_mesh(plotter, army, lookup_table, name="unit_army")]
+
+
+class LodArmy:
+    """Army drawn with two actors, where every spider uses the LOD level picked from its distance
+    to the camera.
+
+    All LOD levels in all 24 orientations are glyph sources of a single ``vtkGlyph3DMapper``; the
+    ``source`` point array ``level * 24 + orientation`` selects one per unit. When the camera
+    moves only that array is rewritten, and only if some unit changed level, so the scene is
+    never rebuilt.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army; all rotations must be multiples of 90 degrees.
+            Defaults to None, which uses ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+        distances (Sequence[float], optional): camera distance up to which each LOD level is
+            used, one per level of ``LOD_FRACTIONS``; farther spiders are drawn as box proxies.
+            Defaults to ``LOD_DISTANCES``.
+    """
+
+    def __init__(
+        self,
+        plotter: pv.Plotter,
+        spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+        color_spider: str = "red",
+        color_box: str = "tan",
+        distances: Sequence[float] = LOD_DISTANCES,
+    ) -> None:
+        if len(distances) != len(LOD_FRACTIONS):
+            # Each distance selects a level of glyph sources, and there are no more levels
+            raise ValueError(
+                f"distances must have one value per LOD level ({len(LOD_FRACTIONS)}), "
+                f"got {len(distances)}"
+            )
+        units = get_spider_army_units(spider_army_coord)
+        self.translations = np.array([translation for translation, _ in units], dtype=float)
+        orientations = orientation_indices([rotation for _, rotation in units])
+        if orientations is None:
+            raise ValueError("LOD rendering requires rotations that are multiples of 90 degrees")
+        self.orientations = orientations.astype(np.int32)
+        self.distances = distances
+        self.levels = np.full(len(units), -1, dtype=np.int32)
+
+        self.cloud = get_army_point_cloud(self.translations, self.orientations)
+        self.cloud.point_data["source"] = self.orientations.copy()
+        self.camera = plotter.renderer.GetActiveCamera()
+        self.update()
+
+        spider_actor = add_glyphs(
+            plotter,
+            self.cloud,
+            get_oriented_spider_lods(),
+            "source",
+            color=color_spider,
+            name="spider_army",
+        )
+        boxes = get_box_surface_mesh(self.translations)
+        box_actor = plotter.add_mesh(boxes, color=color_box, show_edges=True, name="box_army")
+        self.actors = [spider_actor, box_actor]
+        self.camera.AddObserver("ModifiedEvent", self.update)
+
+    def update(self, *args) -> bool:
+        """Re-pick the LOD level of every unit for the current camera position.
+
+        Returns:
+            bool: whether or not any unit changed level.
+        """
+        levels = select_lod_levels(self.translations, self.camera.GetPosition(), self.distances)
+        if np.array_equal(levels, self.levels):
+            return False
+        self.levels = levels
+        source = self.cloud.point_data["source"]
+        source[:] = levels * len(CUBE_ROTATIONS) + self.orientations
+        self.cloud.GetPointData().GetArray("source").Modified()
+        self.cloud.Modified()
+        return True
+
+    @property
+    def level_counts(self) -> np.ndarray:
+        """np.ndarray: number of units drawn at each LOD level."""
+        return np.bincount(self.levels, minlength=len(self.distances) + 1)
+
+
+def add_army_lod(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+) -> List[vtkActor]:
+    """Add the army with two actors, drawing each spider at a camera-dependent LOD level. See
+    :class:`LodArmy`.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+
+    Returns:
+        List[vtkActor]: the actors added.
+    """
+    return LodArmy(plotter, spider_army_coord, color_spider, color_box).actors
+
+
+class ChunkedScene:
+    """Scene made of spatially chunked meshes, where every chunk outside of the view frustum is
+    hidden.
+
+    Each chunk is a merged mesh with its own actor. Before every frame the bounding boxes of all
+    the chunks are tested against the frustum in one vectorized call, and only the actors whose
+    visibility changed are toggled. Hidden actors are skipped by the renderer, so a chunk that has
+    never been in view is never uploaded to the GPU.
+
+    Example::
+
+        scene = ChunkedScene(plotter)
+        scene.add_army(color_spider="red", color_box="tan")
+        scene.add_mesh(get_buildings(), color="lightgray")
+        print(scene.stats)
+
+    Args:
+        plotter (pv.Plotter): plotter to add the chunks to.
+        show_stats (bool, optional): whether or not to show the number of live chunks and
+            triangles in the upper left corner. Defaults to True.
+    """
+
+    def __init__(self, plotter: pv.Plotter, show_stats: bool = True) -> None:
+        self.plotter = plotter
+        self.actors: List[vtkActor] = []
+        self.bounds = np.empty((0, 6))
+        self.triangles = np.empty(0, dtype=np.int64)
+        self.visible = np.empty(0, dtype=bool)
+        self.stats_actor = None
+        # Hidden actors do not count towards the scene bounds, which would make ``reset_camera``
+        # zoom onto the chunks in view. This fully transparent actor spans the corners of all the
+        # chunks, so it keeps the bounds of the whole scene without drawing anything.
+        self._extent = pv.PolyData()
+        extent_mapper = vtkPolyDataMapper()
+        extent_mapper.SetInputData(self._extent)
+        self._extent_actor = vtkActor()
+        self._extent_actor.SetMapper(extent_mapper)
+        self._extent_actor.GetProperty().SetOpacity(0.0)
+        plotter.renderer.AddActor(self._extent_actor)
+        if show_stats:
+            self.stats_actor = plotter.add_text("", position="upper_left", font_size=10)
+        plotter.renderer.AddObserver("StartEvent", self.update)
+
+    def add_chunks(self, meshes: Sequence[pv.PolyData], **kwargs) -> List[vtkActor]:
+        """Add one actor per chunk mesh.
+
+        Args:
+            meshes (Sequence[pv.PolyData]): chunk meshes; empty meshes are skipped.
+            **kwargs: keyword arguments passed to ``plotter.add_mesh``.
+
+        Returns:
+            List[vtkActor]: the actors added.
+        """
+        meshes = [mesh for mesh in meshes if mesh.n_cells]
+        actors = [self.plotter.add_mesh(mesh, **kwargs) for mesh in meshes]
+        self.actors += actors
+        self.bounds = np.vstack([self.bounds, chunk_bounds(meshes)])
+        self.triangles = np.append(self.triangles, [count_triangles(mesh) for mesh in meshes])
+        self.visible = np.append(self.visible, np.ones(len(actors), dtype=bool))
+        if len(self.bounds):
+            extent = np.array([self.bounds[:, ::2].min(axis=0), self.bounds[:, 1::2].max(axis=0)])
+            self._extent.SetPoints(pv.vtk_points(extent))
+            self._extent.verts = np.array([2, 0, 1])
+        return actors
+
+    def add_mesh(
+        self, mesh: pv.PolyData, chunk_size: float = CHUNK_SIZE, **kwargs
+    ) -> List[vtkActor]:
+        """Split a mesh into chunks and add them to the scene.
+
+        Args:
+            mesh (pv.PolyData): mesh made of polygons only, e.g. the buildings.
+            chunk_size (float, optional): length of the side of a chunk. Defaults to
+                ``CHUNK_SIZE``.
+            **kwargs: keyword arguments passed to ``plotter.add_mesh``.
+
+        Returns:
+            List[vtkActor]: the actors added.
+        """
+        return self.add_chunks(split_mesh(mesh, chunk_size), **kwargs)
+
+    def add_army(
+        self,
+        spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+        color_spider: str = "red",
+        color_box: str = "tan",
+        chunk_size: float = CHUNK_SIZE,
+    ) -> List[vtkActor]:
+        """Split the army into chunks, each one mesh of spiders, box surface and box edges drawn by
+        a single actor (see :func:`add_unit_mesh`), and add them to the scene.
+
+        Args:
+            spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates
+                and rotation steps of the red spider army. Defaults to None, which uses
+                ``XKCD_SPIDER_ARMY_COORD``.
+            color_spider (str, optional): color of the spiders. Defaults to "red".
+            color_box (str, optional): color of the boxes. Defaults to "tan".
+            chunk_size (float, optional): length of the side of a chunk. Defaults to
+                ``CHUNK_SIZE``.
+
+        Returns:
+            List[vtkActor]: the actors added.
+        """
+        units = get_spider_army_units(spider_army_coord)
+        translations = np.array([translation for translation, _ in units], dtype=float)
+        chunks = split_army(translations, [rotation for _, rotation in units], chunk_size)
+        meshes = [merge_parts([spiders, boxes, polygon_edges(boxes)]) for spiders, boxes in chunks]
+        actors = self.add_chunks(meshes, color="white")
+        lookup_table = unit_lookup_table(color_spider, color_box)
+        for actor in actors:
+            use_unit_colors(actor, lookup_table)
+        return actors
+
+    def update(self, *args) -> np.ndarray:
+        """Show the chunks that may be in view of the current camera and hide the others.
+
+        Returns:
+            np.ndarray: boolean visibility of each chunk.
+        """
+        renderer = self.plotter.renderer
+        planes = frustum_planes(renderer.GetActiveCamera(), renderer.GetTiledAspectRatio())
+        visible = boxes_in_frustum(self.bounds, planes)
+        for i in np.flatnonzero(visible != self.visible):
+            self.actors[i].SetVisibility(bool(visible[i]))
+        self.visible = visible
+        if self.stats_actor is not None:
+            self.stats_actor.SetText(2, self.stats_text)
+        return visible
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Dict[str, int]: live and total counts of chunks and triangles."""
+        return chunk_stats(self.triangles, self.visible)
+
+    @property
+    def stats_text(self) -> str:
+        """str: one line summary of :attr:`stats`."""
+        stats = self.stats
+        return (
+            f"chunks: {stats['live_chunks']}/{stats['total_chunks']}  "
+            f"triangles: {stats['live_triangles']:,}/{stats['total_triangles']:,}"
+        )
+
+
+def add_army_chunked(
+    plotter: pv.Plotter,
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    color_spider: str = "red",
+    color_box: str = "tan",
+) -> List[vtkActor]:
+    """Add the army as spatial chunks that are hidden when out of view. See :class:`ChunkedScene`.
+
+    Args:
+        plotter (pv.Plotter): plotter to add the army to.
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        color_spider (str, optional): color of the spiders. Defaults to "red".
+        color_box (str, optional): color of the boxes. Defaults to "tan".
+
+    Returns:
+        List[vtkActor]: the actors added.
+    """
+    return ChunkedScene(plotter).add_army(spider_army_coord, color_spider, color_box)
+
+
+def measure_frame_time(plotter: pv.Plotter, n_frames: int = 10) -> float:
+    """Measure the mean time to render one frame of the plotter's scene.
+
+    The first render, which uploads the geometry to the GPU, is not counted.
+
+    Args:
+        plotter (pv.Plotter): plotter to render; usually created with ``off_screen=True``.
+        n_frames (int, optional): number of frames to average over. Defaults to 10.
+
+    Returns:
+        float: mean frame time in seconds.
+    """
+    render_window = plotter.ren_win
+    render_window.Render()
+    start = time.perf_counter()
+    for _ in range(n_frames):
+        plotter.renderer.GetActiveCamera().Azimuth(360.0 / n_frames)
+        render_window.Render()
+    return (time.perf_counter() - start) / n_frames
+
+
+def compare_render_modes(
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None, n_frames: int = 10
+) -> Dict[str, Dict[str, float]]:
+    """Render the army off screen in every render mode and report the actor count and frame time.
+
+    Args:
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Defaults to None, which uses
+            ``XKCD_SPIDER_ARMY_COORD``.
+        n_frames (int, optional): number of frames to average over. Defaults to 10.
+
+    Returns:
+        Dict[str, Dict[str, float]]: ``{mode: {"n_actors": ..., "frame_time": ...}}``.
+    """
+    adders = {
+        "per_unit": add_army_per_unit,
+        "instanced": add_army_instanced,
+        "lod": add_army_lod,
+        "merged": add_army_merged,
+        "chunked": add_army_chunked,
+    }
+    report = {}
+    for mode in RENDER_MODES:
+        plotter = pv.Plotter(off_screen=True)
+        actors = adders[mode](plotter, spider_army_coord)
+        plotter.reset_camera()
+        report[mode] = {
+            "n_actors": len(actors),
+            "frame_time": measure_frame_time(plotter, n_frames),
+        }
+        plotter.close()
+    return report
@@ -0,0 +1,155 @@
+"""Stream an army of any size through fixed-size chunks of merged meshes.
+
+``get_xkcd_spider_army`` and ``build_army_mesh`` hold the whole army in memory at once. Here the
+army is read from its columns (see ``columnar.ArmyArrays``, possibly memory-mapped from disk)
+``chunk_units`` units at a time, each chunk is built into one merged spider mesh and one merged
+box mesh, handed to a sink, and dropped before the next one is built. Peak memory is set by the
+chunk size, not by the size of the army.
+
+Example::
+
+    army = load_army("invasion.army")
+    with VtpSink("invasion.vtm") as sink:
+        stream_army(army, sink)
+"""
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import pyvista as pv
+
+from xkcd_red_spider.army import build_army_mesh
+from xkcd_red_spider.columnar import ArmyArrays
+
+
+# Units per chunk; a chunk of full resolution spiders takes about 75 MB.
+DEFAULT_CHUNK_UNITS = 256
+
+_BLOCKS = ("spiders", "boxes")
+
+
+def iter_army_chunks(
+    army: ArmyArrays,
+    chunk_units: int = DEFAULT_CHUNK_UNITS,
+    spider: Optional[pv.PolyData] = None,
+    cull_hidden_faces: bool = True,
+) -> Iterator[Tuple[pv.PolyData, pv.PolyData]]:
+    """Yield the army as merged meshes, ``chunk_units`` units at a time.
+
+    Only the columns of the current chunk are read, so a memory-mapped army is never loaded as a
+    whole.
+
+    Args:
+        army (ArmyArrays): the army.
+        chunk_units (int, optional): number of units per chunk. Defaults to
+            ``DEFAULT_CHUNK_UNITS``.
+        spider (pv.PolyData, optional): spider template, e.g. a level of the LOD pyramid.
+            Defaults to None, which uses the ``"spider"`` template from ``ASSETS``.
+        cull_hidden_faces (bool, optional): whether or not to drop the faces between touching
+            boxes of the same chunk, for chunks whose units are all unscaled. Defaults to True.
+
+    Yields:
+        Tuple[pv.PolyData, pv.PolyData]: the spiders and the boxes of each chunk.
+    """
+    if chunk_units < 1:
+        raise ValueError(f"chunk_units must be positive, got {chunk_units}")
+    for start in range(0, army.n_units, chunk_units):
+        chunk = slice(start, start + chunk_units)
+        scales = np.asarray(army.scales[chunk])
+        yield build_army_mesh(
+            np.asarray(army.positions[chunk], dtype=float),
+            scales=scales,
+            spider=spider,
+            orientations=np.asarray(army.orientations[chunk]),
+            cull_hidden_faces=cull_hidden_faces and bool(np.all(scales == 1)),
+        )
+
+
+class VtpSink:
+    """Write every chunk to its own ``.vtp`` files, indexed by one ``.vtm`` multiblock file.
+
+    The pieces go to a directory named after the ``.vtm`` file, as
+    ``spiders_<chunk>.vtp`` and ``boxes_<chunk>.vtp``. The ``.vtm`` file, with a ``spiders`` and
+    a ``boxes`` block listing the pieces, is written by :meth:`close`; ParaView or ``pv.read``
+    load it as one scene.
+
+    Args:
+        path (str): path to the ``.vtm`` file; ``.vtm`` is appended if missing.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path if path.endswith(".vtm") else path + ".vtm"
+        self.directory = os.path.splitext(self.path)[0]
+        os.makedirs(self.directory, exist_ok=True)
+        self.pieces: Dict[str, List[str]] = {block: [] for block in _BLOCKS}
+
+    def write(self, spiders: pv.PolyData, boxes: pv.PolyData) -> None:
+        """Write one chunk of the army.
+
+        Args:
+            spiders (pv.PolyData): merged spiders of the chunk.
+            boxes (pv.PolyData): merged boxes of the chunk.
+        """
+        index = len(self.pieces["spiders"])
+        for block, mesh in zip(_BLOCKS, (spiders, boxes)):
+            filename = f"{block}_{index:05d}.vtp"
+            mesh.save(os.path.join(self.directory, filename))
+            self.pieces[block].append(filename)
+
+    def close(self) -> None:
+        """Write the ``.vtm`` file indexing all the pieces written so far."""
+        subdirectory = os.path.basename(self.directory)
+        lines = [
+            '<?xml version="1.0"?>',
+            '<VTKFile type="vtkMultiBlockDataSet" version="1.0" byte_order="LittleEndian">',
+            "  <vtkMultiBlockDataSet>",
+        ]
+        for block_index, block in enumerate(_BLOCKS):
+            lines.append(f'    <Block index="{block_index}" name="{block}">')
+            for index, filename in enumerate(self.pieces[block]):
+                file_attribute = quoteattr(f"{subdirectory}/{filename}")
+                name = os.path.splitext(filename)[0]
+                lines.append(
+                    f'      <DataSet index="{index}" name="{name}" file={file_attribute}/>'
+                )
+            lines.append("    </Block>")
+        lines += ["  </vtkMultiBlockDataSet>", "</VTKFile>", ""]
+        with open(self.path, "w") as f:
+            f.write("\n".join(lines))
+
+    def __enter__(self) -> "VtpSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Leave any previous ``.vtm`` file in place rather than indexing a partial army
+        if exc_info[0] is None:
+            self.close()
+
+
+def stream_army(
+    army: ArmyArrays,
+    sink,
+    chunk_units: int = DEFAULT_CHUNK_UNITS,
+    spider: Optional[pv.PolyData] = None,
+) -> Dict[str, int]:
+    """Build the army chunk by chunk and write every chunk to a sink.
+
+    Args:
+        army (ArmyArrays): the army.
+        sink: object with a ``write(spiders, boxes)`` method, e.g. :class:`VtpSink` or
+            ``export.VtkjsSink``. It is not closed.
+        chunk_units (int, optional): number of units per chunk. Defaults to
+            ``DEFAULT_CHUNK_UNITS``.
+        spider (pv.PolyData, optional): spider template. Defaults to None, which uses the
+            ``"spider"`` template from ``ASSETS``.
+
+    Returns:
+        Dict[str, int]: number of units, chunks and cells written.
+    """
+    report = {"n_units": army.n_units, "n_chunks": 0, "n_cells": 0}
+    for spiders, boxes in iter_army_chunks(army, chunk_units, spider):
+        sink.write(spiders, boxes)
+        report["n_chunks"] += 1
+        report["n_cells"] += spiders.n_cells + boxes.n_cells
+    return report
@@ -0,0 +1,252 @@
+"""Numpy helpers for composing the rotation steps and transforms used to place spider-box units.
+
+The rotation steps follow the same convention as ``process_spider_box_unit_cell``: a list of
+``(axis, degrees)`` tuples that are applied one after another about the origin, exactly like
+successive calls to ``rotate_x``, ``rotate_y`` and ``rotate_z`` in ``pv.PolyData``.
+
+Any list of steps that only uses multiples of 90 degrees collapses to one of the 24 rotations of
+the cube, listed in ``CUBE_ROTATIONS``. Its position in that table is the unit's *orientation
+index*, which lets a unit be placed by copying a pre-rotated template instead of rotating it.
+"""
+from itertools import permutations, product
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+AXES = ("x", "y", "z")
+
+
+def axis_rotation_matrix(axis: str, angle: float) -> np.ndarray:
+    """Return the 3x3 matrix for a right-handed rotation about a coordinate axis.
+
+    Args:
+        axis (str): axis of rotation, one of ``"x"``, ``"y"``, or ``"z"``.
+        angle (float): rotation angle in degrees.
+
+    Returns:
+        np.ndarray: 3x3 rotation matrix.
+    """
+    i = AXES.index(axis)
+    j, k = (i + 1) % 3, (i + 2) % 3
+    radians = np.deg2rad(angle)
+    cos, sin = np.cos(radians), np.sin(radians)
+    matrix = np.eye(3)
+    matrix[j, j] = cos
+    matrix[j, k] = -sin
+    matrix[k, j] = sin
+    matrix[k, k] = cos
+    return matrix
+
+
+def rotation_matrix(rotation: Optional[List[Tuple[str, float]]]) -> np.ndarray:
+    """Compose a list of rotation steps into a single 3x3 rotation matrix.
+
+    Args:
+        rotation (List[Tuple[str, float]], optional): list of steps for rotation, e.g.
+            ``[("x", 90), ("z", 180)]``. None means no rotation.
+
+    Returns:
+        np.ndarray: 3x3 rotation matrix equivalent to applying the steps in order.
+    """
+    matrix = np.eye(3)
+    for axis, angle in rotation or []:
+        matrix = axis_rotation_matrix(axis, angle) @ matrix
+    return matrix
+
+
+def rotation_matrices(rotations: Sequence[Optional[List[Tuple[str, float]]]]) -> np.ndarray:
+    """Compose one list of rotation steps per unit into a stack of 3x3 rotation matrices.
+
+    Identical step lists are only composed once.
+
+    Args:
+        rotations (Sequence[List[Tuple[str, float]]]): one list of rotation steps (or None) per
+            unit.
+
+    Returns:
+        np.ndarray: ``(N, 3, 3)`` rotation matrices.
+    """
+    composed = {}
+    matrices = np.empty((len(rotations), 3, 3))
+    for i, rotation in enumerate(rotations):
+        key = tuple(rotation or ())
+        if key not in composed:
+            composed[key] = rotation_matrix(rotation)
+        matrices[i] = composed[key]
+    return matrices
+
+
+def _cube_rotations() -> np.ndarray:
+    rotations = []
+    for perm in permutations(range(3)):
+        for signs in product((1, -1), repeat=3):
+            matrix = np.zeros((3, 3), dtype=np.int8)
+            matrix[range(3), perm] = signs
+            if round(np.linalg.det(matrix)) == 1:
+                rotations.append(matrix)
+    return np.stack(rotations)
+
+
+# The 24 proper rotations of the cube as signed permutation matrices; index 0 is the identity.
+CUBE_ROTATIONS = _cube_rotations()
+_CUBE_ROTATION_INDEX = {matrix.tobytes(): i for i, matrix in enumerate(CUBE_ROTATIONS)}
+
+
+def orientation_index(rotation: Optional[List[Tuple[str, float]]]) -> Optional[int]:
+    """Compile a list of rotation steps into an index into ``CUBE_ROTATIONS``.
+
+    Args:
+        rotation (List[Tuple[str, float]], optional): list of steps for rotation, e.g.
+            ``[("x", 90), ("z", 180)]``. None means no rotation.
+
+    Returns:
+        Optional[int]: orientation index, or None if any step is not a multiple of 90 degrees.
+    """
+    if any(angle % 90 for _, angle in rotation or []):
+        return None
+    matrix = np.rint(rotation_matrix(rotation)).astype(np.int8)
+    return _CUBE_ROTATION_INDEX[matrix.tobytes()]
+
+
+def orientation_indices(
+    rotations: Iterable[Optional[List[Tuple[str, float]]]]
+) -> Optional[np.ndarray]:
+    """Compile one list of rotation steps per unit into orientation indices.
+
+    Args:
+        rotations (Iterable[List[Tuple[str, float]]]): one list of rotation steps (or None) per
+            unit.
+
+    Returns:
+        Optional[np.ndarray]: ``(N,)`` uint8 orientation indices, or None if any unit has a step
+        that is not a multiple of 90 degrees.
+    """
+    compiled = {}
+    indices = []
+    for rotation in rotations:
+        key = tuple(rotation or ())
+        if key not in compiled:
+            compiled[key] = orientation_index(rotation)
+            if compiled[key] is None:
+                return None
+        indices.append(compiled[key])
+    return np.array(indices, dtype=np.uint8)
+
+
+def _orientation_steps() -> List[Optional[List[Tuple[str, int]]]]:
+    # Breadth-first search over 90 degree steps, so every orientation gets a shortest step list
+    steps = {0: None}
+    frontier = [[]]
+    while len(steps) < len(CUBE_ROTATIONS):
+        next_frontier = []
+        for rotation in frontier:
+            for axis in AXES:
+                for angle in (90, 180, -90):
+                    candidate = rotation + [(axis, angle)]
+                    index = orientation_index(candidate)
+                    if index not in steps:
+                        steps[index] = candidate
+                        next_frontier.append(candidate)
+        frontier = next_frontier
+    return [steps[i] for i in range(len(CUBE_ROTATIONS))]
+
+
+# Shortest list of rotation steps for each orientation index; None for the identity.
+ORIENTATION_STEPS = _orientation_steps()
+
+
+def oriented_points(points: np.ndarray) -> np.ndarray:
+    """Pre-rotate template points by all 24 cube rotations.
+
+    Args:
+        points (np.ndarray): ``(P, 3)`` template points.
+
+    Returns:
+        np.ndarray: ``(24, P, 3)`` rotated points, indexed by orientation index.
+    """
+    return np.matmul(points, CUBE_ROTATIONS.transpose(0, 2, 1).astype(points.dtype))
+
+
+def compose_transform(
+    scale: float = 1.0,
+    rotation: Union[List[Tuple[str, float]], np.ndarray, None] = None,
+    translation: Optional[Sequence[float]] = None,
+) -> np.ndarray:
+    """Compose scaling, rotation and translation into one 4x4 homogeneous transform.
+
+    The order matches ``process_spider_box_unit_cell``: scale first, then rotate about the
+    origin, then translate.
+
+    Args:
+        scale (float, optional): scaling factor. Defaults to 1.0.
+        rotation (Union[List[Tuple[str, float]], np.ndarray], optional): list of rotation steps,
+            or a 3x3 rotation matrix. Defaults to None.
+        translation (Sequence[float], optional): length of 3 translation vector. Defaults to
+            None.
+
+    Returns:
+        np.ndarray: 4x4 transform matrix.
+    """
+    if not isinstance(rotation, np.ndarray):
+        rotation = rotation_matrix(rotation)
+    transform = np.eye(4)
+    transform[:3, :3] = rotation * scale
+    if translation is not None:
+        transform[:3, 3] = translation
+    return transform
+
+
+def compose_transforms(
+    scales: Union[float, np.ndarray] = 1.0,
+    rotations: Optional[np.ndarray] = None,
+    translations: Optional[np.ndarray] = None,
+    n_units: Optional[int] = None,
+) -> np.ndarray:
+    """Vectorized :func:`compose_transform` for a stack of units.
+
+    Args:
+        scales (Union[float, np.ndarray], optional): scalar or ``(N,)`` scaling factors.
+            Defaults to 1.0.
+        rotations (np.ndarray, optional): ``(N, 3, 3)`` rotation matrices. Defaults to None.
+        translations (np.ndarray, optional): ``(N, 3)`` translation vectors. Defaults to None.
+        n_units (int, optional): number of units, only needed when neither ``rotations`` nor
+            ``translations`` is given. Defaults to None.
+
+    Returns:
+        np.ndarray: ``(N, 4, 4)`` transform matrices.
+    """
+    if n_units is None:
+        n_units = len(rotations) if rotations is not None else len(translations)
+    transforms = np.zeros((n_units, 4, 4))
+    transforms[:, 3, 3] = 1.0
+    scales = np.broadcast_to(np.asarray(scales, dtype=float), (n_units,))
+    if rotations is None:
+        transforms[:, :3, :3] = np.eye(3) * scales[:, None, None]
+    else:
+        transforms[:, :3, :3] = rotations * scales[:, None, None]
+    if translations is not None:
+        transforms[:, :3, 3] = translations
+    return transforms
+
+
+def transform_points(
+    points: np.ndarray, transforms: np.ndarray, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Apply a stack of 4x4 transforms to one template point set in a single batched operation.
+
+    Args:
+        points (np.ndarray): ``(P, 3)`` template points.
+        transforms (np.ndarray): ``(N, 4, 4)`` transform matrices.
+        out (np.ndarray, optional): preallocated ``(N, P, 3)`` output buffer. Defaults to None.
+
+    Returns:
+        np.ndarray: ``(N, P, 3)`` transformed points, one block per transform.
+    """
+    if out is None:
+        out = np.empty((len(transforms), len(points), 3), dtype=points.dtype)
+    homogeneous = np.ones((len(points), 4), dtype=out.dtype)
+    homogeneous[:, :3] = points
+    # (P, 4) @ (N, 4, 3): one batched product applies rotation, scale and translation together
+    np.matmul(homogeneous, transforms[:, :3, :].transpose(0, 2, 1).astype(out.dtype), out=out)
+    return out
@@ -1,12 +1,35 @@
 """Utility functions for making a spider army unit (red spider on a box)."""
 import os
-from random import choice, randint
-from typing import Dict, List, Tuple, Union
+from random import choice, getrandbits, randint
+from typing import Dict, List, Optional, Tuple, Union
 
 import pyvista as pv
 
+from xkcd_red_spider.assets import ASSETS
+from xkcd_red_spider.cache import cached_bounds, cached_mesh
+from xkcd_red_spider.instrument import instrumented
+from xkcd_red_spider.lattice import PLACEMENTS, exposed_orientations
+from xkcd_red_spider.preprocess import compact_mesh
+from xkcd_red_spider.transforms import ORIENTATION_STEPS, orientation_index
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "data")
+
+def _package_data_dir() -> str:
+    """Locate the meshes shipped as package data inside ``xkcd_red_spider/data``.
+
+    Returns:
+        str: Path of the package data directory.
+    """
+    try:
+        from importlib.resources import files
+    except ImportError:  # Python < 3.9
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    return str(files("xkcd_red_spider") / "data")
+
+
+# Set XKCD_RED_SPIDER_DATA_DIR to read the spider and building meshes from somewhere else.
+DATA_DIR = os.environ.get("XKCD_RED_SPIDER_DATA_DIR") or _package_data_dir()
+SPIDER_PATH = os.path.join(DATA_DIR, "spider.ply")
+BUILDINGS_PATH = os.path.join(DATA_DIR, "buildings-and-skyscrapers", "source", "buildings.obj")
 
 # Hand-crafted spider army coords that mimic the xkcd comic: Red Spiders Cometh
 # https://xkcd.com/126/
@@ -28,6 +51,7 @@ XKCD_SPIDER_ARMY_COORD = {
 }
 
 
+@instrumented()
 def get_unit_cell_box() -> pv.PolyData:
     """Return a box unit. The box has length 1 in all 3 dimensions, and is centered at the origin.
 
@@ -41,40 +65,102 @@ def get_unit_cell_box() -> pv.PolyData:
     return default_box
 
 
-def get_unit_cell_spider() -> pv.PolyData:
+@instrumented()
+def _read_unit_cell_spider() -> pv.PolyData:
+    default_spider = pv.read(SPIDER_PATH)
+    default_spider.points /= 6
+    default_spider.translate([-0.5, -0.5, 0.4], inplace=True)
+    default_spider.rotate_z(-110, inplace=True)
+    return default_spider
+
+
+@instrumented()
+def get_unit_cell_spider(use_cache: bool = True) -> pv.PolyData:
     """Return a spider unit. The spider has legspan that is slightly smaller than the box face, and
     is in a position so it appears to be standing on the box unit.
 
     Having the spider unit standing on the box centered at origin will make it easier for rotating
     the spider on a box.
 
+    Args:
+        use_cache (bool, optional): whether or not to load the transformed spider from the binary
+            cache, which is rebuilt whenever ``spider.ply`` changes. Defaults to True.
+
     Returns:
         pv.PolyData: ``pv.Polydata`` containing the spider unit.
     """
-    default_spider = pv.read(os.path.join(DATA_DIR, "spider.ply"))
-    default_spider.points /= 6
-    default_spider.translate([-0.5, -0.5, 0.4])
-    default_spider.rotate_z(-110)
-    return default_spider
+    if not use_cache:
+        return _read_unit_cell_spider()
+    return cached_mesh("spider", [SPIDER_PATH], _read_unit_cell_spider)
+
+
+@instrumented()
+def _read_buildings() -> pv.PolyData:
+    default_buildings = pv.read(BUILDINGS_PATH)
+    default_buildings.rotate_x(90, inplace=True)
+    default_buildings.translate([-4, -4, 0], inplace=True)
+    return default_buildings
+
+
+@instrumented()
+def _read_compact_buildings() -> pv.PolyData:
+    return compact_mesh(_read_buildings())[0]
 
 
-def get_buildings() -> pv.PolyData:
+@instrumented()
+def get_buildings(use_cache: bool = True, compact: bool = True) -> pv.PolyData:
     """Return a set of buildings, which was downloaded from sketchfab and saved in project file.
 
+    Args:
+        use_cache (bool, optional): whether or not to load the transformed buildings from the
+            binary cache, which is rebuilt whenever ``buildings.obj`` changes. Defaults to True.
+        compact (bool, optional): whether or not to return the buildings compacted by
+            ``preprocess.compact_mesh`` (merged vertices, float32 points, no data arrays) rather
+            than exactly as parsed. Defaults to True.
+
     Returns:
         pv.PolyData: ``pv.Polydata`` containing the buildings.
     """
-    default_buildings = pv.read(
-        os.path.join(DATA_DIR, "buildings-and-skyscrapers", "source", "buildings.obj")
-    )
-    default_buildings.rotate_x(90)
-    default_buildings.translate([-4, -4, 0])
-    return default_buildings
+    if not use_cache:
+        return _read_compact_buildings() if compact else _read_buildings()
+    return cached_mesh(**_buildings_cache_entry(compact))
+
+
+def get_buildings_bounds(compact: bool = True) -> Optional[Tuple[float, ...]]:
+    """Return the bounds of the buildings from the binary cache, without loading them.
+
+    Args:
+        compact (bool, optional): whether or not the bounds are those of the compacted buildings,
+            see :func:`get_buildings`. Defaults to True.
+
+    Returns:
+        Optional[Tuple[float, ...]]: ``(xmin, xmax, ymin, ymax, zmin, zmax)``, or None until
+        :func:`get_buildings` has cached the buildings.
+    """
+    return cached_bounds(**_buildings_cache_entry(compact))
+
 
+def _buildings_cache_entry(compact: bool) -> Dict:
+    # Keyword arguments of cached_mesh for the buildings
+    if not compact:
+        return {"name": "buildings_raw", "sources": [BUILDINGS_PATH], "builder": _read_buildings}
+    return {
+        "name": "buildings",
+        "sources": [BUILDINGS_PATH],
+        "builder": _read_compact_buildings,
+        "dependencies": [_read_buildings, compact_mesh],
+    }
 
+
+ASSETS.register("box", get_unit_cell_box)
+ASSETS.register("spider", get_unit_cell_spider)
+ASSETS.register("buildings", get_buildings)
+
+
+@instrumented()
 def process_spider_box_unit_cell(
-    spider: pv.PolyData = get_unit_cell_spider(),
-    box: pv.PolyData = get_unit_cell_box(),
+    spider: pv.PolyData = None,
+    box: pv.PolyData = None,
     scale: float = 1.0,
     rotation: List[Tuple[str, float]] = None,
     translation: List[Union[int, float]] = None,
@@ -83,10 +169,11 @@ def process_spider_box_unit_cell(
     translations.
 
     Args:
-        spider (pv.PolyData, optional): Polydata containing the spider unit. Defaults to
-            get_unit_cell_spider().
-        box (pv.PolyData, optional): Polydata containing the box unit. Defaults to
-            get_unit_cell_box().
+        spider (pv.PolyData, optional): Polydata containing the spider unit. It is modified in
+            place. Defaults to None, which uses a copy of the ``"spider"`` template from
+            ``ASSETS``, pre-rotated when ``rotation`` only has multiples of 90 degrees.
+        box (pv.PolyData, optional): Polydata containing the box unit. It is modified in place.
+            Defaults to None, which uses a copy of the ``"box"`` template from ``ASSETS``.
         scale (float, optional): scaling factor. Defaults to 1.0.
         rotation (List[Tuple[str, float]], optional): list of steps for rotation, in the form of
             list of tuples, and the tuple containing the direction (``"x"``, ``"y"``, or ``"z"``)
@@ -104,29 +191,47 @@ def process_spider_box_unit_cell(
     Returns:
         Tuple[pv.PolyData, pv.PolyData]: A tuple of ``pv.Polydata`` containing the spider and box.
     """
+    orientation = None
+    if spider is None:
+        # Axis-aligned rotations are served from the pre-rotated templates, no rotation needed
+        orientation = orientation_index(rotation) if isinstance(rotation, list) else None
+        spider = ASSETS.get("spider", orientation=orientation)
+    if box is None:
+        box = ASSETS.get("box")
+
     spider.points *= scale
     box.points *= scale
 
-    if isinstance(rotation, list):
+    if isinstance(rotation, list) and orientation is None:
         for step in rotation:
             if step[0] == "x":
-                spider.rotate_x(step[1])
+                spider.rotate_x(step[1], inplace=True)
             if step[0] == "y":
-                spider.rotate_y(step[1])
+                spider.rotate_y(step[1], inplace=True)
             if step[0] == "z":
-                spider.rotate_z(step[1])
+                spider.rotate_z(step[1], inplace=True)
 
     if isinstance(translation, list):
-        spider.translate(translation)
-        box.translate(translation)
+        spider.translate(translation, inplace=True)
+        box.translate(translation, inplace=True)
 
     return (spider, box)
 
 
+@instrumented()
 def generate_random_spider_army_coord(
-    num_spider: int = 15, x_range: int = 10, y_range: int = 3, z_range: int = 1, max_step: int = 3
+    num_spider: int = 15,
+    x_range: int = 10,
+    y_range: int = 3,
+    z_range: int = 1,
+    max_step: int = 3,
+    placement: str = "random",
 ) -> Dict[Tuple[int, int], List[Tuple[str, int]]]:
-    """Generate multiple spider coordinates at random.
+    """Generate multiple spider coordinates at random, reproducibly after ``random.seed()``.
+
+    Units that land on the same position overwrite each other, so fewer than ``num_spider`` units
+    may be returned. ``columnar.generate_random_army`` is a seedable, vectorized alternative that
+    places units on distinct positions.
 
     Args:
         num_spider (int, optional): number of spider-box units we want to generate. Defaults to 15.
@@ -138,6 +243,11 @@ def generate_random_spider_army_coord(
             Defaults to 1.
         max_step (int, optional): maximum number of randomly generated rotation steps.
             Defaults to 3.
+        placement (str, optional): one of ``lattice.PLACEMENTS``. ``"random"`` generates up to
+            ``max_step`` random rotation steps, ``"exposed"`` replaces them with the shortest steps
+            standing the spider on an exposed face of its box (see
+            ``lattice.exposed_orientations``), and drops the units whose box is buried on all 6
+            sides, as neither their box nor their spider can be seen. Defaults to "random".
 
     Returns:
         Dict[Tuple[int, int], List[Tuple[str, int]]]: Coordinates and rotation steps of the red
@@ -160,14 +270,27 @@ def generate_random_spider_army_coord(
             steps = None
         spider_army_coord[pos] = steps
 
+    if placement == "exposed":
+        # Seeded from ``random``, so that ``random.seed()`` also reproduces the orientations
+        orientations, visible = exposed_orientations(list(spider_army_coord), getrandbits(64))
+        spider_army_coord = {
+            pos: ORIENTATION_STEPS[orientation]
+            for pos, orientation, keep in zip(
+                spider_army_coord, orientations.tolist(), visible.tolist()
+            )
+            if keep
+        }
+    elif placement != "random":
+        raise ValueError(f"placement must be one of {PLACEMENTS}, got {placement!r}")
     return spider_army_coord
 
 
-def get_xkcd_spider_army(
+@instrumented()
+def get_spider_army_units(
     spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
     extra_spider: bool = True,
-) -> List[Tuple[pv.PolyData, pv.PolyData]]:
-    """Generate the xkcd spider army through the army coordinates.
+) -> List[Tuple[List[int], List[Tuple[str, int]]]]:
+    """Flatten the army coordinates into a list of (translation, rotation) pairs, one per unit.
 
     Args:
         spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
@@ -177,40 +300,47 @@ def get_xkcd_spider_army(
             fidelity with the original comic. Defaults to True.
 
     Returns:
-        List[Tuple[pv.PolyData, pv.PolyData]]: list of (spider, box) ``pv.PolyData`` tuples.
+        List[Tuple[List[int], List[Tuple[str, int]]]]: list of (length of 3 translation, rotation
+        steps) tuples.
     """
     if spider_army_coord is None:
         spider_army_coord = XKCD_SPIDER_ARMY_COORD
 
-    spider_army = []
+    units = []
     for spider_unit_coord, spider_unit_rotation in spider_army_coord.items():
         spider_unit_coord = list(spider_unit_coord)
         if len(spider_unit_coord) == 2:
             spider_unit_coord.append(0)
-        spider_army.append(
-            process_spider_box_unit_cell(
-                spider=get_unit_cell_spider(),
-                box=get_unit_cell_box(),
-                rotation=spider_unit_rotation,
-                translation=spider_unit_coord,
-            )
-        )
+        units.append((spider_unit_coord, spider_unit_rotation))
 
     # Add two extra spiders for fidelity with xkcd comic
     if extra_spider and (spider_army_coord == XKCD_SPIDER_ARMY_COORD):
-        spider_army += [
-            process_spider_box_unit_cell(
-                spider=get_unit_cell_spider(),
-                box=get_unit_cell_box(),
-                rotation=[("x", 90)],
-                translation=[-1, -2, 0],
-            ),
-            process_spider_box_unit_cell(
-                spider=get_unit_cell_spider(),
-                box=get_unit_cell_box(),
-                rotation=[("z", 180)],
-                translation=[-4, 2, 0],
-            ),
+        units += [
+            ([-1, -2, 0], [("x", 90)]),
+            ([-4, 2, 0], [("z", 180)]),
         ]
 
-    return spider_army
+    return units
+
+
+@instrumented()
+def get_xkcd_spider_army(
+    spider_army_coord: Dict[Tuple[int, int], List[Tuple[str, int]]] = None,
+    extra_spider: bool = True,
+) -> List[Tuple[pv.PolyData, pv.PolyData]]:
+    """Generate the xkcd spider army through the army coordinates.
+
+    Args:
+        spider_army_coord (Dict[Tuple[int, int], List[Tuple[str, int]]], optional): Coordinates and
+            rotation steps of the red spider army. Check ``XKCD_SPIDER_ARMY_COORD`` for the example
+            setting. Defaults to None.
+        extra_spider (bool, optional): whether or not to add extra spiders on two boxes, to improve
+            fidelity with the original comic. Defaults to True.
+
+    Returns:
+        List[Tuple[pv.PolyData, pv.PolyData]]: list of (spider, box) ``pv.PolyData`` tuples.
+    """
+    return [
+        process_spider_box_unit_cell(rotation=rotation, translation=translation)
+        for translation, rotation in get_spider_army_units(spider_army_coord, extra_spider)
+    ]